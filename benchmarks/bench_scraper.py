@@ -0,0 +1,249 @@
+"""Đo thông lượng scraper trên server giả lập (benchmarks/mock_tiki_server.py)
+
+Mỗi bài đo chạy trong một process riêng (để đo đúng RSS đỉnh) với cùng một
+server giả lập, báo cáo request/s, đánh giá/s, độ trễ p50/p99 và RSS đỉnh.
+
+    python -m benchmarks.bench_scraper
+    python -m benchmarks.bench_scraper --latency 0.05 --throttle-rate 0.02 --save bench.json
+    python -m benchmarks.bench_scraper --compare bench.json   # exit 1 nếu chậm hơn quá --tolerance
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARKS = ('get_reviews', 'search_products', 'create_sentiment_dataset', 'update_data')
+
+# Tắt giới hạn tốc độ phía client để đo chính scraper (đặt --rate để đo cả rate limiter)
+UNLIMITED_RATE = 1e6
+
+
+class RequestRecorder:
+    """Ghi độ trễ từng response qua hook của requests.Session"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def hook(self, response, *args, **kwargs):
+        with self.lock:
+            self.latencies.append(response.elapsed.total_seconds())
+            self.statuses[response.status_code] = self.statuses.get(response.status_code, 0) + 1
+
+    def attach(self, session):
+        session.hooks['response'].append(self.hook)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def peak_rss_mb():
+    # VmHWM: RSS đỉnh của riêng process này (ru_maxrss trên Linux giữ cả phần của process cha trước exec)
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _scraper(args, recorder):
+    from tiki_sentiment_scraper import TikiSentimentScraper
+
+    rate = args.rate or UNLIMITED_RATE
+    rates = {'products': rate, 'reviews': rate, 'search': rate, 'category': rate, 'default': rate}
+    scraper = TikiSentimentScraper(max_workers=args.workers, page_workers=args.page_workers,
+                                   rate_limits=rates, base_url=args.url)
+    recorder.attach(scraper.session)
+    return scraper
+
+
+def _product_ids(args):
+    """Các sản phẩm có nhiều đánh giá nhất trên server giả lập"""
+    import requests
+
+    products = requests.get(f"{args.url}/api/v2/products", params={'q': '', 'limit': 100000}).json()['data']
+    products.sort(key=lambda p: p['review_count'], reverse=True)
+    return [str(p['id']) for p in products[:args.products]]
+
+
+# Mỗi bài đo chuẩn bị xong (import, tạo scraper, chọn sản phẩm) rồi trả về hàm cần đo,
+# hàm đó trả về số bản ghi (đánh giá / sản phẩm) lấy được
+
+def bench_get_reviews(args, recorder):
+    scraper = _scraper(args, recorder)
+    product_ids = _product_ids(args)
+
+    def run():
+        return sum(len(scraper.get_reviews(pid, limit=args.reviews_per_product)) for pid in product_ids)
+    return run
+
+
+def bench_search_products(args, recorder):
+    scraper = _scraper(args, recorder)
+
+    def run():
+        return sum(len(scraper.search_products(keyword, limit=args.search_limit)) for keyword in args.keywords)
+    return run
+
+
+def bench_create_sentiment_dataset(args, recorder):
+    scraper = _scraper(args, recorder)
+    product_ids = _product_ids(args)
+
+    def run():
+        reviews_df, _ = scraper.create_sentiment_dataset(product_ids, reviews_per_product=args.reviews_per_product)
+        return len(reviews_df)
+    return run
+
+
+def bench_update_data(args, recorder):
+    import pandas as pd
+    import update_data
+    from utils.api_helpers import ApiClient, RateLimiter
+
+    rate = args.rate or UNLIMITED_RATE
+    update_data.client = ApiClient(limiter=RateLimiter({'products': rate}), pool_size=args.workers)
+    update_data.product_api_url = f"{args.url}/api/v2/products"
+    recorder.attach(update_data.client.session)
+    df = pd.DataFrame({'product_id': _product_ids(args), 'image_url': '', 'category_name': ''})
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            result = update_data.add_missing_data(df.copy(), max_workers=args.workers,
+                                                  progress_path=os.path.join(tmp, 'progress.jsonl'))
+        return int((result['image_url'] != '').sum())
+    return run
+
+
+def run_one(args):
+    """Chạy một bài đo trong process hiện tại, in kết quả dạng JSON"""
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    recorder = RequestRecorder()
+    run = globals()[f"bench_{args.run}"](args, recorder)
+    start = time.perf_counter()
+    items = run()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'benchmark': args.run,
+        'seconds': round(elapsed, 3),
+        'requests': len(recorder.latencies),
+        'requests_per_sec': round(len(recorder.latencies) / elapsed, 1),
+        'items': items,
+        'items_per_sec': round(items / elapsed, 1),
+        'p50_ms': round(percentile(recorder.latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(recorder.latencies, 99) * 1000, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'statuses': recorder.statuses,
+    }
+    print(json.dumps(result))
+
+
+def _child_args(args, name, url):
+    argv = [sys.executable, '-m', 'benchmarks.bench_scraper', '--run', name, '--url', url,
+            '--workers', str(args.workers), '--page-workers', str(args.page_workers),
+            '--products', str(args.products), '--reviews-per-product', str(args.reviews_per_product),
+            '--search-limit', str(args.search_limit), '--keywords', *args.keywords]
+    if args.rate:
+        argv += ['--rate', str(args.rate)]
+    return argv
+
+
+def run_all(args):
+    from benchmarks.mock_tiki_server import MockTikiServer, TikiFixtures
+
+    fixtures = TikiFixtures(args.fixtures, args.synthetic_reviews, args.max_products)
+    server = MockTikiServer(fixtures, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed)
+    results = []
+    with server:
+        for name in args.only or BENCHMARKS:
+            output = subprocess.run(_child_args(args, name, server.url), capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            if output.returncode != 0:
+                print(f"❌ {name} lỗi:\n{output.stderr[-2000:]}")
+                continue
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'benchmark':<26}{'giây':>8}{'req':>8}{'req/s':>9}{'items':>8}{'items/s':>10}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'RSS MB':>9}")
+    for r in results:
+        print(f"{r['benchmark']:<26}{r['seconds']:>8}{r['requests']:>8}{r['requests_per_sec']:>9}{r['items']:>8}"
+              f"{r['items_per_sec']:>10}{r['p50_ms']:>9}{r['p99_ms']:>9}{r['peak_rss_mb']:>9}")
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    """So với lần đo trước: báo các bài đo có items/s giảm quá tolerance, trả về True nếu có"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r['benchmark']: r for r in json.load(f)}
+
+    regressed = False
+    for r in results:
+        old = baseline.get(r['benchmark'])
+        if not old or not old['items_per_sec']:
+            continue
+        ratio = r['items_per_sec'] / old['items_per_sec']
+        flag = '⚠️  chậm hơn' if ratio < 1 - tolerance else ''
+        regressed = regressed or bool(flag)
+        print(f"{r['benchmark']:<26} {old['items_per_sec']:>10} -> {r['items_per_sec']:<10} x{ratio:.2f} {flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scraper trên server giả lập')
+    parser.add_argument('--only', nargs='*', choices=BENCHMARKS, help='chỉ chạy các bài đo này')
+    parser.add_argument('--fixtures', default='data')
+    parser.add_argument('--synthetic-reviews', type=int, default=200, help='số đánh giá mỗi sản phẩm (0: chỉ dữ liệu ghi sẵn)')
+    parser.add_argument('--max-products', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--page-workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=None, help='giới hạn request/giây mỗi endpoint (mặc định: không giới hạn)')
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--reviews-per-product', type=int, default=200)
+    parser.add_argument('--search-limit', type=int, default=200)
+    parser.add_argument('--keywords', nargs='*', default=['tai nghe', 'điện thoại', 'chuột', 'sách'])
+    parser.add_argument('--save', help='lưu kết quả ra file JSON')
+    parser.add_argument('--compare', help='so với file JSON đã lưu')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='mức giảm items/s chấp nhận được khi --compare')
+    parser.add_argument('--run', choices=BENCHMARKS, help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args)
+        return
+
+    results = run_all(args)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
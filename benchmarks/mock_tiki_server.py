@@ -0,0 +1,342 @@
+"""Server giả lập API Tiki để đo và tinh chỉnh scraper mà không cần mạng
+
+Phục vụ /api/v2/products (tìm kiếm), /api/v2/products/{id}, /api/v2/reviews,
+/api/personalish/v1/blocks/listings và trang HTML danh mục /{slug}/c{id} từ
+các snapshot tiki_products_*/tiki_reviews_* trong data/ (hoặc dữ liệu tổng hợp
+nếu không có), với độ trễ, tỉ lệ lỗi 5xx và 429 cấu hình được.
+
+    python -m benchmarks.mock_tiki_server --port 8765 --latency 0.05 --error-rate 0.01 --throttle-rate 0.02
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Dùng khi data/ không có snapshot nào
+SYNTHETIC_TEXTS = [
+    ('Cực kì hài lòng', 'Sản phẩm tốt, giao hàng nhanh, đóng gói cẩn thận', 5),
+    ('Hài lòng', 'Hàng đúng mô tả, dùng ổn trong tầm giá', 4),
+    ('Bình thường', 'Chất lượng tạm được, giao hàng hơi chậm', 3),
+    ('Không hài lòng', 'Dùng được vài ngày thì bị lỗi', 2),
+    ('Rất không hài lòng', 'Quá tệ', 1),
+]
+CATEGORY_HTML_PAGE_SIZE = 40
+
+
+def _records(pattern, key):
+    import pandas as pd
+
+    frames = [pd.read_csv(path, encoding='utf-8-sig') for path in sorted(glob.glob(pattern))]
+    if not frames:
+        return []
+    df = pd.concat(frames).drop_duplicates(key, keep='last')
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class TikiFixtures:
+    """Dữ liệu sản phẩm/đánh giá mà server giả lập trả về
+
+    synthetic_reviews: nếu đặt, mỗi sản phẩm có đúng số đánh giá này, sinh tất
+    định từ nội dung đánh giá đã ghi (không lưu hết vào bộ nhớ); nếu không, chỉ
+    trả các đánh giá có trong snapshot.
+    """
+
+    def __init__(self, folder='data', synthetic_reviews=None, max_products=None, synthetic_products=500):
+        products = _records(os.path.join(folder, 'tiki_products_*.csv'), 'product_id')
+        reviews = _records(os.path.join(folder, 'tiki_reviews_*.csv'), 'review_id')
+        if not products:
+            products = [
+                {'product_id': 1000 + i, 'name': f'Sản phẩm {i}', 'price': 100000 + i, 'original_price': 120000,
+                 'discount_rate': 16, 'rating_average': round(1 + 4 * (i % 9) / 8, 1), 'review_count': 100,
+                 'category_name': f'Danh mục {i % 10}', 'brand_name': 'OEM', 'url': f'san-pham-{i}'}
+                for i in range(synthetic_products)
+            ]
+        if max_products:
+            products = products[:max_products]
+
+        self.products = {int(p['product_id']): p for p in products}
+        self.synthetic_reviews = synthetic_reviews
+        self.reviews = {}
+        for review in reviews:
+            self.reviews.setdefault(int(review['product_id']), []).append(self._api_review(review))
+        for items in self.reviews.values():
+            items.sort(key=lambda r: r['created_at'] or 0, reverse=True)
+
+        self.texts = [(r['title'], r['content'], r['rating']) for items in self.reviews.values() for r in items]
+        self.texts = self.texts or SYNTHETIC_TEXTS
+
+        names = sorted({p.get('category_name') or '' for p in self.products.values()} - {''})
+        self.category_ids = {name: 1000 + i for i, name in enumerate(names)}
+        self.category_products = {}
+        for product_id, product in self.products.items():
+            category_id = self.category_ids.get(product.get('category_name') or '')
+            if category_id is not None:
+                self.category_products.setdefault(category_id, []).append(product_id)
+
+    @staticmethod
+    def _api_review(review):
+        return {
+            'id': int(review['review_id']),
+            'title': review.get('title') or '',
+            'content': review.get('content') or '',
+            'rating': int(review.get('rating') or 0),
+            'created_at': int(review.get('created_at') or 0),
+            'created_by': {'name': review.get('customer_name') or ''},
+            'product_id': int(review['product_id']),
+            'is_verified': str(review.get('is_verified')).lower() == 'true',
+            'number_of_likes': int(review.get('number_of_likes') or 0),
+            'number_of_replies': int(review.get('number_of_replies') or 0),
+        }
+
+    def product(self, product_id):
+        """Payload /api/v2/products/{id}, None nếu không có"""
+        product = self.products.get(product_id)
+        if product is None:
+            return None
+        category_name = product.get('category_name') or ''
+        return {
+            'id': product_id,
+            'name': product.get('name') or '',
+            'short_description': product.get('short_description') or '',
+            'price': int(product.get('price') or 0),
+            'original_price': int(product.get('original_price') or 0),
+            'discount_rate': int(product.get('discount_rate') or 0),
+            'rating_average': float(product.get('rating_average') or 0),
+            'review_count': self.review_count(product_id),
+            'categories': {'id': self.category_ids.get(category_name), 'name': category_name},
+            'breadcrumbs': [{'name': category_name}] if category_name else [],
+            'brand': {'name': product.get('brand_name') or ''},
+            'url_path': product.get('url') or '',
+            'thumbnail_url': f'https://salt.tikicdn.com/cache/280x280/{product_id}.jpg',
+        }
+
+    def summary(self, product_id):
+        """Sản phẩm dạng rút gọn như trong kết quả tìm kiếm / listing"""
+        product = self.product(product_id)
+        summary = {key: product[key] for key in ('id', 'name', 'price', 'original_price', 'discount_rate',
+                                                  'rating_average', 'review_count', 'url_path', 'thumbnail_url')}
+        summary['brand_name'] = product['brand']['name']
+        summary['primary_category_name'] = product['categories']['name']
+        return summary
+
+    def review_count(self, product_id):
+        if self.synthetic_reviews:
+            return self.synthetic_reviews
+        return len(self.reviews.get(product_id, []))
+
+    def reviews_page(self, product_id, page, limit, sort=None):
+        """(đánh giá của trang, tổng số đánh giá)"""
+        total = self.review_count(product_id)
+        start = (page - 1) * limit
+        if not self.synthetic_reviews:
+            items = self.reviews.get(product_id, [])
+            if sort == 'id|desc':
+                items = sorted(items, key=lambda r: r['id'], reverse=True)
+            return items[start:start + limit], total
+
+        # Đánh giá thứ k (k = 0 là mới nhất) được sinh lại giống hệt ở mọi lần gọi
+        items = []
+        for k in range(start, min(start + limit, total)):
+            title, content, rating = self.texts[(product_id + k) % len(self.texts)]
+            items.append({
+                'id': product_id * 100000 + (total - k), 'title': title, 'content': content, 'rating': rating,
+                'created_at': 1600000000 + (total - k) * 60, 'created_by': {'name': f'Khách {k}'},
+                'product_id': product_id, 'is_verified': k % 3 == 0, 'number_of_likes': k % 7,
+                'number_of_replies': k % 2,
+            })
+        return items, total
+
+    def search(self, keyword):
+        keyword = (keyword or '').strip().lower()
+        return [pid for pid, p in self.products.items() if keyword in str(p.get('name') or '').lower()]
+
+
+class MockTikiServer:
+    """Chạy TikiFixtures qua HTTP trên một luồng nền
+
+        with MockTikiServer(latency=0.02, throttle_rate=0.01) as server:
+            scraper = TikiSentimentScraper(base_url=server.url)
+    """
+
+    def __init__(self, fixtures=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=0):
+        self.fixtures = fixtures if fixtures is not None else TikiFixtures()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def fault(self):
+        """Trả về mã lỗi cần giả lập (429 / 500) hoặc None"""
+        with self.lock:
+            roll = self.random.random()
+            delay = self.latency + self.random.random() * self.jitter
+        time.sleep(delay)
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+    def count(self, endpoint, status):
+        with self.lock:
+            self.stats[(endpoint, status)] += 1
+
+    def route(self, path, query):
+        """(endpoint, status, body, content_type) cho một request"""
+        fixtures = self.fixtures
+        page = int(query.get('page', 1))
+        limit = int(query.get('limit', 20))
+
+        match = re.fullmatch(r'/api/v2/products/(\d+)', path)
+        if match:
+            product = fixtures.product(int(match.group(1)))
+            if product is None:
+                return 'products', 404, {'error': 'not found'}, 'json'
+            return 'products', 200, product, 'json'
+
+        if path == '/api/v2/products':
+            return 'search', 200, self._paged(fixtures.search(query.get('q')), page, limit), 'json'
+
+        if path == '/api/v2/reviews':
+            product_id = int(query.get('product_id', 0))
+            items, total = fixtures.reviews_page(product_id, page, limit, query.get('sort'))
+            last_page = max(1, math.ceil(total / limit))
+            return 'reviews', 200, {'data': items, 'paging': {'total': total, 'current_page': page,
+                                                              'last_page': last_page, 'per_page': limit}}, 'json'
+
+        if path == '/api/personalish/v1/blocks/listings':
+            product_ids = fixtures.category_products.get(int(query.get('category', 0)), [])
+            return 'category', 200, self._paged(product_ids, page, limit), 'json'
+
+        match = re.fullmatch(r'/[^/]+/c(\d+)', path)
+        if match:
+            product_ids = fixtures.category_products.get(int(match.group(1)), [])
+            start = (page - 1) * CATEGORY_HTML_PAGE_SIZE
+            items = product_ids[start:start + CATEGORY_HTML_PAGE_SIZE]
+            html = '<html><body><div data-id="0">menu</div>'
+            if items:
+                html += '<div data-view-id="product_list_container">'
+                html += ''.join(f'<div class="product-item" data-id="{pid}"><a>{pid}</a></div>' for pid in items)
+                html += '</div>'
+            return 'category_html', 200, html + '</body></html>', 'html'
+
+        return 'unknown', 404, {'error': 'not found'}, 'json'
+
+    def _paged(self, product_ids, page, limit):
+        start = (page - 1) * limit
+        return {
+            'data': [self.fixtures.summary(pid) for pid in product_ids[start:start + limit]],
+            'paging': {'total': len(product_ids), 'current_page': page,
+                       'last_page': max(1, math.ceil(len(product_ids) / limit)), 'per_page': limit},
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type='json', headers=None):
+        if content_type == 'json':
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            data = body.encode('utf-8')
+            content_type = 'text/html; charset=utf-8'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        fault = mock.fault()
+        try:
+            endpoint, status, body, content_type = mock.route(url.path, query)
+        except (TypeError, ValueError):
+            endpoint, status, body, content_type = 'unknown', 400, {'error': 'bad request'}, 'json'
+
+        if fault == 429:
+            mock.count(endpoint, 429)
+            self._send(429, {'error': 'too many requests'}, headers={'Retry-After': str(mock.retry_after)})
+        elif fault == 500:
+            mock.count(endpoint, 500)
+            self._send(500, {'error': 'internal error'})
+        else:
+            mock.count(endpoint, status)
+            self._send(status, body, content_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server giả lập API Tiki')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', default='data', help='thư mục chứa tiki_products_*/tiki_reviews_*.csv')
+    parser.add_argument('--synthetic-reviews', type=int, default=None, help='số đánh giá sinh ra cho mỗi sản phẩm')
+    parser.add_argument('--max-products', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0.0, help='độ trễ mỗi request (giây)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='độ trễ ngẫu nhiên thêm tối đa (giây)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='tỉ lệ trả 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='tỉ lệ trả 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    fixtures = TikiFixtures(args.fixtures, args.synthetic_reviews, args.max_products)
+    server = MockTikiServer(fixtures, args.host, args.port, args.latency, args.jitter,
+                            args.error_rate, args.throttle_rate, args.retry_after)
+    print(f"Server giả lập: {server.url} ({len(fixtures.products)} sản phẩm, "
+          f"{len(fixtures.category_ids)} danh mục)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
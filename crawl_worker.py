@@ -0,0 +1,272 @@
+"""Crawl phân tán qua hàng đợi task SQLite (utils.work_queue.WorkQueue)
+
+    # 1. Đưa sản phẩm vào hàng đợi (ID, từ khóa tìm kiếm hoặc danh mục)
+    python crawl_worker.py enqueue --keywords "tai nghe" "chuột không dây" --categories laptop/c1846
+    # 2. Chạy worker (mỗi process có session và ngân sách request riêng)
+    python crawl_worker.py work --processes 4 --rate reviews=8 --rate products=5
+    # Theo dõi tiến độ
+    python crawl_worker.py status
+
+Mỗi task sản phẩm lấy thông tin sản phẩm + trang đánh giá đầu, rồi thêm các trang
+đánh giá còn lại thành task riêng để nhiều worker cùng làm. Kết quả ghi ra shard
+JSONL (tiki_reviews_*/tiki_products_*) trong thư mục output (mặc định data/), gộp bằng merge_data.py.
+Shard được đóng khi đủ shard_size đánh giá (hoặc khi hết việc); task chỉ được
+ack sau khi shard chứa kết quả đã đóng, nên worker chết giữa chừng thì task
+được làm lại (có thể trùng bản ghi, merge_data.py sẽ loại trùng).
+Với --product-index (cùng file cho enqueue và work), sản phẩm được ghi vào chỉ
+mục khi task sản phẩm và mọi task trang của nó đã done, nên lần enqueue sau bỏ
+qua sản phẩm không đổi.
+"""
+import argparse
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process
+
+from utils.work_queue import WorkQueue, default_worker_id
+
+
+def parse_rates(values):
+    """['reviews=8', 'products=5'] -> {'reviews': 8.0, 'products': 5.0}"""
+    rates = {}
+    for value in values or []:
+        endpoint, _, rate = value.partition('=')
+        rates[endpoint] = float(rate)
+    return rates
+
+
+def process_task(scraper, task, reviews_per_product):
+    """Làm một task, trả về (đánh giá đã xử lý, product_info hoặc None, task mới [(key, payload)])"""
+    if task['kind'] == 'product':
+        product_id = task['key']
+        product_info = scraper._info_from_summary(task['payload']) or scraper.get_product_info(product_id)
+        if not product_info:
+            raise RuntimeError(f"Không lấy được thông tin sản phẩm {product_id}")
+
+        reviews, last_page = scraper._fetch_reviews_page(product_id, 1)
+        max_pages = min(last_page, math.ceil(reviews_per_product / scraper.reviews_page_size))
+        new_tasks = [(f"{product_id}:{page}", None) for page in range(2, max_pages + 1)]
+        return scraper.process_reviews(reviews[:reviews_per_product]), product_info, new_tasks
+
+    if task['kind'] == 'review_page':
+        product_id, page = task['key'].split(':')
+        reviews, _ = scraper._fetch_reviews_page(product_id, int(page))
+        return scraper.process_reviews(reviews), None, []
+
+    raise ValueError(f"Loại task không hỗ trợ: {task['kind']}")
+
+
+def run_worker(queue_path='data/work_queue.sqlite', output_dir='data', threads=4, rates=None,
+               base_url='https://tiki.vn', batch_size=50, reviews_per_product=5000, shard=None, shards=1,
+               poll_interval=5.0, visibility_timeout=600, shard_size=50000, product_index=None):
+    """Vòng lặp worker: lease lô task, làm song song, ghi shard, ack; dừng khi shard của worker hết việc
+
+    Task đã làm xong được giữ lease (gia hạn sau mỗi lô) cho tới khi shard
+    chứa kết quả của chúng được đóng, lúc đủ shard_size đánh giá hoặc khi
+    không còn task để lease.
+    product_index: file chỉ mục sản phẩm (utils.product_index); sản phẩm worker
+    đã ack được ghi vào khi không còn task trang nào của nó chưa done (task
+    trang lỗi hẳn thì sản phẩm không được ghi, lần sau crawl lại).
+    """
+    from tiki_sentiment_scraper import TikiSentimentScraper
+    from utils.product_index import ProductIndex
+    from utils.shards import ShardWriter
+
+    worker = default_worker_id()
+    tag = re.sub(r'\W+', '-', worker)
+    queue = WorkQueue(queue_path, visibility_timeout=visibility_timeout)
+    scraper = TikiSentimentScraper(max_workers=threads, page_workers=1, rate_limits=rates, base_url=base_url)
+    # Không tự chuyển shard: chỉ đóng shard ở ranh giới lô để ack đúng các task đã ghi xong
+    reviews_writer = ShardWriter(output_dir, prefix=f'tiki_reviews_{tag}', shard_size=None)
+    products_writer = ShardWriter(output_dir, prefix=f'tiki_products_{tag}', shard_size=None)
+    index = ProductIndex(product_index) if product_index else None
+    done = 0
+    unacked = []
+    # product_id -> product_info: chưa ack / đã ack nhưng còn task trang chưa xong
+    unacked_products = {}
+    indexing = {}
+
+    def commit():
+        # Chỉ ack khi kết quả đã nằm trong shard hoàn chỉnh
+        nonlocal done
+        reviews_writer.flush()
+        products_writer.flush()
+        if unacked:
+            queue.ack(unacked, worker)
+            done += len(unacked)
+            print(f"[{worker}] Đã xong {done} task ({reviews_writer.total} đánh giá)")
+            unacked.clear()
+        indexing.update(unacked_products)
+        unacked_products.clear()
+        finished = [product_id for product_id in indexing if not queue.unfinished('review_page', f'{product_id}:')]
+        for product_id in finished:
+            index.update(indexing.pop(product_id))
+        if finished:
+            index.save()
+
+    def run(task):
+        try:
+            return task, process_task(scraper, task, reviews_per_product), None
+        except Exception as e:
+            return task, None, e
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        while True:
+            tasks = queue.lease(worker, limit=batch_size, shard=shard, shards=shards)
+            if not tasks:
+                commit()
+                stats = queue.stats(shard=shard, shards=shards)
+                if not any(states.get('leased') or states.get('expired') or states.get('pending')
+                           for states in stats.values()):
+                    break
+                # Worker khác còn đang giữ task: chờ, lease hết hạn thì lấy lại
+                time.sleep(poll_interval)
+                continue
+
+            for task, result, error in executor.map(run, tasks):
+                if error is not None:
+                    print(f"[{worker}] Lỗi task {task['kind']} {task['key']}: {error}")
+                    queue.nack(task['id'], error, worker)
+                    continue
+                reviews, product_info, new_tasks = result
+                reviews_writer.write_many(reviews)
+                if product_info:
+                    products_writer.write(product_info)
+                    if index is not None:
+                        unacked_products[task['key']] = product_info
+                if new_tasks:
+                    queue.put_many('review_page', new_tasks)
+                unacked.append(task['id'])
+
+            if reviews_writer.pending >= shard_size:
+                commit()
+            else:
+                # Giữ lease các task đã xong trong lúc shard còn mở
+                queue.extend(unacked, worker)
+
+    commit()
+    reviews_writer.close()
+    products_writer.close()
+    queue.close()
+    if index is not None:
+        index.close()
+    return done
+
+
+def enqueue(args):
+    from tiki_sentiment_scraper import TikiSentimentScraper
+
+    queue = WorkQueue(args.queue)
+    ids = list(args.ids or [])
+    if args.ids_file:
+        with open(args.ids_file, encoding='utf-8') as f:
+            ids.extend(line.strip() for line in f if line.strip())
+    added = queue.put_many('product', [(product_id, None) for product_id in ids])
+
+    if args.keywords or args.categories:
+        product_index = None
+        if args.product_index:
+            from utils.product_index import ProductIndex
+            product_index = ProductIndex(args.product_index)
+        scraper = TikiSentimentScraper(rate_limits=parse_rates(args.rate), base_url=args.base_url,
+                                       product_index=product_index, skip_unchanged=True)
+        seen = set()
+        sources = []
+        if args.keywords:
+            sources.append(scraper.discover_products(args.keywords, limit_per_keyword=args.limit, seen=seen))
+        if args.categories:
+            sources.append(scraper.discover_categories(args.categories, limit_per_category=args.limit, seen=seen))
+        for products in sources:
+            batch = []
+            for item in products:
+                if isinstance(item, dict):
+                    batch.append((str(item['product_id']), item))
+                else:
+                    batch.append((str(item), None))
+                if len(batch) >= 500:
+                    added += queue.put_many('product', batch)
+                    batch = []
+            added += queue.put_many('product', batch)
+
+    print(f"Đã thêm {added} task sản phẩm mới vào {args.queue}")
+    queue.close()
+
+
+def work(args):
+    options = dict(queue_path=args.queue, output_dir=args.output, threads=args.threads, rates=parse_rates(args.rate),
+                   base_url=args.base_url, batch_size=args.batch_size, reviews_per_product=args.reviews_per_product,
+                   shard=args.shard, shards=args.shards, visibility_timeout=args.visibility_timeout,
+                   shard_size=args.shard_size, product_index=args.product_index)
+    if args.processes <= 1:
+        run_worker(**options)
+        return
+
+    processes = [Process(target=run_worker, kwargs=options) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def status(args):
+    queue = WorkQueue(args.queue)
+    for kind, states in sorted(queue.stats().items()):
+        print(f"{kind:<12} " + '  '.join(f"{state}={count}" for state, count in sorted(states.items())))
+    if args.retry_failed:
+        print(f"Đã đưa {queue.retry_failed()} task failed về hàng đợi")
+    queue.close()
+
+
+def export_shard(args):
+    queue = WorkQueue(args.queue)
+    added = queue.export_shard(args.output, args.shard, args.shards)
+    print(f"Đã chép {added} task của shard {args.shard}/{args.shards} sang {args.output}")
+    queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl Tiki phân tán qua hàng đợi task SQLite')
+    parser.add_argument('--queue', default='data/work_queue.sqlite', help='file hàng đợi')
+    parser.add_argument('--base-url', default='https://tiki.vn')
+    parser.add_argument('--rate', action='append', help='giới hạn request/giây, vd. reviews=8 (lặp lại được)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('enqueue', help='thêm sản phẩm vào hàng đợi')
+    p.add_argument('--ids', nargs='*', help='ID sản phẩm')
+    p.add_argument('--ids-file', help='file mỗi dòng một ID')
+    p.add_argument('--keywords', nargs='*', help='tìm sản phẩm theo từ khóa')
+    p.add_argument('--categories', nargs='*', help="danh mục, vd. 'laptop/c1846'")
+    p.add_argument('--limit', type=int, default=1000, help='số sản phẩm tối đa mỗi từ khóa / danh mục')
+    p.add_argument('--product-index', help='bỏ qua sản phẩm không đổi theo chỉ mục này (utils.product_index)')
+    p.set_defaults(func=enqueue)
+
+    p = commands.add_parser('work', help='chạy worker lấy task từ hàng đợi')
+    p.add_argument('--output', default='data', help='thư mục ghi shard kết quả')
+    p.add_argument('--processes', type=int, default=1, help='số process worker')
+    p.add_argument('--threads', type=int, default=4, help='số luồng mỗi worker')
+    p.add_argument('--batch-size', type=int, default=50, help='số task mỗi lần lease')
+    p.add_argument('--reviews-per-product', type=int, default=5000)
+    p.add_argument('--shard', type=int, default=None, help='chỉ làm task của shard này (dùng với --shards)')
+    p.add_argument('--shards', type=int, default=1)
+    p.add_argument('--visibility-timeout', type=float, default=600, help='giây trước khi task đang lease được giao lại')
+    p.add_argument('--shard-size', type=int, default=50000, help='số đánh giá mỗi shard kết quả')
+    p.add_argument('--product-index', help='ghi sản phẩm đã crawl xong vào chỉ mục này (cùng file với enqueue)')
+    p.set_defaults(func=work)
+
+    p = commands.add_parser('status', help='thống kê task theo trạng thái')
+    p.add_argument('--retry-failed', action='store_true', help='đưa task failed về hàng đợi')
+    p.set_defaults(func=status)
+
+    p = commands.add_parser('export-shard', help='chép task của một shard sang file hàng đợi khác (cho máy khác)')
+    p.add_argument('--shard', type=int, required=True)
+    p.add_argument('--shards', type=int, required=True)
+    p.add_argument('--output', required=True)
+    p.set_defaults(func=export_shard)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import os
+
+from utils.snapshot_merge import MERGED_DIR, SnapshotMerger
+from utils.text_normalize import normalize_csv
+
+
+def merge_snapshots(folder_path="data", normalize=True, output_dir=None):
+    """Gộp tăng dần các snapshot trong folder_path: chỉ snapshot mới được đọc, trùng khóa thì giữ bản mới hơn
+
+    File CSV được ghi vào output_dir (mặc định <folder_path>/merged/).
+    """
+    output_dir = output_dir or os.path.join(folder_path, MERGED_DIR)
+    for kind in ('reviews', 'products'):
+        merger = SnapshotMerger(kind, folder_path)
+        stats = merger.merge()
+        if stats:
+            merged_path = merger.export_csv(os.path.join(output_dir, f"merged_tiki_{kind}.csv"))
+            # Chuẩn hóa văn bản (NFC, bỏ HTML, teencode...) -> merged_tiki_{kind}_clean.csv
+            if merged_path and normalize:
+                columns = ('title', 'content') if kind == 'reviews' else ('name', 'short_description')
+                normalize_csv(merged_path, columns=columns)
+        else:
+            print(f"Không có snapshot {kind} mới cần gộp.")
+        print(f"📦 merged_tiki_{kind}: {len(merger)} bản ghi")
+        merger.close()
+
+
+if __name__ == '__main__':
+    # Thư mục chứa các snapshot tiki_reviews_* / tiki_products_*
+    merge_snapshots("data")
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+# Cho phép import các module ở thư mục gốc (tiki_sentiment_scraper, utils, benchmarks...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_tiki_server import MockTikiServer, TikiFixtures  # noqa: E402
+
+# Bỏ giới hạn tốc độ phía client để test chạy nhanh
+UNLIMITED_RATES = {'products': 1e6, 'reviews': 1e6, 'search': 1e6, 'category': 1e6, 'default': 1e6}
+
+
+@pytest.fixture
+def unlimited_rates():
+    """Giới hạn tốc độ không chặn, cho test tự dựng scraper / ApiClient / worker"""
+    return dict(UNLIMITED_RATES)
+
+
+@pytest.fixture(scope='session')
+def tiki_fixtures(tmp_path_factory):
+    """Dữ liệu tổng hợp: 120 sản phẩm 'Sản phẩm i' trong 10 danh mục, mỗi sản phẩm 45 đánh giá"""
+    return TikiFixtures(str(tmp_path_factory.mktemp('empty')), synthetic_reviews=45, synthetic_products=120)
+
+
+@pytest.fixture
+def mock_server(tiki_fixtures):
+    with MockTikiServer(tiki_fixtures) as server:
+        yield server
+
+
+@pytest.fixture
+def make_scraper(mock_server):
+    """Tạo TikiSentimentScraper trỏ vào server giả lập"""
+    from tiki_sentiment_scraper import TikiSentimentScraper
+
+    def make(**kwargs):
+        kwargs.setdefault('rate_limits', UNLIMITED_RATES)
+        kwargs.setdefault('max_workers', 4)
+        return TikiSentimentScraper(base_url=mock_server.url, **kwargs)
+
+    return make
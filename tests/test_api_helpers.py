@@ -0,0 +1,91 @@
+import email.utils
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+import requests
+
+from benchmarks.mock_tiki_server import MockTikiServer
+from utils.api_helpers import ApiClient, RateLimiter, TokenBucket, parse_retry_after
+
+
+def test_token_bucket_limits_rate_after_burst():
+    bucket = TokenBucket(rate=20, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # 2 token có sẵn, 4 token còn lại cần ~4/20 giây
+    assert time.monotonic() - start >= 0.18
+
+
+def test_token_bucket_throttle_halves_rate_and_blocks():
+    bucket = TokenBucket(rate=10, min_rate=1)
+    bucket.on_throttle(retry_after=0.3)
+    assert bucket.rate == 5
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.29
+
+    for _ in range(200):
+        bucket.on_success()
+    assert bucket.rate == bucket.max_rate
+
+
+def test_token_bucket_rate_never_below_min_rate():
+    bucket = TokenBucket(rate=4, min_rate=1)
+    for _ in range(10):
+        bucket.on_throttle()
+    assert bucket.rate == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('không phải ngày') is None
+    http_date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= parse_retry_after(http_date) <= 31
+
+
+def _client(**kwargs):
+    return ApiClient(limiter=RateLimiter({'default': 1e6}), backoff_base=0.01, **kwargs)
+
+
+def test_client_honours_retry_after(tiki_fixtures):
+    with MockTikiServer(tiki_fixtures, throttle_rate=1.0, retry_after=1) as server:
+        client = _client(max_retries=2)
+        start = time.monotonic()
+        with pytest.raises(requests.exceptions.HTTPError) as error:
+            client.get(f"{server.url}/api/v2/products/1000")
+        assert error.value.response.status_code == 429
+        assert time.monotonic() - start >= 1.0
+        assert server.stats[('products', 429)] == 2
+
+
+def test_client_retries_server_errors(tiki_fixtures):
+    with MockTikiServer(tiki_fixtures, error_rate=0.5, seed=3) as server:
+        client = _client(max_retries=10)
+        for product_id in range(1000, 1010):
+            assert client.get_json(f"{server.url}/api/v2/products/{product_id}")['id'] == product_id
+        assert server.stats[('products', 500)] > 0
+
+
+def test_client_times_out(tiki_fixtures):
+    with MockTikiServer(tiki_fixtures, latency=0.5) as server:
+        client = _client(max_retries=2, timeout=0.1)
+        with pytest.raises(requests.exceptions.Timeout):
+            client.get(f"{server.url}/api/v2/products/1000")
+
+
+def test_client_sends_once_without_retries(mock_server):
+    response = _client(max_retries=0).get(f"{mock_server.url}/api/v2/products/1000")
+    assert response.json()['id'] == 1000
+
+
+def test_default_client_is_created_lazily():
+    # Chạy trong process riêng: import module không được tạo session
+    code = ('import utils.api_helpers as a; assert a._default_client is None; '
+            'assert a.session is a.default_client().session')
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
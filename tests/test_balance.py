@@ -0,0 +1,70 @@
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from utils.balance import StreamingBalancer, _split_sizes, balance_dataframe, compute_targets
+
+
+def _records(n=3000):
+    labels = ['positive'] * 6 + ['neutral'] * 1 + ['negative'] * 3
+    return [{'review_id': i, 'product_id': i % 37, 'sentiment': labels[i % 10]} for i in range(n)]
+
+
+def test_compute_targets():
+    counts = {'positive': 600, 'neutral': 100, 'negative': 300}
+    assert compute_targets(counts) == {'negative': 100, 'neutral': 100, 'positive': 100}
+    assert compute_targets(counts, {'positive': 2, 'neutral': 1, 'negative': 1}) == \
+        {'negative': 100, 'neutral': 100, 'positive': 200}
+    assert compute_targets(counts, {'positive': 1, 'neutral': 0, 'negative': 1}) == \
+        {'negative': 300, 'positive': 300}
+    assert compute_targets({}) == {}
+
+
+def _sample(balancer, records):
+    return list(balancer.sample(lambda: iter(records)))
+
+
+@pytest.mark.parametrize('ratios', [None, {'positive': 2, 'neutral': 1, 'negative': 1}])
+def test_streaming_balancer_exact_ratios_and_splits(ratios):
+    records = _records()
+    result = _sample(StreamingBalancer(seed=1, ratios=ratios), records)
+    targets = compute_targets(Counter(r['sentiment'] for r in records), ratios)
+
+    assert Counter(r['sentiment'] for _, r in result) == targets
+    assert len({r['review_id'] for _, r in result}) == len(result)
+    for cls, n in targets.items():
+        splits = Counter(split for split, r in result if r['sentiment'] == cls)
+        assert splits == {k: v for k, v in _split_sizes(n, {'train': 0.8, 'val': 0.1, 'test': 0.1}).items() if v}
+
+
+def test_streaming_balancer_is_reproducible():
+    records = _records()
+    first = _sample(StreamingBalancer(seed=7), records)
+    assert _sample(StreamingBalancer(seed=7), records) == first
+    assert _sample(StreamingBalancer(seed=8), records) != first
+
+
+def test_per_product_cap_samples_within_each_product():
+    records = _records()
+    result = _sample(StreamingBalancer(seed=3, per_product_cap=2), records)
+    per_group = Counter((r['product_id'], r['sentiment']) for _, r in result)
+    assert max(per_group.values()) <= 2
+
+    # Không chỉ lấy các bản ghi đầu tiên của mỗi sản phẩm/lớp
+    firsts = {}
+    for r in records:
+        firsts.setdefault((r['product_id'], r['sentiment']), []).append(r['review_id'])
+    picked_rank = [firsts[(r['product_id'], r['sentiment'])].index(r['review_id']) for _, r in result]
+    assert max(picked_rank) > 1
+    assert _sample(StreamingBalancer(seed=3, per_product_cap=2), records) == result
+
+
+def test_balance_dataframe_cap_is_seeded_sample():
+    df = pd.DataFrame(_records())
+    a = balance_dataframe(df, seed=5, per_product_cap=3)
+    assert a.equals(balance_dataframe(df, seed=5, per_product_cap=3))
+    assert a['sentiment'].value_counts().nunique() == 1
+    assert a.groupby(['product_id', 'sentiment']).size().max() <= 3
+    first_three = df.groupby(['product_id', 'sentiment']).head(3)['review_id']
+    assert not set(a['review_id']) <= set(first_three)
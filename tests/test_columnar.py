@@ -0,0 +1,51 @@
+import os
+
+import pandas as pd
+
+from utils.columnar import apply_review_dtypes, convert_snapshots, read_parquet, save_parquet
+
+
+def _reviews():
+    return pd.DataFrame({
+        'review_id': [1, 2, None, 4], 'product_id': [10, 10, 11, None], 'rating': [5, 1, 3, 4],
+        'content': ['a', 'b', 'c', 'd'], 'is_verified': ['True', 'false', 'true', '1'],
+        'created_at': [1700000000, 1700000100, None, 1700000200],
+        'sentiment': ['positive', 'negative', 'neutral', 'positive'],
+    })
+
+
+def _products():
+    return pd.DataFrame({'product_id': [10, 11, None], 'price': [1000, 2000, 3000],
+                         'rating_average': [4.5, 3.0, 1.0], 'category_name': ['Tai nghe', '', 'X']})
+
+
+def test_rows_without_keys_are_dropped():
+    df = apply_review_dtypes(_reviews())
+    assert df['review_id'].tolist() == [1, 2]
+    assert str(df['review_id'].dtype) == 'int64' and str(df['rating'].dtype) == 'int8'
+    assert df['is_verified'].tolist() == [True, False]
+    assert isinstance(df['sentiment'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df['created_at'])
+
+
+def test_parquet_partitions_and_dtypes(tmp_path):
+    paths = save_parquet(_reviews(), _products(), str(tmp_path), snapshot='2025-04-01')
+    reviews_path = paths['reviews_parquet']
+    # pyarrow mã hóa URL tên phân vùng
+    assert os.path.isdir(os.path.join(reviews_path, 'snapshot=2025-04-01', 'category_name=Tai%20nghe'))
+    assert len(read_parquet(reviews_path, filters=[('category_name', '=', 'Tai nghe')])) == 2
+
+    reviews = read_parquet(reviews_path, columns=['review_id', 'rating', 'product_id'])
+    assert sorted(reviews['review_id']) == [1, 2]
+    assert str(reviews['rating'].dtype) == 'int8'
+    products = read_parquet(paths['products_parquet'], filters=[('category_name', '=', 'unknown')])
+    assert products['product_id'].tolist() == [11]
+
+
+def test_convert_snapshots_uses_snapshot_date(tmp_path):
+    _reviews().to_csv(tmp_path / 'tiki_reviews_20250402_122639.csv', index=False)
+    _products().to_csv(tmp_path / 'tiki_products_20250402_122639.csv', index=False)
+    out = tmp_path / 'out'
+    assert len(convert_snapshots(str(tmp_path), str(out))) == 1
+    assert os.path.isdir(out / 'tiki_reviews.parquet' / 'snapshot=2025-04-02')
+    assert os.path.isdir(out / 'tiki_products.parquet' / 'snapshot=2025-04-02')
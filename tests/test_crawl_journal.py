@@ -0,0 +1,52 @@
+from utils.crawl_journal import CrawlJournal
+
+PRODUCT_ID = '1003'
+
+
+def _review_requests(server):
+    return server.stats[('reviews', 200)]
+
+
+def test_resume_fetches_only_missing_pages(tmp_path, mock_server, make_scraper):
+    journal = CrawlJournal(str(tmp_path / 'journal.sqlite'))
+
+    # Lần chạy đầu bị dừng sau trang 1 (45 đánh giá = 3 trang)
+    make_scraper(journal=journal)._fetch_reviews_page(PRODUCT_ID, 1)
+    assert _review_requests(mock_server) == 1
+    assert not journal.get_product(PRODUCT_ID)[1]
+
+    info, reviews = make_scraper(journal=journal, page_workers=1)._crawl_product(PRODUCT_ID, 100)
+    assert _review_requests(mock_server) == 3
+    assert len(reviews) == 45
+    assert len({r['review_id'] for r in reviews}) == 45
+    assert journal.get_product(PRODUCT_ID)[1]
+
+    # Sản phẩm đã xong: đọc lại từ nhật ký, không gửi request nào
+    products_before = mock_server.stats[('products', 200)]
+    info_again, reviews_again = make_scraper(journal=journal)._crawl_product(PRODUCT_ID, 100)
+    assert info_again == info
+    assert [r['review_id'] for r in reviews_again] == [r['review_id'] for r in reviews]
+    assert _review_requests(mock_server) == 3
+    assert mock_server.stats[('products', 200)] == products_before
+
+
+def test_frontier_is_replayed_from_journal(tmp_path, mock_server, make_scraper):
+    journal = CrawlJournal(str(tmp_path / 'journal.sqlite'))
+    first = list(make_scraper(journal=journal).discover_products(['sản phẩm 1'], limit_per_keyword=30))
+    searches = mock_server.stats[('search', 200)]
+
+    again = list(make_scraper(journal=journal).discover_products(['sản phẩm 1'], limit_per_keyword=30))
+    assert mock_server.stats[('search', 200)] == searches
+    # Summary được giữ nguyên (rating_average, review_count), không chỉ ID
+    assert again == first
+    assert all(isinstance(p, dict) and 'review_count' in p for p in again)
+
+
+def test_reset_clears_progress(tmp_path):
+    journal = CrawlJournal(str(tmp_path / 'journal.sqlite'))
+    journal.save_review_page('1', 1, [{'id': 1}], 1)
+    journal.mark_frontier_done('search', 'a', ['1'])
+    journal.reset()
+    assert journal.get_review_page('1', 1) is None
+    assert journal.get_frontier('search', 'a') is None
+
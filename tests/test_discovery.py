@@ -0,0 +1,88 @@
+import pytest
+
+
+def _ids(products):
+    return [int(p['product_id'] if isinstance(p, dict) else p) for p in products]
+
+
+@pytest.mark.parametrize('limit', [1, 40, 50, 95, 500])
+def test_search_returns_first_results_in_order(make_scraper, limit):
+    # 'sản phẩm' khớp cả 120 sản phẩm, theo thứ tự 1000, 1001, ...
+    products = make_scraper().search_products('sản phẩm', limit=limit)
+    assert _ids(products) == list(range(1000, 1000 + min(limit, 120)))
+
+
+def test_search_always_requests_full_pages(mock_server, make_scraper):
+    requested = []
+    scraper = make_scraper()
+    get_json = scraper.client.get_json
+
+    def recording_get_json(url, params=None, endpoint='default'):
+        requested.append(dict(params))
+        return get_json(url, params=params, endpoint=endpoint)
+
+    scraper.client.get_json = recording_get_json
+
+    scraper.search_products('sản phẩm', limit=50)
+    assert [(p['page'], p['limit']) for p in requested] == [(1, 40), (2, 40)]
+
+
+def test_search_drops_duplicate_ids_across_pages(make_scraper):
+    scraper = make_scraper()
+    pages = {
+        1: [{'id': 1}, {'id': 2}, {'id': 2}],
+        2: [{'id': 2}, {'id': 3}, {'id': 1}],
+        3: [{'id': 4}],
+    }
+    scraper.client.get_json = lambda url, params=None, endpoint='default': {
+        'data': pages[params['page']], 'paging': {'last_page': 3}}
+
+    assert _ids(scraper.search_products('x', limit=3)) == [1, 2, 3]
+    assert _ids(scraper.search_products('x', limit=10)) == [1, 2, 3, 4]
+
+
+def test_discover_products_dedupes_across_keywords(make_scraper):
+    products = list(make_scraper().discover_products(['sản phẩm 1', 'Sản  phẩm 11', 'sản phẩm 11'],
+                                                     limit_per_keyword=200))
+    ids = _ids(products)
+    assert len(ids) == len(set(ids))
+    # 'sản phẩm 1' khớp 1, 10-19, 100-119
+    assert sorted(ids) == sorted(1000 + i for i in [1, *range(10, 20), *range(100, 120)])
+
+
+# Danh mục 1000 ('Danh mục 0') gồm các sản phẩm 1000, 1010, ..., 1110
+CATEGORY_URL = 'danh-muc-0/c1000'
+CATEGORY_IDS = [str(1000 + 10 * i) for i in range(12)]
+
+
+@pytest.mark.parametrize('limit', [3, 5, 7, 12, 100])
+def test_category_listing_returns_first_products_in_order(make_scraper, limit):
+    scraper = make_scraper()
+    scraper.search_page_size = 5
+    assert scraper.get_product_ids_by_category(CATEGORY_URL, limit=limit) == CATEGORY_IDS[:limit]
+
+
+def test_category_html_fallback_pages(make_scraper, monkeypatch):
+    scraper = make_scraper()
+
+    def no_listing(category_url, limit):
+        raise ValueError('listing API không dùng được')
+        yield
+
+    monkeypatch.setattr(scraper, '_iter_category_listing_pages', no_listing)
+    assert scraper.get_product_ids_by_category(CATEGORY_URL, limit=100) == CATEGORY_IDS
+
+
+def test_category_html_stops_when_page_is_ignored(make_scraper, monkeypatch):
+    scraper = make_scraper()
+    requests_made = []
+    html = ('<div data-view-id="product_list_container">'
+            '<div data-id="1"></div><div data-id="2"></div><div data-id="1"></div></div>')
+
+    def same_page(url, params=None, endpoint='default'):
+        requests_made.append(params['page'])
+        return html
+
+    monkeypatch.setattr(scraper.client, 'get_text', same_page)
+    assert list(scraper._iter_category_html_pages(CATEGORY_URL, 1000)) == [['1', '2']]
+    assert requests_made == [1, 2]
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import http_cache
+from utils.api_helpers import ApiClient, RateLimiter
+from utils.http_cache import ENRICH_TTLS, OfflineCacheMiss, ResponseCache
+
+URL = 'https://tiki.vn/api/v2/products/1'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Đồng hồ giả cho http_cache (clock.now tăng tay)"""
+    class Clock:
+        now = 1_000_000.0
+    monkeypatch.setattr(http_cache, 'time', SimpleNamespace(time=lambda: Clock.now))
+    return Clock
+
+
+def test_cache_expires_after_endpoint_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    cache.set(URL, {'b': 2, 'a': 1}, 'products', b'body')
+    # Khóa không phụ thuộc thứ tự params
+    assert cache.get(URL, {'a': 1, 'b': 2}, 'products') == b'body'
+
+    clock.now += cache.ttl('products') + 1
+    assert cache.get(URL, {'a': 1, 'b': 2}, 'products') is None
+
+
+def test_enrichment_accepts_older_product_responses(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite')
+    ResponseCache(path).set(URL, None, 'products', b'body')
+    clock.now += 2 * 3600
+
+    assert ResponseCache(path).get(URL, None, 'products') is None
+    assert ResponseCache(path, ttls=ENRICH_TTLS).get(URL, None, 'products') == b'body'
+
+
+def test_reviews_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    cache.set(URL, None, 'reviews', b'body')
+    assert cache.get(URL, None, 'reviews') is None
+
+
+def test_recording_cache_stores_reviews_for_replay_only(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), record=True)
+    cache.set(URL, None, 'reviews', b'body')
+    # Online vẫn tải mới trang đánh giá, offline thì phát lại
+    assert cache.get(URL, None, 'reviews') is None
+    assert ResponseCache(str(tmp_path / 'cache.sqlite'), offline=True).get(URL, None, 'reviews') == b'body'
+
+
+def test_lru_eviction_keeps_size_bounded(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=250)
+    for i in range(5):
+        clock.now += 1
+        cache.set(f"{URL}{i}", None, 'products', b'x' * 100)
+    assert cache.total_bytes <= 250
+    assert cache.get(f"{URL}4", None, 'products') == b'x' * 100
+    assert cache.get(f"{URL}0", None, 'products') is None
+
+
+def test_offline_mode_replays_cache_and_never_hits_network(tmp_path, mock_server, clock, unlimited_rates):
+    path = str(tmp_path / 'cache.sqlite')
+    url = f"{mock_server.url}/api/v2/products/1000"
+    limiter = RateLimiter(unlimited_rates)
+
+    online = ApiClient(limiter=limiter, cache=ResponseCache(path))
+    assert online.get_json(url, endpoint='products')['id'] == 1000
+    assert online.get_json(url, endpoint='products')['id'] == 1000
+    assert mock_server.stats[('products', 200)] == 1
+
+    # Offline dùng cache bất kể TTL, thiếu thì báo OfflineCacheMiss thay vì gửi request
+    clock.now += 30 * 24 * 3600
+    offline = ApiClient(limiter=limiter, cache=ResponseCache(path, offline=True))
+    assert offline.get_json(url, endpoint='products')['id'] == 1000
+    with pytest.raises(OfflineCacheMiss):
+        offline.get_json(f"{mock_server.url}/api/v2/products/1001", endpoint='products')
+    assert mock_server.stats[('products', 200)] == 1
+
+
+def test_recorded_crawl_replays_offline(tmp_path, mock_server, make_scraper):
+    path = str(tmp_path / 'cache.sqlite')
+    online, _ = make_scraper(cache=ResponseCache(path, record=True)).create_sentiment_dataset(
+        ['1000', '1001'], reviews_per_product=100)
+    requests_made = sum(mock_server.stats.values())
+
+    offline, _ = make_scraper(cache=ResponseCache(path, offline=True)).create_sentiment_dataset(
+        ['1000', '1001'], reviews_per_product=100)
+    assert sorted(offline['review_id']) == sorted(online['review_id'])
+    assert len(offline) == 90
+    assert sum(mock_server.stats.values()) == requests_made
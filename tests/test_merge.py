@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from merge_data import merge_snapshots
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_merge_does_not_overwrite_enriched_products(tmp_path):
+    pd.DataFrame({'review_id': [1, 2], 'product_id': [10, 10], 'title': ['a', 'b'],
+                  'content': ['hayyyy', 'ko đc'], 'rating': [5, 1]}).to_csv(
+        tmp_path / 'tiki_reviews_20250101_000000.csv', index=False)
+    pd.DataFrame({'product_id': [10], 'name': ['Sản phẩm'], 'short_description': ['']}).to_csv(
+        tmp_path / 'tiki_products_20250101_000000.csv', index=False)
+    enriched = tmp_path / 'merged_tiki_products.csv'
+    enriched.write_text('product_id,image_url\n10,http://img\n', encoding='utf-8')
+
+    merge_snapshots(str(tmp_path))
+
+    assert enriched.read_text(encoding='utf-8') == 'product_id,image_url\n10,http://img\n'
+    merged = tmp_path / 'merged'
+    assert pd.read_csv(merged / 'merged_tiki_products.csv')['product_id'].tolist() == [10]
+    clean = pd.read_csv(merged / 'merged_tiki_reviews_clean.csv').sort_values('review_id')
+    assert clean['content'].tolist() == ['hay', 'không được']
+
+
+def test_imports_have_no_side_effects(tmp_path):
+    code = ('import os, sys\n'
+            'import tiki_sentiment_scraper\n'
+            'assert "numpy" not in sys.modules\n'
+            'import update_data\n'
+            'assert update_data.client is None\n'
+            'assert not os.path.exists(".cache")\n')
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env, check=True)
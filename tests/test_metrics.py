@@ -0,0 +1,68 @@
+import math
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import CrawlMetrics, Histogram, profiling
+
+
+def test_histogram_quantiles():
+    h = Histogram(buckets=(0.1, 1.0, math.inf))
+    assert h.quantile(0.5) == 0.0
+    for value in [0.05] * 90 + [0.5] * 9 + [100]:
+        h.observe(value)
+
+    assert h.counts == [90, 9, 1] and h.count == 100
+    assert h.quantile(0.5) == 0.1
+    assert h.quantile(0.95) == 1.0
+    assert h.quantile(1.0) == math.inf
+
+
+def test_to_prometheus_escapes_labels():
+    metrics = CrawlMetrics()
+    metrics.inc('tiki_errors_total', message='lỗi "503"\nC:\\tmp')
+    metrics.observe('tiki_request_seconds', 0.2, endpoint='reviews')
+    text = metrics.to_prometheus()
+
+    assert 'tiki_errors_total{message="lỗi \\"503\\"\\nC:\\\\tmp"} 1' in text
+    assert '# TYPE tiki_request_seconds histogram' in text
+    assert 'tiki_request_seconds_bucket{endpoint="reviews",le="0.25"} 1' in text
+    assert 'tiki_request_seconds_bucket{endpoint="reviews",le="+Inf"} 1' in text
+    assert 'tiki_request_seconds_count{endpoint="reviews"} 1' in text
+    # Mỗi mẫu nằm trên đúng một dòng
+    assert all(line.startswith(('#', 'tiki_')) for line in text.splitlines())
+
+
+class _Worker:
+    def get_product_info(self, product_id):
+        return {'id': product_id}
+
+    def get_reviews(self, n):
+        yield from range(n)
+
+
+def test_instrument_times_methods_and_generators():
+    metrics = CrawlMetrics()
+    calls = []
+    metrics.add_hook(lambda method, seconds: calls.append(method))
+    worker = metrics.instrument(_Worker())
+
+    assert worker.get_product_info(1) == {'id': 1}
+    assert list(worker.get_reviews(3)) == [0, 1, 2]
+    assert worker.get_product_info.__name__ == 'get_product_info'
+    assert calls == ['get_product_info', 'get_reviews']
+    for method in ('get_product_info', 'get_reviews'):
+        assert metrics.histograms[('tiki_method_seconds', (('method', method),))].count == 1
+
+
+def _busy_worker_task(n):
+    return sum(i * i for i in range(n))
+
+
+def test_profiling_includes_worker_threads(tmp_path):
+    path = str(tmp_path / 'crawl.prof')
+    with profiling(path):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert sum(executor.map(_busy_worker_task, [1000] * 4)) > 0
+
+    functions = {func for _, _, func in pstats.Stats(path).stats}
+    assert '_busy_worker_task' in functions
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from tiki_crawl import main
+from utils.near_dup import (NearDuplicateDetector, annotate_dataframe, make_permutations, minhash,
+                            review_text, shingles)
+from utils.shards import iter_shard_records
+
+BASE = ("sản phẩm dùng rất tốt, pin trâu, giao hàng nhanh, đóng gói cẩn thận, "
+        "shop tư vấn nhiệt tình, sẽ ủng hộ shop lần sau")
+
+
+def _jaccard(a, b, size=5):
+    sa, sb = set(shingles(a, size).tolist()), set(shingles(b, size).tolist())
+    return len(sa & sb) / len(sa | sb)
+
+
+def test_minhash_estimates_jaccard():
+    permutations = make_permutations(256, seed=3)
+    a, b = BASE, BASE.replace('giao hàng nhanh', 'giao hàng hơi chậm')
+    estimate = np.mean(minhash(shingles(a), permutations) == minhash(shingles(b), permutations))
+    assert abs(estimate - _jaccard(a, b)) < 0.1
+    assert len(shingles('abc')) == 1
+    assert review_text({'title': 'Hài lòng  QUÁ', 'content': ' hài lòng'}) == 'hài lòng quá'
+
+
+def test_assign_clusters_near_and_exact_duplicates():
+    detector = NearDuplicateDetector()
+    near = BASE + ' nhé'
+    assert detector.assign(BASE) == (0, False)
+    assert detector.assign(near) == (0, True)
+    assert detector.assign(BASE) == (0, True)
+    assert detector.assign('hàng giả, không giống mô tả, rất thất vọng') == (1, False)
+    assert detector.assign('') == (-1, False)
+
+
+def test_max_clusters_evicts_oldest():
+    texts = [f"đánh giá số {i}: " + "abcdefghijklmnopqrstuvwxyz"[i:] + f" {i * 7919}" for i in range(6)]
+    detector = NearDuplicateDetector(max_clusters=3)
+    ids = [detector.assign(text)[0] for text in texts]
+
+    assert ids == list(range(6))
+    assert list(detector.leaders) == [3, 4, 5]
+    assert len(detector.exact) <= 12
+    assert all(set(band.values()) <= {3, 4, 5} for band in detector.buckets)
+    # Cụm còn giữ vẫn nhận bản trùng, cụm đã loại mở cụm mới
+    assert detector.assign(texts[5]) == (5, True)
+    assert detector.assign(texts[0] + '!')[0] == 6
+
+
+def test_annotate_dataframe_and_processes():
+    df = pd.DataFrame({'title': ['', 'Tuyệt', '', 'Quá tệ'],
+                       'content': [BASE, BASE + ' nhé', 'hàng giả, không giống mô tả', 'Quá tệ'],
+                       'rating': [5, 5, 1, 1]})
+    annotated = annotate_dataframe(df)
+
+    assert annotated['dup_cluster'].tolist() == [0, 0, 1, 2]
+    assert annotated['is_near_duplicate'].tolist() == [False, True, False, False]
+    assert annotated['dup_weight'].tolist() == [0.5, 0.5, 1.0, 1.0]
+
+    records = df.to_dict('records') * 3
+    serial = [c for _, c, _ in NearDuplicateDetector().iter_clusters(records, batch_size=2)]
+    parallel = [c for _, c, _ in NearDuplicateDetector().iter_clusters(records, batch_size=2, processes=2)]
+    assert serial == parallel == [0, 0, 1, 2] * 3
+
+
+def test_dedup_command(tmp_path):
+    pd.DataFrame({'review_id': [1, 2, 3], 'product_id': [10, 11, 10], 'title': ['', '', ''],
+                  'content': [BASE, BASE + ' nhé', 'hàng giả, không giống mô tả'],
+                  'rating': [5, 5, 1]}).to_csv(tmp_path / 'tiki_reviews_20250101_000000.csv', index=False)
+    main(['--data-dir', str(tmp_path), 'merge', '--no-normalize'])
+    main(['--data-dir', str(tmp_path), 'dedup', '--drop'])
+
+    kept = list(iter_shard_records(str(tmp_path / 'dedup_tiki_reviews_*')))
+    assert sorted(r['review_id'] for r in kept) == [1, 3]
+    assert not any(r['is_near_duplicate'] for r in kept)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from utils.price_history import MISSING, PriceHistory, _delta_decode, _delta_encode
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_delta_encoding_round_trip(seed):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 6, size=50)
+    starts = np.concatenate([[0], np.cumsum(counts)]).astype('int64')
+    values = rng.integers(-2 ** 40, 2 ** 40, size=starts[-1])
+    values[rng.random(len(values)) < 0.1] = MISSING
+
+    encoded = _delta_encode(values, starts)
+    np.testing.assert_array_equal(_delta_decode(encoded, starts), values)
+
+
+def test_delta_encoding_uses_small_dtypes():
+    starts = np.array([0, 3, 3, 6], dtype='int64')
+    prices = np.array([100000, 100050, 99990, 250000, 250000, 249900], dtype='int64')
+    encoded = _delta_encode(prices, starts)
+    assert encoded.dtype == np.int32
+    np.testing.assert_array_equal(_delta_decode(encoded, starts), prices)
+    assert _delta_encode(np.zeros(0, dtype='int64'), np.zeros(1, dtype='int64')).dtype == np.int8
+
+
+def _brute_force(snapshots, product_id, when):
+    """Giá của snapshot mới nhất <= when (snapshot thêm sau thắng nếu trùng thời điểm)"""
+    best = None
+    for timestamp, records in snapshots:
+        for record in records:
+            if record['product_id'] == product_id and timestamp <= when \
+                    and (best is None or timestamp >= best[0]):
+                best = (timestamp, record['price'])
+    return best
+
+
+def test_as_of_matches_brute_force_after_reload(tmp_path):
+    rng = np.random.default_rng(0)
+    history = PriceHistory(str(tmp_path / 'history'))
+    snapshots = []
+    times = sorted(rng.choice(np.arange(1_700_000_000, 1_700_100_000, 600), size=12, replace=False).tolist())
+    # Thêm không theo thứ tự thời gian, có một snapshot trùng thời điểm (bản thêm sau thắng)
+    for timestamp in rng.permutation(times).tolist() + [times[5]]:
+        products = rng.choice(np.arange(1, 30), size=15, replace=False)
+        records = [{'product_id': int(p), 'price': int(rng.integers(1000, 500000))} for p in products]
+        history.add_snapshot(records, timestamp)
+        snapshots.append((timestamp, records))
+    history.save()
+
+    reloaded = PriceHistory(str(tmp_path / 'history'))
+    product_ids = np.arange(0, 32)
+    for when in [times[0] - 1, times[0], times[5], times[5] + 1, times[-1], times[-1] + 10 ** 6]:
+        result = reloaded.as_of(when, product_ids, fields=['price'])
+        for product_id, time_used, price in zip(product_ids, result['time'], result['price']):
+            expected = _brute_force(snapshots, int(product_id), when)
+            if expected is None:
+                assert time_used == -1 and np.isnan(price)
+            else:
+                assert (time_used, price) == expected
+
+    # Mỗi sản phẩm một thời điểm riêng
+    whens = rng.integers(times[0] - 100, times[-1] + 100, size=len(product_ids))
+    result = reloaded.as_of(whens, product_ids, fields=['price'])
+    for product_id, when, price in zip(product_ids, whens, result['price']):
+        expected = _brute_force(snapshots, int(product_id), int(when))
+        assert np.isnan(price) if expected is None else price == expected[1]
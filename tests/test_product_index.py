@@ -0,0 +1,44 @@
+from utils.product_index import ProductIndex
+
+KEYWORD = 'sản phẩm 1'
+
+
+def _discover(scraper, limit=30):
+    return list(scraper.discover_products([KEYWORD], limit_per_keyword=limit))
+
+
+def test_product_index_skip_is_opt_in(tmp_path, make_scraper):
+    index = ProductIndex(str(tmp_path / 'product_index.sqlite'))
+    first = _discover(make_scraper(product_index=index))
+    for product in first:
+        index.update(product)
+    index.save()
+
+    # Mặc định chỉ ghi nhận, không bỏ qua sản phẩm nào
+    assert len(_discover(make_scraper(product_index=index))) == len(first)
+    assert _discover(make_scraper(product_index=index, skip_unchanged=True)) == []
+
+
+def test_failed_review_fetch_is_not_indexed(tmp_path, mock_server, make_scraper):
+    index = ProductIndex(str(tmp_path / 'product_index.sqlite'))
+    scraper = make_scraper(product_index=index)
+    scraper.client.max_retries = 1
+    products = _discover(scraper, limit=3)
+
+    # Server lỗi khi lấy đánh giá: sản phẩm không được ghi vào chỉ mục
+    mock_server.error_rate = 1.0
+    for product in products:
+        info, reviews = scraper._crawl_product(product['product_id'], 100, summary=product)
+        assert info is not None and len(reviews) == 0
+    index.save()
+    assert all(index.get(product['product_id']) is None for product in products)
+
+    # Lần chạy sau crawl lại các sản phẩm đó, xong mới bỏ qua
+    mock_server.error_rate = 0.0
+    scraper = make_scraper(product_index=index, skip_unchanged=True)
+    again = _discover(scraper, limit=3)
+    assert again == products
+    for product in again:
+        assert len(scraper._crawl_product(product['product_id'], 100, summary=product)[1]) == 45
+    index.save()
+    assert _discover(make_scraper(product_index=index, skip_unchanged=True), limit=3) == []
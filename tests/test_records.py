@@ -0,0 +1,30 @@
+import numpy as np
+
+from utils.records import REVIEW_FIELDS, ReviewColumns, sentiment_from_rating
+
+
+def _review(review_id, rating, **kw):
+    return dict({'id': review_id, 'title': 't', 'content': 'c', 'rating': rating, 'created_at': 1,
+                 'created_by': {'name': 'A'}, 'product_id': 7}, **kw)
+
+
+def test_sentiment_from_rating():
+    assert sentiment_from_rating([1, 2, 3, 4, 5]).tolist() == \
+        ['negative', 'negative', 'neutral', 'positive', 'positive']
+    assert sentiment_from_rating(np.zeros(0, dtype=np.int64)).tolist() == []
+
+
+def test_reviews_without_rating_are_skipped():
+    raw = [_review(1, 5), _review(2, None), {'id': 3, 'content': 'không có rating'}, _review(4, 2)]
+    columns = ReviewColumns(raw)
+    assert columns.columns['review_id'] == [1, 4]
+    assert columns.sentiment().tolist() == ['positive', 'negative']
+
+
+def test_to_frame_dtypes():
+    df = ReviewColumns([_review(1, 5, number_of_likes=3), _review(2, 3, created_by=None)]).to_frame()
+    assert list(df.columns) == list(REVIEW_FIELDS) + ['sentiment']
+    assert all(df[c].dtype == np.int64 for c in ('rating', 'number_of_likes', 'number_of_replies'))
+    assert df['number_of_likes'].tolist() == [3, 0]
+    assert df['customer_name'].tolist() == ['A', '']
+    assert df['sentiment'].tolist() == ['positive', 'neutral']
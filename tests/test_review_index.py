@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from utils.review_index import ReviewIndex, decode_varints, encode_varints, terms_of, varint_sizes
+
+EDGES = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 32 - 1, 2 ** 32, 2 ** 63, 2 ** 64 - 1]
+
+
+def test_varint_known_bytes():
+    assert encode_varints([0, 127, 128, 300]).tolist() == [0x00, 0x7F, 0x80, 0x01, 0xAC, 0x02]
+    assert varint_sizes(EDGES).tolist() == [1, 1, 1, 2, 2, 2, 3, 5, 5, 10, 10]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_varint_round_trip(seed):
+    rng = np.random.default_rng(seed)
+    values = (rng.integers(0, 2 ** 63, size=1000, dtype=np.uint64) >> rng.integers(0, 63, size=1000).astype(np.uint64))
+    values = np.concatenate([values, np.asarray(EDGES, dtype=np.uint64)])
+    encoded = encode_varints(values)
+    assert len(encoded) == varint_sizes(values).sum()
+    np.testing.assert_array_equal(decode_varints(encoded), values)
+    assert len(decode_varints(encode_varints([]))) == 0
+
+
+def _brute_force(reviews, phrase):
+    words = phrase.split()
+    wanted = {' '.join(pair) for pair in zip(words, words[1:])} or set(words)
+    return sorted(i for i, r in enumerate(reviews) if wanted <= terms_of(f"{r['title']} {r['content']}"))
+
+
+def test_search_matches_brute_force_across_segments(tmp_path, make_scraper):
+    reviews_df, _ = make_scraper(max_workers=8).create_sentiment_dataset(
+        [str(1000 + i) for i in range(8)], reviews_per_product=100)
+    reviews = reviews_df.sort_values('review_id').to_dict('records')
+
+    index = ReviewIndex(str(tmp_path / 'index'), segment_size=50)
+    assert index.add(reviews) == len(reviews)
+    assert index.add(reviews) == 0
+    assert len(index.segments) > 1
+
+    phrases = ['giao hàng', 'chất lượng', 'hàng', 'không tồn tại', 'sản phẩm tốt']
+    expected = {phrase: _brute_force(reviews, phrase) for phrase in phrases}
+    assert any(expected.values())
+
+    for current in (index, ReviewIndex(str(tmp_path / 'index'))):
+        for phrase in phrases:
+            assert current.search(phrase).tolist() == expected[phrase]
+    index.compact()
+    assert len(index.segments) == 1
+    for phrase in phrases:
+        assert index.search(phrase).tolist() == expected[phrase]
+
+    negative = index.search('hàng', sentiment='negative')
+    assert all(reviews[i]['sentiment'] == 'negative' for i in negative)
+    assert index.count(rating=5) == sum(r['rating'] == 5 for r in reviews)
+
+
+def test_edited_review_replaces_old_version(tmp_path):
+    path = str(tmp_path / 'index')
+    index = ReviewIndex(path, segment_size=2)
+    assert index.add([
+        {'review_id': 1, 'product_id': 10, 'title': '', 'content': 'giao hàng nhanh', 'rating': 5},
+        {'review_id': 2, 'product_id': 10, 'title': '', 'content': 'pin yếu', 'rating': 2},
+    ]) == 2
+    # Bản sửa của đánh giá 1 (snapshot sau), đánh giá 2 không đổi
+    assert index.add([
+        {'review_id': 1, 'product_id': 10, 'title': '', 'content': 'giao hàng chậm, hàng lỗi', 'rating': 1},
+        {'review_id': 2, 'product_id': 10, 'title': '', 'content': 'pin yếu', 'rating': 2},
+    ]) == 1
+    assert len(index) == 2
+
+    for current in (index, ReviewIndex(path)):
+        assert current.count('giao hàng nhanh') == 0
+        assert current.columns(current.search('giao hàng'))['rating'].tolist() == [1]
+        assert current.count(rating=5) == 0
+        assert sorted(current.columns(current.search())['review_id'].tolist()) == [1, 2]
+
+    index.compact()
+    assert len(index.segments) == 1 and len(index.live) == 2 and index.manifest['deleted'] == []
+    assert index.columns(index.search('hàng lỗi'))['review_id'].tolist() == [1]
+    assert index.count('pin') == 1 and index.count('nhanh') == 0
@@ -0,0 +1,41 @@
+from benchmarks.mock_tiki_server import MockTikiServer, TikiFixtures
+from tiki_sentiment_scraper import TikiSentimentScraper
+from utils.review_watermarks import ReviewWatermarks
+
+
+def test_incremental_sync_fetches_only_new_reviews(tmp_path, unlimited_rates):
+    fixtures = TikiFixtures(str(tmp_path), synthetic_reviews=45, synthetic_products=3)
+    path = str(tmp_path / 'watermarks.json')
+
+    with MockTikiServer(fixtures) as server:
+        def crawl():
+            scraper = TikiSentimentScraper(base_url=server.url, rate_limits=unlimited_rates,
+                                           watermarks=ReviewWatermarks(path))
+            reviews_df, _ = scraper.create_sentiment_dataset(['1000'], reviews_per_product=100, incremental=True)
+            scraper.watermarks.save()
+            return reviews_df
+
+        first = crawl()
+        assert len(first) == 45
+        mark = ReviewWatermarks(path).get('1000')
+        assert mark['review_id'] == first['review_id'].max()
+
+        # Chưa có đánh giá mới: chỉ đọc trang đầu
+        requests_before = server.stats[('reviews', 200)]
+        assert len(crawl()) == 0
+        assert server.stats[('reviews', 200)] == requests_before + 1
+
+        # 5 đánh giá mới ở đầu danh sách
+        fixtures.synthetic_reviews = 50
+        second = crawl()
+        assert sorted(second['review_id']) == sorted(set(range(1000 * 100000 + 46, 1000 * 100000 + 51)))
+        assert ReviewWatermarks(path).get('1000')['review_id'] == 1000 * 100000 + 50
+
+
+def test_watermarks_only_move_forward(tmp_path):
+    watermarks = ReviewWatermarks(str(tmp_path / 'watermarks.json'))
+    watermarks.update('1', [{'id': 10, 'created_at': 100}, {'id': 12, 'created_at': 120}])
+    watermarks.update('1', [{'id': 5, 'created_at': 50}])
+    assert watermarks.get('1') == {'review_id': 12, 'created_at': 120}
+    assert watermarks.is_known('1', {'id': 11, 'created_at': 110})
+    assert not watermarks.is_known('1', {'id': 13, 'created_at': 130})
@@ -0,0 +1,49 @@
+from collections import Counter
+
+from utils.scheduler import YieldScheduler
+
+QUOTAS = {'negative': 30, 'neutral': 30, 'positive': 30}
+
+
+def _products(n, rating_average=1.0, review_count=100):
+    return [{'product_id': str(i), 'rating_average': rating_average, 'review_count': review_count} for i in range(n)]
+
+
+def test_in_flight_tasks_count_against_quotas():
+    scheduler = YieldScheduler({'negative': 10, 'neutral': 0, 'positive': 0})
+    scheduler.add(_products(5))
+
+    product, budget = scheduler.next()
+    assert 10 <= budget < 100
+    # Task đang chạy được kỳ vọng là đủ quota: không phát thêm task
+    assert scheduler.next() is None
+    assert not scheduler.done()
+
+    # Sản phẩm trả về ít hơn kỳ vọng: phát task mới cho phần còn thiếu, ngân sách nhỏ hơn
+    scheduler.observe(product, None, Counter(negative=4, positive=2))
+    product, smaller_budget = scheduler.next()
+    assert smaller_budget < budget
+    scheduler.observe(product, None, Counter(negative=6))
+    assert scheduler.done()
+    assert scheduler.next() is None
+
+
+def test_zero_quota_labels_are_ignored():
+    scheduler = YieldScheduler({'negative': 0, 'neutral': 5, 'positive': 0})
+    scheduler.add(_products(3, rating_average=3.0))
+    assert scheduler.next() is not None
+
+
+def test_scheduled_crawl_stays_close_to_quotas(make_scraper):
+    scraper = make_scraper(max_workers=8)
+    # rating_average 3.0: ước lượng ban đầu (20% neutral) khớp dữ liệu giả lập (9/45 neutral)
+    products = [p for p in scraper.search_products('sản phẩm', limit=120) if p['rating_average'] == 3.0]
+    scheduler = YieldScheduler(QUOTAS)
+    reviews_df, products_df = scraper.create_sentiment_dataset(products, reviews_per_product=45, scheduler=scheduler)
+
+    counts = reviews_df['sentiment'].value_counts()
+    assert all(counts[label] >= quota for label, quota in QUOTAS.items())
+    assert scheduler.done()
+    # Mỗi sản phẩm có 9 đánh giá neutral, cần 4 sản phẩm; 8 luồng không được lấp hết cùng lúc
+    assert len(products_df) <= 5
+    assert not scheduler.in_flight
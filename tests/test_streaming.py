@@ -0,0 +1,35 @@
+from utils.shards import iter_shard_records
+
+PRODUCT_IDS = ['1000', '1001', '1002', '1003', '1004']
+
+
+def test_reviews_reach_the_sink_page_by_page(make_scraper):
+    scraper = make_scraper(page_workers=2)
+    pages = []
+    info, count = scraper._crawl_product('1000', 100, on_reviews=lambda columns: pages.append(len(columns)))
+    assert info['product_id'] == '1000'
+    assert count == 45
+    assert pages == [20, 20, 5]
+
+
+def test_iter_reviews_stops_at_limit(mock_server, make_scraper):
+    reviews = list(make_scraper(page_workers=4).iter_reviews('1000', limit=30))
+    assert len(reviews) == 30
+    # 30 đánh giá chỉ cần 2 trang
+    assert mock_server.stats[('reviews', 200)] == 2
+
+
+def test_stream_dataset_writes_every_review_once(tmp_path, make_scraper):
+    scraper = make_scraper(page_workers=3)
+    output = scraper.stream_dataset(PRODUCT_IDS, reviews_per_product=100, output_dir=str(tmp_path), shard_size=50)
+
+    reviews = list(iter_shard_records(output['reviews_shards']))
+    assert len(reviews) == 5 * 45
+    assert len({r['review_id'] for r in reviews}) == 5 * 45
+    assert len(output['reviews_shards']) == 5
+    products = list(iter_shard_records(output['products_shards']))
+    assert sorted(p['product_id'] for p in products) == PRODUCT_IDS
+
+    # Cùng kết quả với đường gom vào bộ nhớ
+    reviews_df, _ = make_scraper().create_sentiment_dataset(PRODUCT_IDS, reviews_per_product=100)
+    assert set(reviews_df['review_id']) == {r['review_id'] for r in reviews}
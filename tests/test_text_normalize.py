@@ -0,0 +1,32 @@
+import pytest
+
+from utils.text_normalize import AMBIGUOUS_TEENCODE, DEFAULT_TEENCODE, TextNormalizer
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('quááá!!!!', 'quá!'),
+    ('ko đc  <b>sp</b> tốt', 'không được sản phẩm tốt'),
+    ('Giao hàng nhanh r, k có j để chê', 'Giao hàng nhanh r, k có j để chê'),
+    ('Túi 5kg, ng bán nhiệt tình', 'Túi 5kg, ng bán nhiệt tình'),
+    ('xem thêm ở www.tiki.vn nhé', 'xem thêm ở www.tiki.vn nhé'),
+    ('https://aaa.example.com/xxx', 'https://aaa.example.com/xxx'),
+    ('áo size XXXL và 3XL', 'áo size XXXL và 3XL'),
+    ('Tập III hay hơn', 'Tập III hay hơn'),
+])
+def test_default_normalizer_keeps_legitimate_text(text, expected):
+    assert TextNormalizer().normalize(text) == expected
+
+
+def test_default_teencode_has_no_single_letter_entries():
+    assert all(len(word) > 1 for word in DEFAULT_TEENCODE)
+    assert not set(DEFAULT_TEENCODE) & set(AMBIGUOUS_TEENCODE)
+
+
+def test_ambiguous_teencode_is_opt_in():
+    normalizer = TextNormalizer(teencode={**DEFAULT_TEENCODE, **AMBIGUOUS_TEENCODE})
+    assert normalizer.normalize('ok r, k có j') == 'ok rồi, không có gì'
+
+
+def test_normalize_many_keeps_order_and_non_text():
+    texts = ['hayyyy', None, 'hayyyy', 'đc']
+    assert TextNormalizer().normalize_many(texts) == ['hay', None, 'hay', 'được']
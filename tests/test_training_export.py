@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+import numpy as np
+
+from utils.text_normalize import tokenize
+from utils.training_export import TrainingDataset, export_training, split_of
+
+PRODUCT_IDS = [str(1000 + i) for i in range(40)]
+
+
+def _export(records, path, **kw):
+    return export_training(lambda: iter(records), output_dir=str(path), min_count=1, **kw)
+
+
+def _products_by_split(path, splits):
+    found = defaultdict(set)
+    for split in splits:
+        dataset = TrainingDataset(str(path), split)
+        for product in np.asarray(dataset.product_ids)[np.asarray(dataset.product)]:
+            found[int(product)].add(split)
+    return found
+
+
+def test_each_product_lands_in_a_single_split(tmp_path, make_scraper):
+    reviews_df, _ = make_scraper(max_workers=8).create_sentiment_dataset(PRODUCT_IDS, reviews_per_product=100)
+    records = reviews_df.to_dict('records')
+    meta = _export(records, tmp_path / 'training')
+
+    assert sum(info['rows'] for info in meta['splits'].values()) == len(records) == 40 * 45
+    found = _products_by_split(tmp_path / 'training', meta['splits'])
+    assert set(found) == {int(p) for p in PRODUCT_IDS}
+    assert all(len(splits) == 1 for splits in found.values())
+    assert all(found[int(p)] == {split_of(int(p))} for p in PRODUCT_IDS)
+    # Với 40 sản phẩm, cả train lẫn val/test đều có dữ liệu
+    assert all(info['rows'] for info in meta['splits'].values())
+
+
+def test_splits_are_stable_when_data_grows(tmp_path):
+    def record(product_id, review_id):
+        return {'product_id': product_id, 'review_id': review_id, 'rating': 5, 'content': f'hàng tốt {review_id}'}
+
+    small = [record(p, p * 10) for p in range(100)]
+    large = small + [record(p, p * 10 + 1) for p in range(200)]
+    before = _products_by_split(tmp_path / 'a', _export(small, tmp_path / 'a')['splits'])
+    after = _products_by_split(tmp_path / 'b', _export(large, tmp_path / 'b')['splits'])
+    assert all(after[p] == splits for p, splits in before.items())
+
+
+def test_vocabulary_comes_from_train_split_only(tmp_path):
+    records = [{'product_id': p, 'review_id': p, 'rating': 1, 'content': f'từ{p}'} for p in range(200)]
+    meta = _export(records, tmp_path / 'training')
+    train = TrainingDataset(str(tmp_path / 'training'), 'train')
+    vocab = set(train.vocab.tokens)
+
+    for p in range(200):
+        assert (f'từ{p}' in vocab) == (split_of(p) == 'train')
+    assert meta['unknown_tokens'] == sum(split_of(p) != 'train' for p in range(200))
+    # Token của split train đọc lại đúng văn bản gốc
+    first = train[0]
+    assert train.vocab.decode(first['tokens']) == tokenize(f"từ{first['product_id']}")
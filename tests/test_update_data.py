@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+import update_data
+from utils.api_helpers import ApiClient, RateLimiter
+
+
+@pytest.fixture
+def enrich_client(monkeypatch, mock_server, unlimited_rates):
+    monkeypatch.setattr(update_data, 'client', ApiClient(limiter=RateLimiter(unlimited_rates), max_retries=1))
+    monkeypatch.setattr(update_data, 'product_api_url', f"{mock_server.url}/api/v2/products")
+
+
+def _products(tmp_path):
+    # 1001 đã đủ, 999999 không tồn tại (404), còn lại thiếu ảnh / danh mục
+    df = pd.DataFrame({
+        'product_id': [1000, 1001, 1002, 999999, 1003],
+        'image_url': ['', 'http://img/1001', '', '', None],
+        'category_name': ['', 'Có sẵn', '', '', ''],
+    })
+    path = tmp_path / 'merged_tiki_products.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_needs_enrichment_mask():
+    df = pd.DataFrame({'image_url': ['a', '', None, ' '], 'category_name': ['b', 'c', 'd', 'e']})
+    assert update_data.needs_enrichment(df).tolist() == [False, True, True, True]
+
+
+def test_interrupted_enrichment_resumes(tmp_path, monkeypatch, mock_server, enrich_client):
+    path = _products(tmp_path)
+    fetch = update_data.get_product_info_from_api
+    calls = []
+
+    def interrupted(product_id):
+        if len(calls) >= 2:
+            raise KeyboardInterrupt
+        calls.append(product_id)
+        return fetch(product_id)
+
+    monkeypatch.setattr(update_data, 'max_workers', 1)
+    monkeypatch.setattr(update_data, 'get_product_info_from_api', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        update_data.enrich_products(str(tmp_path))
+    progress = update_data.load_progress(str(tmp_path / 'enrich_progress.jsonl'))
+    assert sorted(progress) == sorted(calls)
+
+    # Chạy lại: chỉ lấy các sản phẩm chưa có trong tiến độ
+    monkeypatch.setattr(update_data, 'get_product_info_from_api', fetch)
+    requests_before = mock_server.stats[('products', 200)]
+    update_data.enrich_products(str(tmp_path))
+    assert mock_server.stats[('products', 200)] - requests_before == 4 - len(calls) - 1
+
+    df = pd.read_csv(path, keep_default_na=False).set_index('product_id')
+    assert df.loc[1000, 'image_url'].endswith('/1000.jpg') and df.loc[1000, 'category_name']
+    assert df.loc[1001, 'image_url'] == 'http://img/1001' and df.loc[1001, 'category_name'] == 'Có sẵn'
+    assert df.loc[1003, 'image_url'].endswith('/1003.jpg')
+    # Sản phẩm lấy lỗi giữ ô trống (không thành NaN) và vẫn được chọn ở lần sau
+    assert df.loc[999999, 'image_url'] == '' and df.loc[999999, 'category_name'] == ''
+    assert update_data.needs_enrichment(pd.read_csv(path)).tolist() == [False, False, False, True, False]
+
+
+def test_failed_fetches_keep_original_values(enrich_client):
+    df = pd.DataFrame({'product_id': [999999, 1000], 'image_url': ['', ''], 'category_name': ['giữ', '']})
+    result = update_data.add_missing_data(df)
+    assert result.loc[0, 'image_url'] == '' and result.loc[0, 'category_name'] == 'giữ'
+    assert result.loc[1, 'image_url'].endswith('/1000.jpg')
@@ -0,0 +1,108 @@
+import time
+import zlib
+
+from crawl_worker import run_worker
+from utils.product_index import ProductIndex
+from utils.shards import iter_shard_records
+from utils.work_queue import NUM_BUCKETS, WorkQueue
+
+
+def _queue(tmp_path, **kw):
+    return WorkQueue(str(tmp_path / 'queue.sqlite'), **kw)
+
+
+def test_put_many_ignores_duplicates(tmp_path):
+    queue = _queue(tmp_path)
+    assert queue.put_many('product', [('1', None), ('2', {'review_count': 3})]) == 2
+    assert queue.put_many('product', [('2', None), ('3', None)]) == 1
+    assert queue.stats() == {'product': {'pending': 3}}
+
+
+def test_expired_lease_is_handed_out_again(tmp_path):
+    queue = _queue(tmp_path, visibility_timeout=0.05)
+    queue.put_many('product', [('1', None)])
+    [task] = queue.lease('a')
+    assert queue.lease('b') == []
+
+    time.sleep(0.1)
+    assert queue.stats() == {'product': {'expired': 1}}
+    [again] = queue.lease('b')
+    assert again['id'] == task['id'] and again['attempts'] == 2
+
+    # Worker cũ không còn giữ task: ack của nó bị bỏ qua
+    queue.ack([task['id']], 'a')
+    assert queue.stats()['product'] == {'leased': 1}
+    queue.ack([task['id']], 'b')
+    assert queue.stats()['product'] == {'done': 1}
+
+
+def test_nack_requeues_until_max_attempts(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2)
+    queue.put_many('product', [('1', None)])
+    [task] = queue.lease('a')
+    queue.nack(task['id'], 'lỗi 1', 'a')
+    assert queue.stats()['product'] == {'pending': 1}
+
+    [task] = queue.lease('a')
+    queue.nack(task['id'], 'lỗi 2', 'a')
+    assert queue.stats()['product'] == {'failed': 1}
+    assert queue.lease('a') == []
+
+    assert queue.retry_failed() == 1
+    assert len(queue.lease('a')) == 1
+
+
+def test_stats_and_lease_filter_by_shard(tmp_path):
+    queue = _queue(tmp_path)
+    queue.put_many('product', [(str(i), None) for i in range(40)])
+    counts = [queue.pending_count(shard, 2) for shard in range(2)]
+    assert sum(counts) == 40 and all(counts)
+
+    tasks = queue.lease('a', limit=100, shard=0, shards=2)
+    assert len(tasks) == counts[0]
+    assert queue.stats(shard=0, shards=2) == {'product': {'leased': counts[0]}}
+    assert queue.stats(shard=1, shards=2) == {'product': {'pending': counts[1]}}
+
+
+def test_worker_rotates_shards_by_size_and_stops_at_its_shard(tmp_path, mock_server, unlimited_rates):
+    queue = _queue(tmp_path)
+    product_ids = [str(1000 + i) for i in range(12)]
+    queue.put_many('product', [(product_id, None) for product_id in product_ids])
+    mine = {p for p in product_ids if zlib.crc32(p.encode()) % NUM_BUCKETS % 2 == 0}
+    assert 0 < len(mine) < len(product_ids)
+
+    output = tmp_path / 'out'
+    done = run_worker(str(tmp_path / 'queue.sqlite'), str(output), threads=2, rates=unlimited_rates,
+                      base_url=mock_server.url, batch_size=2, reviews_per_product=100, shard=0, shards=2,
+                      poll_interval=0.01, shard_size=100)
+
+    # Mỗi sản phẩm 45 đánh giá = 3 trang (1 task sản phẩm + 2 task trang)
+    assert done == 3 * len(mine)
+    reviews = list(iter_shard_records(sorted(str(p) for p in output.glob('tiki_reviews_*'))))
+    assert len(reviews) == 45 * len(mine)
+    assert {str(r['product_id']) for r in reviews} == mine
+    # Shard đóng theo kích thước, không phải sau mỗi lô
+    assert len(list(output.glob('tiki_reviews_*'))) <= -(-45 * len(mine) // 100) + 1
+    # Shard còn lại vẫn chưa ai làm
+    stats = queue.stats(shard=1, shards=2)
+    assert stats == {'product': {'pending': len(product_ids) - len(mine)}}
+
+
+def test_worker_indexes_products_after_all_pages_are_done(tmp_path, mock_server, unlimited_rates):
+    path = str(tmp_path / 'queue.sqlite')
+    queue = _queue(tmp_path, max_attempts=1)
+    queue.put_many('product', [('1000', None), ('1001', None)])
+    # Trang 2 của 1001 đã lỗi hẳn từ trước
+    queue.put_many('review_page', [('1001:2', None)])
+    [page] = queue.lease('x', kinds=['review_page'])
+    queue.nack(page['id'], 'lỗi', 'x')
+    assert queue.unfinished('review_page', '1001:') == 1
+
+    index_path = str(tmp_path / 'product_index.sqlite')
+    run_worker(path, str(tmp_path / 'out'), threads=2, rates=unlimited_rates, base_url=mock_server.url,
+               batch_size=1, reviews_per_product=100, poll_interval=0.01, product_index=index_path)
+
+    index = ProductIndex(index_path)
+    assert index.get('1000')['review_count'] == 45
+    assert index.get('1001') is None
+    assert queue.unfinished('review_page', '1000:') == 0
@@ -0,0 +1,504 @@
+"""Dòng lệnh thu thập / xử lý dữ liệu đánh giá Tiki
+
+    python tiki_crawl.py discover --output data/product_ids.txt   # tìm sản phẩm theo từ khóa + danh mục
+    python tiki_crawl.py crawl                                    # crawl, cân bằng và lưu snapshot (như raw_app.py)
+    python tiki_crawl.py merge                                    # gộp snapshot -> merged_tiki_*.csv
+    python tiki_crawl.py enrich                                   # bổ sung image_url / category_name
+    python tiki_crawl.py balance                                  # cân bằng lớp + chia train/val/test
+    python tiki_crawl.py dedup --drop                             # đánh dấu / bỏ đánh giá gần trùng
+    python tiki_crawl.py export --format parquet
+
+Từ khóa, danh mục và giới hạn crawl đọc từ crawl_config.json (--config). Các
+module nặng (pandas, scraper...) chỉ được import trong lệnh cần đến, nên các
+lệnh nhanh như merge hay enrich không phải chờ import những thứ không dùng.
+"""
+import argparse
+import os
+import time
+
+from utils.crawl_config import DEFAULT_CONFIG_PATH, load_config
+
+
+def parse_ratios(value):
+    """'positive=2,neutral=1,negative=1' -> {'positive': 2.0, ...}"""
+    if not value:
+        return None
+    ratios = {}
+    for item in value.split(','):
+        label, _, ratio = item.partition('=')
+        ratios[label.strip()] = float(ratio)
+    return ratios
+
+
+def read_ids(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def open_state(data_dir):
+    """Nhật ký crawl, mốc đánh giá (khởi tạo từ snapshot nếu chưa có) và chỉ mục sản phẩm trong data_dir"""
+    from utils.crawl_journal import CrawlJournal
+    from utils.product_index import ProductIndex
+    from utils.review_watermarks import ReviewWatermarks
+
+    # Nhật ký crawl: nếu lần chạy trước bị dừng giữa chừng thì chạy tiếp từ chỗ đã dừng
+    journal = CrawlJournal(os.path.join(data_dir, 'crawl_journal.sqlite'))
+
+    # Mốc đánh giá mới nhất của mỗi sản phẩm, lần đầu khởi tạo từ các snapshot
+    watermarks_path = os.path.join(data_dir, 'review_watermarks.json')
+    if os.path.exists(watermarks_path):
+        watermarks = ReviewWatermarks(watermarks_path)
+    else:
+        watermarks = ReviewWatermarks.from_snapshots(data_dir, watermarks_path)
+
+    # Chỉ mục sản phẩm đã crawl xong (chỉ ghi sau các lần crawl hoàn tất, không khởi tạo từ snapshot);
+    # dùng để bỏ qua sản phẩm không đổi khi chạy với --skip-unchanged
+    product_index = ProductIndex(os.path.join(data_dir, 'product_index.sqlite'))
+
+    return journal, watermarks, product_index
+
+
+def iter_discovered(scraper, config, seen):
+    """Sinh sản phẩm mới (summary hoặc ID) từ từ khóa và danh mục trong cấu hình"""
+    if config['keywords']:
+        print(f"🔍 Đang tìm kiếm sản phẩm cho {len(config['keywords'])} từ khóa...")
+        yield from scraper.discover_products(config['keywords'], limit_per_keyword=config['limit_per_keyword'],
+                                             seen=seen)
+    if config['categories']:
+        print(f"📂 Đang lấy sản phẩm từ {len(config['categories'])} danh mục...")
+        yield from scraper.discover_categories(config['categories'], limit_per_category=config['limit_per_category'],
+                                               seen=seen)
+    # ID chỉ định sẵn trong cấu hình
+    yield from (str(product_id) for product_id in config['product_ids'] if str(product_id) not in seen)
+
+
+def cmd_discover(args, config):
+    from tiki_sentiment_scraper import TikiSentimentScraper
+
+    product_index = None
+    if args.skip_unchanged:
+        from utils.product_index import ProductIndex
+        product_index = ProductIndex(os.path.join(args.data_dir, 'product_index.sqlite'))
+    scraper = TikiSentimentScraper(product_index=product_index, skip_unchanged=args.skip_unchanged,
+                                   base_url=args.base_url)
+
+    seen = set()
+    products = iter_discovered(scraper, config, seen)
+    if args.queue:
+        # Đưa thẳng vào hàng đợi của crawl_worker.py (kèm summary để worker khỏi gọi get_product_info)
+        from utils.work_queue import WorkQueue
+        queue = WorkQueue(args.queue)
+        added = queue.put_many('product', [
+            (str(item['product_id']) if isinstance(item, dict) else item, item if isinstance(item, dict) else None)
+            for item in products
+        ])
+        queue.close()
+        print(f"✅ Đã thêm {added} task sản phẩm vào {args.queue}")
+        return
+
+    output = args.output or os.path.join(args.data_dir, 'product_ids.txt')
+    count = 0
+    with open(output, 'w', encoding='utf-8') as f:
+        for item in products:
+            f.write(f"{item['product_id'] if isinstance(item, dict) else item}\n")
+            count += 1
+    print(f"✅ Đã ghi {count} ID sản phẩm vào {output}")
+
+
+def cmd_crawl(args, config):
+    from tiki_sentiment_scraper import TikiSentimentScraper
+    from utils.http_cache import ResponseCache
+    from utils.metrics import CrawlMetrics
+
+    journal, watermarks, product_index = open_state(args.data_dir)
+
+    # Số liệu crawl (độ trễ, lỗi, 429, thông lượng...) ghi ra file mỗi 30 giây; đổi đuôi .prom cho Prometheus
+    metrics = CrawlMetrics().start_export(args.metrics or os.path.join(args.data_dir, 'crawl_metrics.json'),
+                                          interval=30)
+
+    # Khởi tạo scraper (cache response sản phẩm/tìm kiếm trên đĩa giữa các lần chạy)
+    cache = ResponseCache(offline=args.offline, record=args.record)
+    scraper = TikiSentimentScraper(cache=cache, journal=journal, watermarks=watermarks, metrics=metrics,
+                                   product_index=product_index, skip_unchanged=args.skip_unchanged,
+                                   base_url=args.base_url)
+
+    # ID đã thấy, dùng chung giữa tìm kiếm và danh mục để loại trùng ngay khi phát hiện
+    seen_ids = set()
+    if args.ids_file:
+        product_ids = read_ids(args.ids_file)
+        seen_ids.update(product_ids)
+    else:
+        # Sản phẩm được sinh ra ngay khi tìm thấy, việc lấy đánh giá chạy song song với tìm kiếm
+        product_ids = iter_discovered(scraper, config, seen_ids)
+
+    reviews_per_product = args.reviews_per_product or config['reviews_per_product']
+
+    # Có quota theo lớp: ưu tiên sản phẩm nhiều đánh giá lớp hiếm, dừng khi đủ quota
+    quotas = parse_ratios(args.quotas) or config['class_quotas']
+    scheduler = None
+    if quotas:
+        from utils.scheduler import YieldScheduler
+        scheduler = YieldScheduler({label: int(quota) for label, quota in quotas.items()},
+                                   max_reviews_per_product=reviews_per_product)
+
+    print("📡 Đang thu thập dữ liệu đánh giá...")
+    if args.stream:
+        # Ghi dần ra shard JSONL, không giữ toàn bộ trong bộ nhớ (gộp bằng lệnh merge)
+        scraper.stream_dataset(product_ids, reviews_per_product=reviews_per_product, output_dir=args.data_dir,
+                               incremental=args.incremental, scheduler=scheduler)
+        metrics.stop_export()
+        watermarks.save()
+        product_index.save()
+        journal.reset()
+        return
+
+    reviews_df, products_df = scraper.create_sentiment_dataset(product_ids, reviews_per_product=reviews_per_product,
+                                                               incremental=args.incremental, scheduler=scheduler)
+    print(f"✅ Tổng số sản phẩm thu thập: {len(seen_ids)}")
+    metrics.stop_export()
+
+    # 🔹 Thống kê dữ liệu thu thập được
+    print(f"📊 Số lượng sản phẩm: {len(products_df)}")
+    print(f"📊 Số lượng đánh giá: {len(reviews_df)}")
+    if len(reviews_df):
+        print("\n📌 Phân bố sentiment ban đầu:")
+        print(reviews_df['sentiment'].value_counts())
+
+    if args.no_balance or not len(reviews_df):
+        output_reviews = reviews_df
+    else:
+        # 🔹 Cân bằng dữ liệu sentiment (mỗi lớp lấy bằng lớp ít nhất, seed cố định để chạy lại cho cùng kết quả)
+        from utils.balance import balance_dataframe
+        output_reviews = balance_dataframe(reviews_df, seed=args.seed)
+        print("\n✅ Sau khi cân bằng sentiment:")
+        print(output_reviews['sentiment'].value_counts())
+
+    # 🔹 Lưu dữ liệu ra file
+    scraper.save_dataset(output_reviews, products_df, output_dir=args.data_dir, formats=args.formats)
+
+    # Đã lưu xong: ghi mốc đánh giá mới nhất, lần chạy sau bắt đầu crawl mới
+    watermarks.save()
+    product_index.save()
+    journal.reset()
+
+    if len(output_reviews):
+        # 🔹 Hiển thị một số đánh giá mẫu
+        print("\n📢 Một số đánh giá mẫu:")
+        print(output_reviews[['content', 'rating', 'sentiment']].sample(min(5, len(output_reviews))))
+
+        # 🔹 Thống kê số sao
+        print("\n⭐ Số lượng đánh giá theo số sao:")
+        print(reviews_df['rating'].value_counts().sort_index())
+
+    if len(products_df):
+        # 🔹 Xem thông tin sản phẩm
+        print("\n📦 Thông tin sản phẩm thu thập:")
+        print(products_df[['name', 'price', 'rating_average', 'review_count']].head())
+
+
+def cmd_merge(args, config):
+    from merge_data import merge_snapshots
+    merge_snapshots(args.data_dir, normalize=not args.no_normalize, output_dir=args.output)
+
+
+def cmd_enrich(args, config):
+    from update_data import enrich_products
+    enrich_products(args.data_dir, args.input)
+
+
+def cmd_balance(args, config):
+    """Cân bằng dữ liệu đã gộp (lệnh merge) theo luồng, ghi shard JSONL cho mỗi split"""
+    from utils.balance import StreamingBalancer
+    from utils.snapshot_merge import SnapshotMerger
+
+    merger = SnapshotMerger('reviews', args.data_dir)
+    if not len(merger):
+        print("Chưa có dữ liệu đã gộp, hãy chạy lệnh merge trước.")
+        merger.close()
+        return
+
+    def records():
+        for batch in merger.iter_records():
+            yield from batch
+
+    balancer = StreamingBalancer(seed=args.seed, ratios=parse_ratios(args.ratios),
+                                 per_product_cap=args.per_product_cap)
+    shards = balancer.write_shards(records, args.output or args.data_dir)
+    merger.close()
+    for split, paths in shards.items():
+        print(f"✅ {split}: {len(paths)} shard")
+
+
+def cmd_dedup(args, config):
+    """Đánh dấu đánh giá gần trùng (MinHash + LSH) trong dữ liệu đã gộp, ghi shard JSONL"""
+    from utils.near_dup import NearDuplicateDetector
+    from utils.shards import ShardWriter
+    from utils.snapshot_merge import SnapshotMerger
+
+    merger = SnapshotMerger('reviews', args.data_dir)
+    if not len(merger):
+        print("Chưa có dữ liệu đã gộp, hãy chạy lệnh merge trước.")
+        merger.close()
+        return
+
+    def records():
+        for batch in merger.iter_records():
+            yield from batch
+
+    detector = NearDuplicateDetector(threshold=args.threshold, max_clusters=args.max_clusters)
+    duplicates = 0
+    with ShardWriter(args.output or args.data_dir, prefix='dedup_tiki_reviews') as writer:
+        for record, cluster_id, duplicate in detector.iter_clusters(records(), processes=args.processes):
+            duplicates += duplicate
+            if not (duplicate and args.drop):
+                writer.write(dict(record, dup_cluster=cluster_id, is_near_duplicate=duplicate))
+    merger.close()
+    print(f"✅ {duplicates} đánh giá gần trùng, đã ghi {writer.total} bản ghi ra {len(writer.shards)} shard")
+
+
+def cmd_export(args, config):
+    """Xuất dữ liệu: csv / jsonl từ dữ liệu đã gộp, parquet từ các snapshot, training (memmap) từ đánh giá đã làm sạch"""
+    if args.format == 'training':
+        export_training_data(args)
+        return
+
+    output_dir = args.output or args.data_dir
+    if args.format == 'parquet':
+        from utils.columnar import convert_snapshots
+        converted = convert_snapshots(args.data_dir, output_dir)
+        print(f"✅ Đã chuyển {len(converted)} snapshot sang Parquet trong {output_dir}")
+        return
+
+    from utils.snapshot_merge import SnapshotMerger
+    for kind in ('reviews', 'products'):
+        merger = SnapshotMerger(kind, args.data_dir)
+        if args.format == 'csv':
+            merger.export_csv(os.path.join(output_dir, f"merged_tiki_{kind}.csv"))
+        else:
+            from utils.shards import ShardWriter
+            with ShardWriter(output_dir, prefix=f"merged_tiki_{kind}") as writer:
+                for batch in merger.iter_records():
+                    writer.write_many(batch)
+            print(f"✅ Đã xuất {writer.total} bản ghi {kind} ra {len(writer.shards)} shard")
+        merger.close()
+
+
+def cmd_prices(args, config):
+    """Cập nhật chuỗi giá / đánh giá từ snapshot mới, rồi in lịch sử hoặc giá trị tại một thời điểm"""
+    import numpy as np
+    from utils.price_history import SERIES_FIELDS, PriceHistory
+
+    history = PriceHistory(os.path.join(args.data_dir, 'price_history'))
+    added = history.update(args.data_dir)
+    if added:
+        history.save()
+    print(f"📈 {len(history)} sản phẩm ({added} snapshot mới)")
+
+    def show(time_value, values):
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time_value)) if time_value >= 0 else '-'
+        print(f"  {when}  " + '  '.join(f"{field}={value:.15g}" for field, value in values))
+
+    if args.at:
+        result = history.as_of(args.at, args.product_id or None)
+        found = result['time'] >= 0
+        print(f"Giá trị tại {args.at}: {int(found.sum())}/{len(found)} sản phẩm có dữ liệu")
+        for i in np.flatnonzero(found)[:args.limit]:
+            print(f"{result['product_id'][i]}:", end='')
+            show(result['time'][i], [(field, result[field][i]) for field in SERIES_FIELDS])
+        return
+
+    for product_id in args.product_id or []:
+        series = history.history(product_id)
+        if series is None:
+            print(f"{product_id}: chưa có trong chuỗi giá")
+            continue
+        print(f"{product_id} {(history.info(product_id) or {}).get('name', '')}")
+        for i, time_value in enumerate(series['time']):
+            show(time_value, [(field, series[field][i]) for field in SERIES_FIELDS])
+
+
+def cmd_search(args, config):
+    """Tìm đánh giá theo cụm từ qua chỉ mục ngược (cập nhật từ snapshot mới trước khi tìm)"""
+    import json
+    import numpy as np
+    from utils.review_index import ReviewIndex
+    from utils.training_export import SENTIMENT_LABELS
+
+    index = ReviewIndex(os.path.join(args.data_dir, 'review_index'))
+    added = index.update(args.data_dir)
+    if added and len(index.segments) > args.max_segments:
+        index.compact()
+    print(f"🔎 Chỉ mục: {len(index)} đánh giá ({added} mới), {len(index.segments)} segment")
+
+    product_ids = None
+    if args.category:
+        # Nối với danh mục qua product_id: merged_tiki_products.csv (đã enrich) hoặc kho sản phẩm đã gộp
+        category = args.category.lower()
+        products_path = os.path.join(args.data_dir, 'merged_tiki_products.csv')
+        if os.path.exists(products_path):
+            import csv
+            with open(products_path, encoding='utf-8-sig', newline='') as f:
+                products = list(csv.DictReader(f))
+        else:
+            from utils.snapshot_merge import SnapshotMerger
+            merger = SnapshotMerger('products', args.data_dir)
+            merger.merge()
+            products = [record for batch in merger.iter_records() for record in batch]
+            merger.close()
+        product_ids = [int(p['product_id']) for p in products
+                       if str(p.get('product_id', '')).isdigit() and category in str(p.get('category_name') or '').lower()]
+        print(f"📂 {len(product_ids)} sản phẩm thuộc danh mục '{args.category}'")
+
+    filters = dict(mode='or' if args.any else 'and', rating=args.rating, sentiment=args.sentiment,
+                   product_ids=product_ids)
+    start = time.perf_counter()
+    doc_ids = index.search(*args.phrases, **filters)
+    print(f"{len(doc_ids)} đánh giá khớp ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    columns = index.columns(doc_ids)
+    for label, count in zip(SENTIMENT_LABELS, np.bincount(columns['sentiment'][columns['sentiment'] >= 0],
+                                                           minlength=len(SENTIMENT_LABELS))):
+        print(f"  {label}: {count}")
+    if args.count:
+        return
+
+    # Lấy nội dung đầy đủ từ kho đã gộp (lệnh merge)
+    from utils.snapshot_merge import SnapshotMerger
+    merger = SnapshotMerger('reviews', args.data_dir)
+    merger.merge()
+    merger.close()
+    records = index.extract(*args.phrases, data_dir=args.data_dir, limit=args.limit if not args.output else None,
+                            **filters)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        print(f"✅ Đã ghi {len(records)} đánh giá vào {args.output}")
+        return
+    for record in records:
+        print(f"[{record.get('rating')}★ {record.get('product_id')}] {record.get('title') or ''} | {record.get('content') or ''}")
+
+
+def export_training_data(args):
+    """Xuất mảng memmap cho huấn luyện từ merged/merged_tiki_reviews_clean.csv (hoặc --input, hoặc dữ liệu đã gộp)"""
+    from utils.snapshot_merge import MERGED_DIR
+    from utils.training_export import export_training
+
+    path = args.input or os.path.join(args.data_dir, MERGED_DIR, 'merged_tiki_reviews_clean.csv')
+    merger = None
+    if os.path.exists(path):
+        from utils.snapshot_merge import iter_snapshot_chunks
+
+        def records():
+            for chunk in iter_snapshot_chunks(path):
+                yield from chunk
+    else:
+        from utils.snapshot_merge import SnapshotMerger
+        merger = SnapshotMerger('reviews', args.data_dir)
+
+        def records():
+            for batch in merger.iter_records():
+                yield from batch
+
+    export_training(records, args.output or os.path.join(args.data_dir, 'training'), seed=args.seed,
+                    min_count=args.min_count, max_vocab=args.max_vocab, max_tokens=args.max_tokens)
+    if merger is not None:
+        merger.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='tiki_crawl.py', description='Thu thập và xử lý dữ liệu đánh giá Tiki')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help='file cấu hình từ khóa / danh mục (JSON)')
+    parser.add_argument('--data-dir', default='data', help='thư mục dữ liệu')
+    parser.add_argument('--base-url', default='https://tiki.vn', help='đổi sang server giả lập khi thử nghiệm')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('discover', help='tìm sản phẩm theo từ khóa và danh mục trong cấu hình')
+    p.add_argument('--output', help='file ghi ID sản phẩm (mặc định <data-dir>/product_ids.txt)')
+    p.add_argument('--queue', help='đưa vào hàng đợi của crawl_worker.py thay vì ghi file')
+    p.add_argument('--skip-unchanged', action='store_true', help='bỏ qua sản phẩm không đổi theo chỉ mục sản phẩm')
+    p.set_defaults(func=cmd_discover)
+
+    p = commands.add_parser('crawl', help='crawl đánh giá, cân bằng và lưu snapshot')
+    p.add_argument('--ids-file', help='crawl các ID trong file thay vì tìm kiếm (vd. kết quả của discover)')
+    p.add_argument('--reviews-per-product', type=int, help='mặc định lấy từ cấu hình')
+    p.add_argument('--incremental', action='store_true', help='chỉ lấy đánh giá mới hơn lần crawl trước')
+    p.add_argument('--skip-unchanged', action='store_true',
+                   help='bỏ qua sản phẩm có review_count không đổi so với lần crawl hoàn tất trước')
+    p.add_argument('--quotas', help="số đánh giá cần mỗi lớp, vd. 'negative=2000,neutral=2000,positive=2000' "
+                                    "(mặc định class_quotas trong cấu hình)")
+    p.add_argument('--stream', action='store_true', help='ghi dần ra shard JSONL (không cân bằng)')
+    p.add_argument('--record', action='store_true', help='ghi cả trang đánh giá vào cache để chạy lại với --offline')
+    p.add_argument('--offline', action='store_true',
+                   help='chỉ dùng response trong cache, không gửi request (trang đánh giá cần crawl trước với --record)')
+    p.add_argument('--no-balance', action='store_true', help='lưu toàn bộ đánh giá, không cân bằng lớp')
+    p.add_argument('--formats', nargs='+', default=['csv', 'json'], choices=['csv', 'json', 'parquet'])
+    p.add_argument('--metrics', help='file số liệu crawl (mặc định <data-dir>/crawl_metrics.json)')
+    p.add_argument('--seed', type=int, default=42)
+    p.set_defaults(func=cmd_crawl)
+
+    p = commands.add_parser('merge', help='gộp tăng dần các snapshot thành merged_tiki_*.csv')
+    p.add_argument('--no-normalize', action='store_true', help='không tạo file *_clean.csv')
+    p.add_argument('--output', help='thư mục ghi file đã gộp (mặc định <data-dir>/merged)')
+    p.set_defaults(func=cmd_merge)
+
+    p = commands.add_parser('enrich', help='bổ sung image_url / category_name cho merged_tiki_products.csv')
+    p.add_argument('--input', help='file sản phẩm cần bổ sung (mặc định <data-dir>/merged_tiki_products.csv), '
+                                   'vd. data/merged/merged_tiki_products.csv')
+    p.set_defaults(func=cmd_enrich)
+
+    p = commands.add_parser('balance', help='cân bằng lớp + chia train/val/test từ dữ liệu đã gộp')
+    p.add_argument('--output', help='thư mục ghi shard (mặc định <data-dir>)')
+    p.add_argument('--ratios', help="tỉ lệ lớp, vd. 'positive=2,neutral=1,negative=1'")
+    p.add_argument('--per-product-cap', type=int, help='tối đa số đánh giá mỗi sản phẩm / lớp')
+    p.add_argument('--seed', type=int, default=42)
+    p.set_defaults(func=cmd_balance)
+
+    p = commands.add_parser('dedup', help='đánh dấu đánh giá gần trùng (spam, đánh giá theo mẫu) trong dữ liệu đã gộp')
+    p.add_argument('--output', help='thư mục ghi shard dedup_tiki_reviews_* (mặc định <data-dir>)')
+    p.add_argument('--drop', action='store_true', help='bỏ các bản gần trùng thay vì chỉ đánh dấu')
+    p.add_argument('--threshold', type=float, default=0.7, help='độ tương đồng Jaccard ước lượng để vào cùng cụm')
+    p.add_argument('--max-clusters', type=int, default=1000000, help='số cụm giữ trong bộ nhớ (cụm cũ nhất bị loại trước)')
+    p.add_argument('--processes', type=int, help='số process tính chữ ký MinHash')
+    p.set_defaults(func=cmd_dedup)
+
+    p = commands.add_parser('prices', help='chuỗi giá / đánh giá theo thời gian từ các snapshot sản phẩm')
+    p.add_argument('product_id', nargs='*', type=int, help='in lịch sử các sản phẩm này')
+    p.add_argument('--at', help="giá trị tại thời điểm này, vd. '2025-04-02' hoặc '20250402_120000'")
+    p.add_argument('--limit', type=int, default=20, help='--at không kèm product_id: số dòng in ra')
+    p.set_defaults(func=cmd_prices)
+
+    p = commands.add_parser('search', help='tìm đánh giá theo cụm từ (chỉ mục ngược trên title / content)')
+    p.add_argument('phrases', nargs='*', help="các cụm cần có, vd. pin 'giao hàng'")
+    p.add_argument('--any', action='store_true', help='khớp ít nhất một cụm thay vì tất cả')
+    p.add_argument('--rating', type=int, nargs='+', help='chỉ lấy các mức sao này')
+    p.add_argument('--sentiment', nargs='+', choices=['negative', 'neutral', 'positive'])
+    p.add_argument('--category', help='chỉ lấy sản phẩm có category_name chứa chuỗi này')
+    p.add_argument('--count', action='store_true', help='chỉ đếm, không lấy nội dung')
+    p.add_argument('--limit', type=int, default=20, help='số đánh giá in ra')
+    p.add_argument('--output', help='ghi toàn bộ đánh giá khớp ra file JSONL')
+    p.add_argument('--max-segments', type=int, default=16, help='gộp segment khi chỉ mục có nhiều hơn số này')
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser('export', help='xuất dữ liệu ra csv / jsonl / parquet / training (memmap)')
+    p.add_argument('--format', choices=['csv', 'jsonl', 'parquet', 'training'], default='csv')
+    p.add_argument('--output', help='thư mục đích (mặc định <data-dir>, training: <data-dir>/training)')
+    p.add_argument('--input', help='training: file đánh giá CSV / JSONL (mặc định merged/merged_tiki_reviews_clean.csv)')
+    p.add_argument('--min-count', type=int, default=2, help='training: số lần xuất hiện tối thiểu của token')
+    p.add_argument('--max-vocab', type=int, default=50000, help='training: kích thước từ điển tối đa')
+    p.add_argument('--max-tokens', type=int, help='training: cắt mỗi đánh giá còn tối đa bấy nhiêu token')
+    p.add_argument('--seed', type=int, default=0, help='training: seed chia split theo product_id')
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Chỉ đọc cấu hình khi lệnh cần đến (discover / crawl)
+    config = load_config(args.config) if args.command in ('discover', 'crawl') else None
+    start = time.perf_counter()
+    args.func(args, config)
+    print(f"⏱️ {args.command}: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,57 @@
 import requests
 import json
-import pandas as pd
 import time
+import math
+import queue
 import random
-from bs4 import BeautifulSoup
+import re
+import threading
+import unicodedata
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from utils.api_helpers import ApiClient, RateLimiter
+from utils.records import ReviewColumns
+from utils.shards import ShardWriter
+
+
+def normalize_keywords(keywords):
+    """Chuẩn hóa (NFC, chữ thường, gộp khoảng trắng) và bỏ từ khóa trùng, giữ thứ tự"""
+    result = []
+    seen = set()
+    for keyword in keywords:
+        normalized = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', keyword)).strip().lower()
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            result.append(normalized)
+    return result
+
+# Các trường của product_info (get_product_info)
+PRODUCT_INFO_FIELDS = (
+    'product_id', 'name', 'short_description', 'price', 'original_price', 'discount_rate', 'rating_average',
+    'review_count', 'category_name', 'brand_name', 'url', 'image_url',
+)
+
+# Trường của payload tìm kiếm / listing -> trường product_info
+SUMMARY_EXTRA_FIELDS = {
+    'original_price': 'original_price',
+    'discount_rate': 'discount_rate',
+    'brand_name': 'brand_name',
+    'category_name': 'primary_category_name',
+    'image_url': 'thumbnail_url',
+    'short_description': 'short_description',
+}
+
+# Kết quả tìm kiếm có đủ các trường này thì dùng thay cho get_product_info
+# (short_description thường không có trong payload tìm kiếm, để trống)
+SUMMARY_REQUIRED_FIELDS = tuple(f for f in PRODUCT_INFO_FIELDS if f != 'short_description')
 
 class TikiSentimentScraper:
-    def __init__(self, user_agent=None):
+    def __init__(self, user_agent=None, max_workers=8, page_workers=4, rate_limits=None, cache=None, journal=None, watermarks=None,
+                 normalizer=None, base_url='https://tiki.vn', metrics=None, product_index=None,
+                 skip_unchanged=False):
         self.headers = {
             'User-Agent': user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7',
@@ -15,20 +59,60 @@ class TikiSentimentScraper:
             'Origin': 'https://tiki.vn',
             'Referer': 'https://tiki.vn/'
         }
-        self.base_url = 'https://tiki.vn'
-        self.api_url = 'https://tiki.vn/api/v2/reviews'
-        self.product_api_url = 'https://tiki.vn/api/v2/products'
+        # base_url đổi được để chạy với server giả lập (benchmarks/mock_tiki_server.py)
+        self.base_url = base_url.rstrip('/')
+        self.api_url = f'{self.base_url}/api/v2/reviews'
+        self.product_api_url = f'{self.base_url}/api/v2/products'
+        self.category_api_url = f'{self.base_url}/api/personalish/v1/blocks/listings'
+        self._category_id_pattern = re.compile(r'data-id="(\d+)"')
+        self.reviews_page_size = 20  # Số lượng đánh giá trên mỗi trang
+        self.search_page_size = 40  # Số sản phẩm trên mỗi trang kết quả tìm kiếm
+        self.newest_first_sort = 'id|desc'  # Thứ tự mới nhất trước cho chế độ tăng dần
+        self.max_workers = max_workers
+        self.page_workers = page_workers
         self.session = requests.Session()
         self.session.headers.update(self.headers)
 
+        # Giữ kết nối keep-alive, đủ cho số luồng chạy song song
+        pool_size = max_workers * max(page_workers, 1)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Mọi request đi qua lớp giới hạn tốc độ + thử lại dùng chung,
+        # cache (utils.http_cache.ResponseCache) là tùy chọn
+        self.client = ApiClient(self.session, RateLimiter(rate_limits), cache=cache, metrics=metrics)
+
+        # Số liệu crawl (utils.metrics.CrawlMetrics): độ trễ, lỗi, thời gian xử lý, thông lượng
+        self.metrics = metrics
+
+        # Chỉ mục sản phẩm đã crawl (utils.product_index.ProductIndex): ghi nhận sản phẩm đã crawl xong,
+        # với skip_unchanged thì bỏ qua sản phẩm có review_count không đổi
+        # (gọi self.product_index.save() sau khi đã lưu bộ dữ liệu)
+        self.product_index = product_index
+        self.skip_unchanged = skip_unchanged
+
+        # Nhật ký crawl (utils.crawl_journal.CrawlJournal) để chạy tiếp khi bị dừng
+        self.journal = journal
+
+        # Mốc đánh giá mới nhất mỗi sản phẩm (utils.review_watermarks.ReviewWatermarks) cho chế độ tăng dần
+        self.watermarks = watermarks
+
+        # Chuẩn hóa title/content/short_description (utils.text_normalize.TextNormalizer), tùy chọn
+        self.normalizer = normalizer
+
+    def _report_error(self, kind, message):
+        """In lỗi như trước và đếm vào metrics (tiki_errors_total{kind=...})"""
+        print(message)
+        if self.metrics is not None:
+            self.metrics.inc('tiki_errors_total', kind=kind)
+
     def get_product_info(self, product_id):
         """Lấy thông tin sản phẩm từ API của Tiki"""
         url = f"{self.product_api_url}/{product_id}"
 
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            data = response.json()
+            data = self.client.get_json(url, endpoint='products')
 
             product_info = {
                 'product_id': product_id,
@@ -44,179 +128,688 @@ class TikiSentimentScraper:
                 'url': data.get('url_path', ''),
                 'image_url': data.get('thumbnail_url', ''),
             }
+            if self.normalizer is not None:
+                product_info['short_description'] = self.normalizer.normalize(product_info['short_description'])
 
             return product_info
         except Exception as e:
-            print(f"Lỗi khi lấy thông tin sản phẩm {product_id}: {e}")
+            self._report_error('products', f"Lỗi khi lấy thông tin sản phẩm {product_id}: {e}")
             return None
 
-    def get_reviews(self, product_id: str, limit=500):
-        """Lấy đánh giá sản phẩm từ API của Tiki"""
+    def _fetch_reviews_page(self, product_id, page, sort=None):
+        """Lấy một trang đánh giá, trả về (danh sách đánh giá, số trang cuối)"""
+        if self.journal is not None:
+            saved = self.journal.get_review_page(product_id, page)
+            if saved is not None:
+                return saved
+
+        params = {
+            'product_id': product_id,
+            'page': page,
+            'limit': self.reviews_page_size,
+            'include': 'comments,contribute_info,attribute_vote_summary'
+        }
+        if sort:
+            params['sort'] = sort
+
+        data = self.client.get_json(self.api_url, params=params, endpoint='reviews')
+        reviews, last_page = data.get('data', []), data.get('paging', {}).get('last_page', 1)
+
+        if self.journal is not None:
+            self.journal.save_review_page(product_id, page, reviews, last_page)
+
+        return reviews, last_page
+
+    def get_reviews(self, product_id: str, limit=500, page_workers=None, incremental=False):
+        """Lấy đánh giá sản phẩm từ API của Tiki
+
+        Khi page_workers > 1, sau khi trang 1 cho biết số trang, các trang còn lại
+        được lấy song song (tối đa page_workers luồng cho mỗi sản phẩm).
+        Khi incremental=True (cần self.watermarks), chỉ lấy các đánh giá mới hơn lần crawl trước.
+        """
+        if incremental and self.watermarks is not None:
+            return self._get_new_reviews(product_id, limit)[0]
+
+        page_workers = page_workers or self.page_workers
+        if page_workers <= 1:
+            return self._get_reviews_sequential(product_id, limit)
+
+        try:
+            reviews, total_pages = self._fetch_reviews_page(product_id, 1)
+        except Exception as e:
+            self._report_error('reviews', f"Lỗi khi lấy đánh giá trang 1 cho sản phẩm {product_id}: {e}")
+            return []
+
+        # Chỉ lấy đủ số trang cần cho limit
+        last_page = min(total_pages, math.ceil(limit / self.reviews_page_size))
+        if last_page <= 1 or len(reviews) >= limit:
+            return reviews[:limit]
+
+        def fetch(page):
+            try:
+                return self._fetch_reviews_page(product_id, page)[0]
+            except Exception as e:
+                self._report_error('reviews', f"Lỗi khi lấy đánh giá trang {page} cho sản phẩm {product_id}: {e}")
+                return None
+
+        # executor.map trả kết quả theo đúng thứ tự trang
+        with ThreadPoolExecutor(max_workers=page_workers) as executor:
+            for page_reviews in executor.map(fetch, range(2, last_page + 1)):
+                if page_reviews is None:
+                    # Giống chế độ tuần tự: dừng ở trang lỗi đầu tiên
+                    break
+                reviews.extend(page_reviews)
+
+        return reviews[:limit]
+
+    def iter_reviews(self, product_id, limit=500, incremental=False):
+        """Sinh lần lượt các đánh giá đã xử lý, lấy từng trang một (xem _iter_review_pages)"""
+        try:
+            for page_reviews in self._iter_review_pages(product_id, limit, incremental):
+                yield from self.process_reviews(page_reviews)
+        except Exception:
+            # Lỗi đã được báo trong _iter_review_pages, dừng ở trang lỗi như get_reviews
+            return
+
+    def _iter_review_pages(self, product_id, limit, incremental=False):
+        """Sinh đánh giá thô của từng trang theo đúng thứ tự trang, tối đa limit đánh giá
+
+        Sau trang 1, tối đa page_workers trang kế tiếp được lấy song song (cửa
+        sổ trượt) nên chỉ vài trang nằm trong bộ nhớ cùng lúc. Lỗi khi lấy một
+        trang được báo rồi ném ra cho bên gọi.
+        """
+        if incremental and self.watermarks is not None:
+            yield from self._iter_new_review_pages(product_id, limit)
+            return
+
+        def fetch(page):
+            try:
+                return self._fetch_reviews_page(product_id, page)[0]
+            except Exception as e:
+                self._report_error('reviews', f"Lỗi khi lấy đánh giá trang {page} cho sản phẩm {product_id}: {e}")
+                raise
+
+        try:
+            reviews, total_pages = self._fetch_reviews_page(product_id, 1)
+        except Exception as e:
+            self._report_error('reviews', f"Lỗi khi lấy đánh giá trang 1 cho sản phẩm {product_id}: {e}")
+            raise
+
+        yield reviews[:limit]
+        remaining = limit - len(reviews)
+        last_page = min(total_pages, math.ceil(limit / self.reviews_page_size))
+        if remaining <= 0 or last_page <= 1:
+            return
+
+        page_workers = max(self.page_workers, 1)
+        pages = iter(range(2, last_page + 1))
+        executor = ThreadPoolExecutor(max_workers=page_workers)
+        try:
+            pending = deque(executor.submit(fetch, page) for page in islice(pages, page_workers))
+            while pending and remaining > 0:
+                page_reviews = pending.popleft().result()
+                for page in islice(pages, 1):
+                    pending.append(executor.submit(fetch, page))
+                yield page_reviews[:remaining]
+                remaining -= len(page_reviews)
+        finally:
+            # Dừng sớm (đủ limit, lỗi hoặc bên gọi ngừng đọc): bỏ các trang chưa lấy
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _iter_new_review_pages(self, product_id, limit):
+        """Như _iter_review_pages nhưng mới nhất trước, dừng khi gặp đánh giá đã có từ lần crawl trước
+
+        Mốc trong self.watermarks chỉ được đẩy lên khi đã duyệt xong không lỗi.
+        """
+        page = 1
+        total_pages = 1
+        remaining = limit
+        latest = []
+
+        while page <= total_pages and remaining > 0:
+            try:
+                page_reviews, total_pages = self._fetch_reviews_page(product_id, page, sort=self.newest_first_sort)
+            except Exception as e:
+                self._report_error('reviews', f"Lỗi khi lấy đánh giá trang {page} cho sản phẩm {product_id}: {e}")
+                raise
+
+            new_reviews = [r for r in page_reviews if not self.watermarks.is_known(product_id, r)][:remaining]
+            if new_reviews:
+                # Chỉ giữ đánh giá có id / created_at lớn nhất để cập nhật mốc
+                latest.append(max(new_reviews, key=lambda r: int(r.get('id') or 0)))
+                latest.append(max(new_reviews, key=lambda r: int(r.get('created_at') or 0)))
+                yield new_reviews
+            remaining -= len(new_reviews)
+
+            # Trang có đánh giá cũ nghĩa là các trang sau đều đã có
+            if len(new_reviews) < len(page_reviews):
+                break
+            page += 1
+
+        self.watermarks.update(product_id, latest)
+
+    def _get_new_reviews(self, product_id, limit):
+        """Lấy đánh giá mới nhất trước, dừng khi gặp đánh giá đã có từ lần crawl trước
+
+        Trả về (danh sách đánh giá mới, đã duyệt xong hay chưa).
+        """
+        reviews = []
+        try:
+            for page_reviews in self._iter_new_review_pages(product_id, limit):
+                reviews.extend(page_reviews)
+        except Exception:
+            return reviews, False
+        return reviews, True
+
+    def _get_reviews_sequential(self, product_id, limit):
+        """Lấy lần lượt từng trang đánh giá"""
         reviews = []
         page = 1
         total_pages = 1
 
         while page <= total_pages and len(reviews) < limit:
-            params = {
-                'product_id': product_id,
-                'page': page,
-                'limit': 20,  # Số lượng đánh giá trên mỗi trang
-                'include': 'comments,contribute_info,attribute_vote_summary'
-            }
-
             try:
-                response = self.session.get(self.api_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                # Cập nhật số trang tổng cộng
-                total_pages = data.get('paging', {}).get('last_page', 1)
+                page_reviews, total_pages = self._fetch_reviews_page(product_id, page)
 
                 # Thêm đánh giá vào danh sách
-                reviews.extend(data.get('data', []))
+                reviews.extend(page_reviews)
 
                 # Tăng số trang
                 page += 1
 
-                # Thêm độ trễ để tránh bị chặn
-                # time.sleep(random.uniform(0.5, 1.5))
-
             except Exception as e:
-                print(f"Lỗi khi lấy đánh giá trang {page} cho sản phẩm {product_id}: {e}")
+                self._report_error('reviews', f"Lỗi khi lấy đánh giá trang {page} cho sản phẩm {product_id}: {e}")
                 break
 
         return reviews[:limit]
 
+    def process_reviews_columnar(self, reviews):
+        """Xử lý đánh giá thô thành các cột (utils.records.ReviewColumns)"""
+        start = time.perf_counter()
+        columns = ReviewColumns(reviews)
+        if self.normalizer is not None:
+            columns.normalize(self.normalizer)
+        if self.metrics is not None:
+            self.metrics.observe('tiki_parse_seconds', time.perf_counter() - start)
+            self.metrics.inc('tiki_reviews_total', len(columns))
+        return columns
+
     def process_reviews(self, reviews):
         """Xử lý dữ liệu đánh giá thô thành dạng cấu trúc"""
-        processed_reviews = []
+        return self.process_reviews_columnar(reviews).to_dicts()
+
+    @staticmethod
+    def _product_summary(product):
+        """Các trường sản phẩm có sẵn trong kết quả tìm kiếm / listing"""
+        summary = {
+            'product_id': product.get('id', ''),
+            'name': product.get('name', ''),
+            'price': product.get('price', 0),
+            'rating_average': product.get('rating_average', 0),
+            'review_count': product.get('review_count', 0),
+            'url': product.get('url_path', '')
+        }
+        # Các trường thông tin sản phẩm khác nếu payload có sẵn (khỏi gọi get_product_info)
+        for key, source in SUMMARY_EXTRA_FIELDS.items():
+            if product.get(source) is not None:
+                summary[key] = product[source]
+        return summary
+
+    @staticmethod
+    def _info_from_summary(summary):
+        """Dựng product_info từ kết quả tìm kiếm nếu đã đủ trường, ngược lại None"""
+        if not isinstance(summary, dict) or any(summary.get(key) is None for key in SUMMARY_REQUIRED_FIELDS):
+            return None
+        info = {key: summary.get(key, '') for key in PRODUCT_INFO_FIELDS}
+        info['product_id'] = str(summary['product_id'])
+        return info
 
-        for review in reviews:
-            try:
-                processed_review = {
-                    'review_id': review.get('id', ''),
-                    'title': review.get('title', ''),
-                    'content': review.get('content', ''),
-                    'rating': review.get('rating', 0),
-                    'created_at': review.get('created_at', ''),
-                    'customer_name': review.get('created_by', {}).get('name', ''),
-                    'product_id': review.get('product_id', ''),
-                    'is_verified': review.get('is_verified', False),
-                    'number_of_likes': review.get('number_of_likes', 0),
-                    'number_of_replies': review.get('number_of_replies', 0)
-                }
-
-                # Thêm nhãn sentiment dựa trên số sao
-                if processed_review['rating'] >= 4:
-                    processed_review['sentiment'] = 'positive'
-                elif processed_review['rating'] <= 2:
-                    processed_review['sentiment'] = 'negative'
-                else:
-                    processed_review['sentiment'] = 'neutral'
-
-                processed_reviews.append(processed_review)
-            except Exception as e:
-                print(f"Lỗi khi xử lý đánh giá: {e}")
-                continue
+    def _iter_search_pages(self, keyword, limit):
+        """Sinh lần lượt từng trang kết quả tìm kiếm (list sản phẩm), tối đa limit sản phẩm không trùng
+
+        Luôn gửi cùng limit=search_page_size vì server tính vị trí trang theo
+        limit; trang cuối được cắt bớt ở phía client.
+        """
+        search_url = f"{self.base_url}/api/v2/products"
+        page = 1
+        total_pages = 1
+        remaining = limit
+        seen = set()
 
-        return processed_reviews
+        while page <= total_pages and remaining > 0:
+            params = {'limit': self.search_page_size, 'q': keyword, 'page': page}
+            data = self.client.get_json(search_url, params=params, endpoint='search')
+            products = data.get('data', [])
+            if not products:
+                break
 
-    def search_products(self, keyword: str, limit=20):
-        """Tìm kiếm sản phẩm theo từ khóa"""
-        search_url = f"{self.base_url}/api/v2/products?limit={limit}&q={keyword}"
+            result = self._new_summaries(products, seen)[:remaining]
+            if result:
+                yield result
 
-        try:
-            response = self.session.get(search_url)
-            response.raise_for_status()
-            data = response.json()
+            remaining -= len(result)
+            total_pages = data.get('paging', {}).get('last_page', 1)
+            page += 1
 
-            products = data.get('data', [])
+    def _new_summaries(self, products, seen):
+        """Rút gọn các sản phẩm của một trang, bỏ ID đã có trong seen (và thêm ID mới vào seen)"""
+        result = []
+        for product in products:
+            summary = self._product_summary(product)
+            if summary['product_id'] not in seen:
+                seen.add(summary['product_id'])
+                result.append(summary)
+        return result
 
-            result = []
-            for product in products:
-                product_info = {
-                    'product_id': product.get('id', ''),
-                    'name': product.get('name', ''),
-                    'price': product.get('price', 0),
-                    'rating_average': product.get('rating_average', 0),
-                    'review_count': product.get('review_count', 0),
-                    'url': product.get('url_path', '')
-                }
-                result.append(product_info)
-
-            return result
+    def search_products(self, keyword: str, limit=20):
+        """Tìm kiếm sản phẩm theo từ khóa (lấy qua nhiều trang nếu limit lớn)"""
+        result = []
+        try:
+            for products in self._iter_search_pages(keyword, limit):
+                result.extend(products)
         except Exception as e:
-            print(f"Lỗi khi tìm kiếm sản phẩm với từ khóa '{keyword}': {e}")
-            return []
+            self._report_error('search', f"Lỗi khi tìm kiếm sản phẩm với từ khóa '{keyword}': {e}")
 
-    def get_product_ids_by_category(self, category_url:str, limit=50):
-        """Lấy danh sách ID sản phẩm từ một danh mục"""
-        product_ids = []
+        return result
 
-        try:
-            response = self.session.get(f"{self.base_url}/{category_url}")
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+    def _fan_out(self, kind, keys, iter_pages, limit, max_workers=None, seen=None):
+        """Chạy iter_pages(key, limit) cho nhiều key song song, sinh ra ngay các sản phẩm mới
 
-            # Tìm các sản phẩm trong danh mục
-            product_elements = soup.select('div[data-view-id="product_list_container"] > div')
+        Sản phẩm đã thấy (trong seen) bị bỏ qua. Nếu có self.journal, key đã
+        duyệt xong (frontier kind/key) được đọc lại từ nhật ký.
+        """
+        seen = set() if seen is None else seen
+        found = queue.Queue()
+        done = object()
 
-            for element in product_elements[:limit]:
+        def crawl(key):
+            try:
+                if self.journal is not None:
+                    saved = self.journal.get_frontier(kind, key)
+                    if saved is not None:
+                        found.put(saved)
+                        return
+
+                found_products = []
                 try:
-                    # Lấy ID sản phẩm từ thuộc tính data-id
-                    product_id = element.get('data-id', '')
-                    if product_id and product_id.isdigit():
-                        product_ids.append(product_id)
+                    for products in iter_pages(key, limit):
+                        found.put(products)
+                        found_products.extend(products)
                 except Exception as e:
+                    self._report_error(kind, f"Lỗi khi lấy sản phẩm ({kind}) '{key}': {e}")
+                    return
+
+                if self.journal is not None:
+                    self.journal.mark_frontier_done(kind, key, found_products)
+            finally:
+                found.put(done)
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            for key in keys:
+                executor.submit(crawl, key)
+
+            remaining = len(keys)
+            while remaining:
+                items = found.get()
+                if items is done:
+                    remaining -= 1
                     continue
+                for item in items:
+                    product_id = str(item['product_id'] if isinstance(item, dict) else item)
+                    if product_id and product_id not in seen:
+                        seen.add(product_id)
+                        # Đã crawl ở lần trước và chưa có đánh giá mới: bỏ qua hẳn
+                        if self.skip_unchanged and isinstance(item, dict) and self.product_index is not None \
+                                and self.product_index.is_unchanged(item):
+                            self._count_product('unchanged')
+                            continue
+                        yield item
+
+    def discover_products(self, keywords, limit_per_keyword=1000, max_workers=None, seen=None):
+        """Tìm sản phẩm cho nhiều từ khóa song song, sinh ra ngay các sản phẩm mới
+
+        Từ khóa được chuẩn hóa và bỏ trùng; sản phẩm đã thấy (trong seen, dùng
+        chung được với nguồn khác) bị bỏ qua. Kết quả có thể đưa thẳng vào
+        create_sentiment_dataset để tìm kiếm và lấy dữ liệu chạy chồng lên nhau.
+        """
+        return self._fan_out('search', normalize_keywords(keywords), self._iter_search_pages,
+                             limit_per_keyword, max_workers, seen)
+
+    @staticmethod
+    def _parse_category_url(category_url):
+        """'dien-thoai-smartphone/c1795' -> ('dien-thoai-smartphone', '1795')"""
+        match = re.search(r'([^/]+)/c(\d+)', category_url)
+        if not match:
+            return category_url.strip('/'), None
+        return match.group(1), match.group(2)
+
+    def _iter_category_listing_pages(self, category_url, limit):
+        """Lấy sản phẩm trong danh mục qua API listing JSON (có phân trang, cùng cách như _iter_search_pages)"""
+        url_key, category_id = self._parse_category_url(category_url)
+        if category_id is None:
+            raise ValueError(f"Không đọc được ID danh mục từ '{category_url}'")
+
+        page = 1
+        total_pages = 1
+        remaining = limit
+        seen = set()
+
+        while page <= total_pages and remaining > 0:
+            params = {
+                'limit': self.search_page_size,
+                'category': category_id,
+                'urlKey': url_key,
+                'page': page
+            }
+            data = self.client.get_json(self.category_api_url, params=params, endpoint='category')
+            products = data.get('data', [])
+            if not products:
+                break
+
+            result = self._new_summaries(products, seen)[:remaining]
+            if result:
+                yield result
+
+            remaining -= len(result)
+            total_pages = data.get('paging', {}).get('last_page', 1)
+            page += 1
+
+    def _iter_category_html_pages(self, category_url, limit):
+        """Dự phòng: đọc data-id trong trang HTML danh mục bằng regex, không parse toàn trang
+
+        Dừng khi một trang không có ID mới (server bỏ qua tham số page thì
+        trang nào cũng giống nhau).
+        """
+        remaining = limit
+        page = 1
+        seen = set()
 
-            return product_ids
+        while remaining > 0:
+            html = self.client.get_text(f"{self.base_url}/{category_url}", params={'page': page}, endpoint='category')
+
+            # Chỉ quét phần sau khung danh sách sản phẩm
+            start = html.find('data-view-id="product_list_container"')
+            if start < 0:
+                break
+            product_ids = [pid for pid in dict.fromkeys(self._category_id_pattern.findall(html, start))
+                           if pid not in seen]
+            if not product_ids:
+                break
+
+            seen.update(product_ids)
+            product_ids = product_ids[:remaining]
+            yield product_ids
+            remaining -= len(product_ids)
+            page += 1
+
+    def _iter_category_pages(self, category_url, limit):
+        """Ưu tiên API listing JSON, lỗi thì chuyển sang đọc HTML"""
+        yielded = 0
+        try:
+            for products in self._iter_category_listing_pages(category_url, limit):
+                yielded += len(products)
+                yield products
+            if yielded:
+                return
         except Exception as e:
-            print(f"Lỗi khi lấy danh sách sản phẩm từ danh mục '{category_url}': {e}")
-            return []
+            if yielded:
+                raise
+            self._report_error('category_listing', f"Không dùng được API listing cho danh mục '{category_url}', chuyển sang HTML: {e}")
 
-    def create_sentiment_dataset(self, product_ids, reviews_per_product=100):
-        """Tạo bộ dữ liệu sentiment từ danh sách ID sản phẩm"""
-        all_reviews = []
+        yield from self._iter_category_html_pages(category_url, limit)
+
+    def get_product_ids_by_category(self, category_url:str, limit=50):
+        """Lấy danh sách ID sản phẩm từ một danh mục"""
+        product_ids = []
+
+        try:
+            for products in self._iter_category_pages(category_url, limit):
+                product_ids.extend(str(p['product_id']) if isinstance(p, dict) else p for p in products)
+        except Exception as e:
+            self._report_error('category', f"Lỗi khi lấy danh sách sản phẩm từ danh mục '{category_url}': {e}")
+
+        return list(dict.fromkeys(product_ids))[:limit]
+
+    def discover_categories(self, category_urls, limit_per_category=1000, max_workers=None, seen=None):
+        """Lấy sản phẩm của nhiều danh mục song song, sinh ra ngay các sản phẩm mới"""
+        return self._fan_out('category', list(dict.fromkeys(category_urls)), self._iter_category_pages,
+                             limit_per_category, max_workers, seen)
+
+    def _count_product(self, result):
+        if self.metrics is not None:
+            self.metrics.inc('tiki_products_total', result=result)
+
+    def _crawl_product(self, product_id, reviews_per_product, incremental=False, summary=None, on_reviews=None):
+        """Lấy thông tin và đánh giá của một sản phẩm (chạy trong luồng con)
+
+        summary: kết quả tìm kiếm / listing của sản phẩm; nếu đủ trường thì không gọi get_product_info.
+        on_reviews: nếu có, mỗi trang đánh giá được xử lý rồi chuyển ngay cho
+        on_reviews(ReviewColumns) thay vì gom lại, và hàm trả về (product_info, số đánh giá).
+        """
+        incremental = incremental and self.watermarks is not None
+        collected = None
+        if on_reviews is None:
+            collected = ReviewColumns()
+            on_reviews = collected.extend
+        count = 0
+
+        product_info = None
+        if self.journal is not None:
+            product_info, done = self.journal.get_product(product_id)
+            if done:
+                # Sản phẩm đã xong ở lần chạy trước, đọc lại từ nhật ký
+                reviews = self.journal.load_reviews(product_id)
+                if incremental:
+                    reviews = [r for r in reviews if not self.watermarks.is_known(product_id, r)]
+                    self.watermarks.update(product_id, reviews)
+                self._count_product('journal')
+                columns = self.process_reviews_columnar(reviews[:reviews_per_product])
+                on_reviews(columns)
+                return product_info, collected if collected is not None else len(columns)
+
+        if product_info is None:
+            product_info = self._info_from_summary(summary)
+            if product_info is not None:
+                self._count_product('from_search')
+            else:
+                product_info = self.get_product_info(product_id)
+            if not product_info:
+                self._count_product('missing')
+                return None, collected if collected is not None else 0
+            if self.journal is not None:
+                self.journal.save_product_info(product_id, product_info)
+
+        complete = True
+        try:
+            for page_reviews in self._iter_review_pages(product_id, reviews_per_product, incremental):
+                if not incremental and self.watermarks is not None:
+                    self.watermarks.update(product_id, page_reviews)
+                columns = self.process_reviews_columnar(page_reviews)
+                on_reviews(columns)
+                count += len(columns)
+        except Exception:
+            # Lỗi đã được báo trong _iter_review_pages; giữ các trang đã lấy, lần sau tải lại phần thiếu
+            complete = False
+
+        if not incremental and self.journal is not None:
+            # Chỉ đánh dấu xong khi đã có đủ các trang (lỗi giữa chừng sẽ được tải lại)
+            max_pages = math.ceil(reviews_per_product / self.reviews_page_size)
+            complete = complete and self.journal.review_pages_complete(product_id, max_pages)
+
+        if self.journal is not None and complete:
+            self.journal.mark_product_done(product_id)
+
+        # Chỉ ghi vào chỉ mục khi lượt lấy đánh giá không lỗi (và đủ trang nếu có nhật ký)
+        if self.product_index is not None and complete:
+            self.product_index.update(product_info)
+
+        self._count_product('crawled')
+        return product_info, collected if collected is not None else count
+
+    def iter_dataset(self, product_ids, reviews_per_product=100, max_workers=None, incremental=False, on_reviews=None):
+        """Sinh lần lượt (product_info, ReviewColumns) theo thứ tự product_ids
+
+        Chỉ giữ tối đa 2 * max_workers sản phẩm đang xử lý, nên bộ nhớ không
+        tăng theo số sản phẩm. product_info là None nếu không lấy được sản phẩm.
+        Phần tử của product_ids có thể là ID hoặc dict kết quả tìm kiếm (có 'product_id').
+        on_reviews: nhận từng trang đánh giá ngay khi tới (gọi từ nhiều luồng), khi
+        đó phần tử thứ hai là số đánh giá của sản phẩm thay cho ReviewColumns.
+        """
+        max_workers = max_workers or self.max_workers
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for item in product_ids:
+                product_id, summary = (str(item['product_id']), item) if isinstance(item, dict) else (item, None)
+                pending.append(executor.submit(self._crawl_product, product_id, reviews_per_product, incremental,
+                                               summary, on_reviews))
+                if len(pending) >= max_workers * 2:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_scheduled(self, scheduler, max_workers=None, incremental=False, on_reviews=None):
+        """Sinh (product_info, ReviewColumns) theo thứ tự do scheduler quyết định
+
+        scheduler (utils.scheduler.YieldScheduler) chọn sản phẩm và số đánh giá
+        cần lấy, được cập nhật sau mỗi sản phẩm và dừng khi đủ quota. Slot trống
+        chỉ được lấp khi scheduler còn cần thêm đánh giá ngoài phần đang chạy.
+        on_reviews: như iter_dataset (phần tử thứ hai khi đó là số đánh giá).
+        """
+        max_workers = max_workers or self.max_workers
+
+        def crawl(product, limit):
+            if on_reviews is None:
+                product_info, reviews = self._crawl_product(str(product['product_id']), limit, incremental, product)
+                return product_info, reviews, reviews
+
+            # Ghi thẳng từng trang, chỉ giữ số đánh giá theo lớp cho scheduler
+            counts = Counter()
+
+            def sink(columns):
+                counts.update(columns.sentiment())
+                on_reviews(columns)
+
+            product_info, count = self._crawl_product(str(product['product_id']), limit, incremental, product, sink)
+            return product_info, count, counts
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while True:
+                while len(running) < max_workers:
+                    task = scheduler.next()
+                    if task is None:
+                        break
+                    product, limit = task
+                    running[executor.submit(crawl, product, limit)] = product
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    product = running.pop(future)
+                    product_info, result, counts = future.result()
+                    scheduler.observe(product, product_info, counts)
+                    yield product_info, result
+
+    def create_sentiment_dataset(self, product_ids, reviews_per_product=100, max_workers=None, incremental=False,
+                                 scheduler=None):
+        """Tạo bộ dữ liệu sentiment từ danh sách ID sản phẩm
+
+        incremental=True: chỉ lấy đánh giá mới hơn mốc trong self.watermarks
+        (gọi self.watermarks.save() sau khi đã lưu bộ dữ liệu).
+        scheduler: utils.scheduler.YieldScheduler để ưu tiên sản phẩm có nhiều đánh giá
+        negative/neutral và dừng khi đủ quota (khi đó thứ tự sản phẩm do scheduler quyết định).
+        """
+        all_reviews = ReviewColumns()
         product_info_list = []
 
-        for product_id in tqdm(product_ids, desc="Đang lấy dữ liệu từ sản phẩm"):
-            # Lấy thông tin sản phẩm
-            product_info = self.get_product_info(product_id)
+        if scheduler is not None:
+            scheduler.add(product_ids, default_review_count=reviews_per_product)
+            results = self.iter_scheduled(scheduler, max_workers, incremental)
+            total = None
+        else:
+            # Lấy dữ liệu nhiều sản phẩm song song, kết quả giữ nguyên thứ tự product_ids
+            results = self.iter_dataset(product_ids, reviews_per_product, max_workers, incremental)
+            total = len(product_ids) if hasattr(product_ids, '__len__') else None
+
+        for product_info, processed_reviews in tqdm(results, total=total, desc="Đang lấy dữ liệu từ sản phẩm"):
             if product_info:
                 product_info_list.append(product_info)
+                all_reviews.extend(processed_reviews)
 
-                # Lấy đánh giá
-                # reviews = self.get_reviews(product_id, limit=reviews_per_product)
-                # processed_reviews = self.process_reviews(reviews)
-                # all_reviews.extend(processed_reviews)
-
-                # Thêm độ trễ để tránh bị chặn
-                # time.sleep(random.uniform(1, 2))
-
-        # Tạo DataFrame
-        # reviews_df = pd.DataFrame(all_reviews)
+        # Tạo DataFrame (các cột đánh giá được chuyển thẳng, không qua list dict)
+        import pandas as pd
+        reviews_df = all_reviews.to_frame()
         products_df = pd.DataFrame(product_info_list)
 
-        reviews_df = []
         return reviews_df, products_df
 
-    def save_dataset(self, reviews_df, products_df, output_dir='.'):
-        """Lưu bộ dữ liệu ra file"""
-        # Lưu thành file CSV
+    def stream_dataset(self, product_ids, reviews_per_product=100, output_dir='.', shard_size=50000,
+                       max_workers=None, incremental=False, scheduler=None):
+        """Crawl và ghi dần ra các shard JSONL thay vì giữ toàn bộ trong bộ nhớ
+
+        Mỗi trang đánh giá được ghi xuống shard ngay khi tới, nên bộ nhớ chỉ
+        giữ vài trang cho mỗi sản phẩm đang xử lý. scheduler: như create_sentiment_dataset.
+        """
+        reviews_writer = ShardWriter(output_dir, prefix='tiki_reviews', shard_size=shard_size)
+        products_writer = ShardWriter(output_dir, prefix='tiki_products', shard_size=shard_size)
+        total = len(product_ids) if hasattr(product_ids, '__len__') else None
+        lock = threading.Lock()
+
+        def write_reviews(columns):
+            with lock:
+                reviews_writer.write_many(columns)
+
+        with reviews_writer, products_writer:
+            if scheduler is not None:
+                scheduler.add(product_ids, default_review_count=reviews_per_product)
+                results = self.iter_scheduled(scheduler, max_workers, incremental, write_reviews)
+                total = None
+            else:
+                results = self.iter_dataset(product_ids, reviews_per_product, max_workers, incremental, write_reviews)
+            for product_info, _ in tqdm(results, total=total, desc="Đang lấy dữ liệu từ sản phẩm"):
+                if product_info:
+                    products_writer.write(product_info)
+
+        print(f"Đã lưu {reviews_writer.total} đánh giá từ {products_writer.total} sản phẩm")
+
+        return {
+            'reviews_shards': reviews_writer.shards,
+            'products_shards': products_writer.shards
+        }
+
+    def save_dataset(self, reviews_df, products_df, output_dir='.', formats=('csv', 'json')):
+        """Lưu bộ dữ liệu ra file
+
+        formats: tập con của ('csv', 'json', 'parquet'). Parquet có kiểu dữ liệu
+        cố định, nén và phân vùng theo ngày snapshot + category_name (xem utils.columnar).
+        """
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        reviews_df.to_csv(f"{output_dir}/tiki_reviews_{timestamp}.csv", index=False, encoding='utf-8-sig')
-        products_df.to_csv(f"{output_dir}/tiki_products_{timestamp}.csv", index=False, encoding='utf-8-sig')
+        output_files = {}
+
+        # Lưu thành file CSV
+        if 'csv' in formats:
+            reviews_df.to_csv(f"{output_dir}/tiki_reviews_{timestamp}.csv", index=False, encoding='utf-8-sig')
+            products_df.to_csv(f"{output_dir}/tiki_products_{timestamp}.csv", index=False, encoding='utf-8-sig')
+            output_files['reviews_csv'] = f"{output_dir}/tiki_reviews_{timestamp}.csv"
+            output_files['products_csv'] = f"{output_dir}/tiki_products_{timestamp}.csv"
 
         # Lưu thành file JSON
-        reviews_df.to_json(f"{output_dir}/tiki_reviews_{timestamp}.json", orient='records', force_ascii=False)
-        products_df.to_json(f"{output_dir}/tiki_products_{timestamp}.json", orient='records', force_ascii=False)
+        if 'json' in formats:
+            reviews_df.to_json(f"{output_dir}/tiki_reviews_{timestamp}.json", orient='records', force_ascii=False)
+            products_df.to_json(f"{output_dir}/tiki_products_{timestamp}.json", orient='records', force_ascii=False)
+            output_files['reviews_json'] = f"{output_dir}/tiki_reviews_{timestamp}.json"
+            output_files['products_json'] = f"{output_dir}/tiki_products_{timestamp}.json"
+
+        # Lưu thành Parquet (cần pyarrow)
+        if 'parquet' in formats:
+            from utils.columnar import save_parquet
+            snapshot = time.strftime("%Y-%m-%d")
+            output_files.update(save_parquet(reviews_df, products_df, output_dir, snapshot=snapshot))
 
         print(f"Đã lưu bộ dữ liệu gồm {len(reviews_df)} đánh giá từ {len(products_df)} sản phẩm")
 
-        return {
-            'reviews_csv': f"{output_dir}/tiki_reviews_{timestamp}.csv",
-            'products_csv': f"{output_dir}/tiki_products_{timestamp}.csv",
-            'reviews_json': f"{output_dir}/tiki_reviews_{timestamp}.json",
-            'products_json': f"{output_dir}/tiki_products_{timestamp}.json"
-        }
+        return output_files
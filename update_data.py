@@ -1,27 +1,37 @@
 import pandas as pd
 import os
+import json
 import requests
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
-import random
+from utils.api_helpers import ApiClient
+from utils.http_cache import ENRICH_TTLS, ResponseCache
 
-# Hàm lấy thông tin sản phẩm từ API Tiki dựa trên product_id
-def get_product_info_from_api(product_id):
-    product_api_url = f'https://tiki.vn/api/v2/products/{product_id}'
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7',
-    }
+# Số request chạy song song khi bổ sung dữ liệu
+max_workers = 8
 
-    try:
-        response = requests.get(product_api_url, headers=headers)
+# Request đi qua session dùng chung (keep-alive) + rate limiter + retry thay cho sleep cố định.
+# Cache dùng chung với raw_app.py nên các sản phẩm vừa crawl không phải tải lại
+# (ảnh + danh mục ít thay đổi nên chấp nhận response cũ tới ENRICH_TTLS).
+# Chỉ tạo khi dùng lần đầu để import module không mở cache/session.
+client = None
+_client_lock = threading.Lock()
 
-        # Kiểm tra mã trạng thái HTTP
-        if response.status_code != 200:
-            print(f"Error fetching data for product ID {product_id}: HTTP {response.status_code}")
-            return {'image_url': '', 'category_name': ''}  # Trả về thông tin mặc định nếu có lỗi HTTP
+def get_client():
+    global client
+    with _client_lock:
+        if client is None:
+            client = ApiClient(cache=ResponseCache(ttls=ENRICH_TTLS), pool_size=max_workers)
+        return client
 
-        data = response.json()
+# Endpoint thông tin sản phẩm (benchmark đổi sang server giả lập)
+product_api_url = 'https://tiki.vn/api/v2/products'
+
+# Hàm lấy thông tin sản phẩm từ API Tiki dựa trên product_id
+def get_product_info_from_api(product_id):
+    try:
+        data = get_client().get_json(f'{product_api_url}/{product_id}', endpoint='products')
 
         # Kiểm tra nếu dữ liệu không đầy đủ
         if 'thumbnail_url' not in data or ('categories' not in data and 'breadcrumbs' not in data):
@@ -43,46 +53,91 @@ def get_product_info_from_api(product_id):
             'image_url': thumbnail_url,
             'category_name': category_name
         }
+    except requests.exceptions.HTTPError as e:
+        # Lỗi HTTP sau khi đã thử lại hết số lần cho phép
+        print(f"Error fetching data for product ID {product_id}: HTTP {e.response.status_code}")
+        return {'image_url': '', 'category_name': ''}  # Trả về thông tin mặc định nếu có lỗi HTTP
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data for product ID {product_id}: {e}")
         return {'image_url': '', 'category_name': ''}  # Nếu lỗi kết nối hoặc exception khác
 
-# Hàm bổ sung dữ liệu thiếu cho các sản phẩm
-def add_missing_data(df):
-    for index, row in tqdm(df.iterrows(), total=len(df), desc="Đang bổ sung dữ liệu"):
-        # Nếu đã có đủ dữ liệu thì bỏ qua
-        if row['image_url'] and row['category_name']:
-            continue
+# Mặt nạ các dòng còn thiếu image_url hoặc category_name
+def needs_enrichment(df):
+    missing = pd.Series(False, index=df.index)
+    for column in ('image_url', 'category_name'):
+        missing |= df[column].isna() | (df[column].astype(str).str.strip() == '')
+    return missing
+
+# Đọc tiến độ đã lưu (mỗi dòng một sản phẩm đã lấy xong)
+def load_progress(progress_path):
+    progress = {}
+    if os.path.exists(progress_path):
+        with open(progress_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    progress[item['product_id']] = item
+    return progress
 
-        product_id = row['product_id']
-        product_info = get_product_info_from_api(product_id)
+# Hàm bổ sung dữ liệu thiếu cho các sản phẩm
+def add_missing_data(df, max_workers=max_workers, progress_path=None):
+    mask = needs_enrichment(df)
+    keys = df.loc[mask, 'product_id'].astype(str)
 
-        df.at[index, 'image_url'] = product_info['image_url']
-        df.at[index, 'category_name'] = product_info['category_name']
+    # Tiến độ được ghi dần ra file nên có thể chạy tiếp nếu bị dừng giữa chừng
+    progress = load_progress(progress_path) if progress_path else {}
+    todo = [product_id for product_id in keys.unique() if product_id not in progress]
 
-        # Chờ để tránh quá tải API
-        time.sleep(random.uniform(1, 3))
+    progress_file = open(progress_path, 'a', encoding='utf-8') if progress_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(get_product_info_from_api, todo)
+            for product_id, product_info in tqdm(zip(todo, results), total=len(todo), desc="Đang bổ sung dữ liệu"):
+                # Chỉ lưu tiến độ khi lấy được dữ liệu, lỗi thì lần sau thử lại
+                if not (product_info['image_url'] or product_info['category_name']):
+                    continue
+                progress[product_id] = dict(product_info, product_id=product_id)
+                if progress_file:
+                    progress_file.write(json.dumps(progress[product_id], ensure_ascii=False) + '\n')
+                    progress_file.flush()
+    finally:
+        if progress_file:
+            progress_file.close()
+
+    # Ghi kết quả theo cả cột, chỉ điền vào các ô đang trống
+    for column in ('image_url', 'category_name'):
+        fetched = keys.map({product_id: info[column] for product_id, info in progress.items()})
+        current = df.loc[mask, column]
+        has_value = current.notna() & (current.astype(str).str.strip() != '')
+        # Sản phẩm chưa lấy được (lỗi / chưa tới lượt) giữ nguyên giá trị cũ, không ghi NaN
+        df[column] = df[column].astype(object)
+        df.loc[mask, column] = current.where(has_value | fetched.isna(), fetched)
 
     return df
 
-# Đọc dữ liệu từ file CSV đã gộp
-folder_path = "data"  # Thư mục chứa file đã gộp
-merged_file_path = os.path.join(folder_path, "merged_tiki_products.csv")
-df = pd.read_csv(merged_file_path)
+def enrich_products(folder_path="data", merged_file_path=None):
+    """Bổ sung image_url / category_name còn thiếu cho merged_tiki_products.csv trong folder_path (hoặc merged_file_path)"""
+    merged_file_path = merged_file_path or os.path.join(folder_path, "merged_tiki_products.csv")
+    progress_path = os.path.join(folder_path, "enrich_progress.jsonl")
+    df = pd.read_csv(merged_file_path)
 
-# Kiểm tra nếu thiếu 2 cột cần bổ sung
-if 'image_url' not in df.columns or 'category_name' not in df.columns:
     # Thêm 2 cột nếu chưa có
     if 'image_url' not in df.columns:
         df['image_url'] = ''
     if 'category_name' not in df.columns:
         df['category_name'] = ''
 
-    # Bổ sung dữ liệu thiếu
-    df = add_missing_data(df)
+    # Kiểm tra các dòng còn thiếu dữ liệu
+    if needs_enrichment(df).any():
+        # Bổ sung dữ liệu thiếu
+        df = add_missing_data(df, progress_path=progress_path)
+
+        # Lưu lại file CSV đã bổ sung dữ liệu
+        df.to_csv(merged_file_path, index=False)
+        print(f"Đã bổ sung dữ liệu và lưu lại tại: {merged_file_path}")
+    else:
+        print("Không cần bổ sung dữ liệu vì các trường đã đầy đủ.")
 
-    # Lưu lại file CSV đã bổ sung dữ liệu
-    df.to_csv('merged_tiki_products.csv', index=False)
-    print(f"Đã bổ sung dữ liệu và lưu lại tại: {merged_file_path}")
-else:
-    print("Không cần bổ sung dữ liệu vì các trường đã đầy đủ.")
+if __name__ == '__main__':
+    # Đọc dữ liệu từ file CSV đã gộp
+    enrich_products("data")  # Thư mục chứa file đã gộp
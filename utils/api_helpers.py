@@ -1,20 +1,255 @@
+import email.utils
+import json
+import random
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from utils.http_cache import OfflineCacheMiss
+
+# Giải mã JSON nhanh hơn bằng orjson nếu đã cài
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 HEADERS = {
-    # headers như cũ
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept': 'application/json, text/plain, */*',
+    'Origin': 'https://tiki.vn',
+    'Referer': 'https://tiki.vn/'
 }
 
-session = requests.Session()
-session.headers.update(HEADERS)
+# Ngân sách mặc định (số request/giây) cho từng nhóm endpoint
+DEFAULT_RATES = {
+    'products': 5.0,
+    'reviews': 8.0,
+    'search': 2.0,
+    'category': 1.0,
+    'default': 3.0,
+}
 
-def get_with_retry(url, params=None, max_retries=3, delay=1):
-    for attempt in range(max_retries):
-        try:
-            response = session.get(url, params=params)
+# Các mã trạng thái nên thử lại
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Timeout mặc định (giây) cho mỗi request: (kết nối, đọc)
+DEFAULT_TIMEOUT = (10, 30)
+
+
+class TokenBucket:
+    """Token bucket tự điều chỉnh tốc độ theo phản hồi của server
+
+    Thành công thì tăng dần tốc độ về max_rate, gặp 429/5xx thì giảm một nửa
+    và tạm dừng theo Retry-After nếu server gửi về.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.2, increase_step=0.05):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.increase_step = increase_step
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Chờ tới khi lấy được một token"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.increase_step)
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+class RateLimiter:
+    """Giữ một TokenBucket riêng cho mỗi nhóm endpoint (products, reviews, search...)"""
+
+    def __init__(self, rates=None):
+        self.rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        with self.lock:
+            if endpoint not in self.buckets:
+                rate = self.rates.get(endpoint, self.rates['default'])
+                self.buckets[endpoint] = TokenBucket(rate)
+            return self.buckets[endpoint]
+
+
+def parse_retry_after(value):
+    """Đổi header Retry-After (số giây hoặc ngày giờ HTTP) thành số giây"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ApiClient:
+    """Lớp gửi request dùng chung: giới hạn tốc độ theo endpoint + thử lại với backoff
+
+    Nếu có cache (utils.http_cache.ResponseCache), get_json/get_text đọc cache
+    trước khi gửi request. Nếu có metrics (utils.metrics.CrawlMetrics), mỗi
+    request được ghi lại: độ trễ, mã trạng thái, số byte, số lần thử lại và
+    thời gian chờ rate limiter theo endpoint.
+    """
+
+    def __init__(self, session=None, limiter=None, max_retries=5, backoff_base=0.5, backoff_max=30.0, pool_size=10, cache=None,
+                 metrics=None, timeout=DEFAULT_TIMEOUT):
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+
+        self.session = session
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.metrics = metrics
+        self.timeout = timeout
+
+    def _backoff(self, attempt, retry_after=None):
+        """Exponential backoff với full jitter, không ngắn hơn Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def get(self, url, params=None, endpoint='default'):
+        """Gửi GET qua rate limiter, thử lại khi lỗi mạng, timeout hoặc 429/5xx
+
+        max_retries là tổng số lần gửi (ít nhất 1).
+        """
+        if self.cache is not None and self.cache.offline:
+            raise OfflineCacheMiss(f"Không có trong cache (offline): {url}")
+
+        bucket = self.limiter.bucket(endpoint)
+        metrics = self.metrics
+        attempts = max(1, self.max_retries)
+
+        for attempt in range(attempts):
+            if metrics is None:
+                bucket.acquire()
+            else:
+                if attempt:
+                    metrics.inc('tiki_retries_total', endpoint=endpoint)
+                with metrics.timer('tiki_ratelimit_wait_seconds', endpoint=endpoint):
+                    bucket.acquire()
+
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if metrics is not None:
+                    metrics.inc('tiki_requests_total', endpoint=endpoint, status=type(e).__name__)
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if metrics is not None:
+                metrics.observe('tiki_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+                metrics.inc('tiki_requests_total', endpoint=endpoint, status=response.status_code)
+                metrics.inc('tiki_bytes_total', len(response.content), endpoint=endpoint)
+
+            if response.status_code in RETRY_STATUS:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                bucket.on_throttle(retry_after)
+                if attempt == attempts - 1:
+                    response.raise_for_status()
+                backoff = self._backoff(attempt, retry_after)
+                if metrics is not None:
+                    metrics.inc('tiki_backoff_seconds_total', backoff, endpoint=endpoint)
+                time.sleep(backoff)
+                continue
+
+            # Các lỗi 4xx khác (404...) không thử lại
             response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise
-            time.sleep(delay)
+            bucket.on_success()
+            return response
+
+    def fetch(self, url, params=None, endpoint='default'):
+        """Lấy body (bytes), ưu tiên cache nếu còn hạn"""
+        if self.cache is not None:
+            body = self.cache.get(url, params, endpoint)
+            if self.metrics is not None:
+                self.metrics.inc('tiki_cache_total', endpoint=endpoint, result='miss' if body is None else 'hit')
+            if body is not None:
+                return body
+
+        body = self.get(url, params=params, endpoint=endpoint).content
+        if self.cache is not None:
+            self.cache.set(url, params, endpoint, body)
+        return body
+
+    def get_json(self, url, params=None, endpoint='default'):
+        return json_loads(self.fetch(url, params=params, endpoint=endpoint))
+
+    def get_text(self, url, params=None, endpoint='default'):
+        return self.fetch(url, params=params, endpoint=endpoint).decode('utf-8', errors='replace')
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """ApiClient dùng chung của module, chỉ tạo (kèm session) khi dùng lần đầu"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = ApiClient()
+        return _default_client
+
+
+def __getattr__(name):
+    # api_helpers.session (API cũ) cũng được tạo khi dùng lần đầu
+    if name == 'session':
+        return default_client().session
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_with_retry(url, params=None, max_retries=3, delay=1):
+    client = default_client()
+    client = ApiClient(client.session, client.limiter, max_retries=max_retries, backoff_base=delay)
+    return client.get_json(url, params=params)
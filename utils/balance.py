@@ -0,0 +1,148 @@
+import math
+import random
+from collections import Counter, defaultdict
+
+from utils.shards import ShardWriter
+
+# Tỉ lệ chia train/val/test mặc định
+DEFAULT_SPLITS = {'train': 0.8, 'val': 0.1, 'test': 0.1}
+
+
+def compute_targets(class_counts, ratios=None):
+    """Số bản ghi cần lấy cho mỗi lớp
+
+    Không có ratios: mọi lớp lấy bằng lớp ít nhất. Có ratios (vd. {'positive': 2,
+    'neutral': 1, 'negative': 1}): lấy nhiều nhất có thể mà vẫn đúng tỉ lệ.
+    """
+    if not class_counts:
+        return {}
+    if ratios is None:
+        smallest = min(class_counts.values())
+        return {label: smallest for label in sorted(class_counts)}
+
+    total = sum(ratios.values())
+    shares = {label: ratios[label] / total for label in ratios if ratios[label] > 0}
+    size = min(class_counts.get(label, 0) / share for label, share in shares.items())
+    return {label: int(math.floor(size * share)) for label, share in sorted(shares.items())}
+
+
+def _split_sizes(count, splits):
+    """Chia count bản ghi theo tỉ lệ splits, phần dư dồn cho split đầu tiên"""
+    total = sum(splits.values())
+    sizes = {name: int(count * ratio / total) for name, ratio in splits.items()}
+    first = next(iter(splits))
+    sizes[first] += count - sum(sizes.values())
+    return sizes
+
+
+def balance_dataframe(df, seed=42, ratios=None, per_product_cap=None, label='sentiment'):
+    """Cân bằng DataFrame theo lớp (thay cho groupby().apply(sample)), có seed cố định"""
+    import pandas as pd
+
+    if per_product_cap:
+        # Lấy mẫu ngẫu nhiên (theo seed) trong mỗi sản phẩm/lớp, không phải các dòng đầu tiên
+        df = df.sample(frac=1, random_state=seed).groupby(['product_id', label], sort=False) \
+            .head(per_product_cap).sort_index()
+
+    targets = compute_targets(df[label].value_counts().to_dict(), ratios)
+    parts = [df[df[label] == cls].sample(n=n, random_state=seed) for cls, n in targets.items()]
+    if not parts:
+        return df.iloc[0:0]
+    return pd.concat(parts).reset_index(drop=True)
+
+
+class StreamingBalancer:
+    """Lấy mẫu cân bằng lớp qua dữ liệu dạng luồng (nhiều shard), không cần nạp hết vào RAM
+
+    Hai lượt: lượt 1 đếm số bản ghi mỗi sản phẩm/lớp, lượt 2 chọn đúng target
+    bản ghi mỗi lớp bằng selection sampling (mỗi bản ghi được chọn với xác suất
+    còn_cần / còn_lại) rồi chia train/val/test theo cùng cách, phân tầng theo lớp.
+    per_product_cap cũng lấy mẫu như vậy trong từng sản phẩm/lớp. Với cùng seed
+    và cùng thứ tự dữ liệu, kết quả luôn giống nhau.
+    """
+
+    def __init__(self, seed=42, ratios=None, per_product_cap=None, splits=None, label='sentiment'):
+        self.seed = seed
+        self.ratios = ratios
+        self.per_product_cap = per_product_cap
+        self.splits = splits or DEFAULT_SPLITS
+        self.label = label
+
+    def _group_counts(self, records):
+        """Số bản ghi mỗi (product_id, lớp)"""
+        return Counter((record.get('product_id'), record.get(self.label)) for record in records)
+
+    def _eligible(self, records, group_counts):
+        """Lọc bản ghi theo giới hạn mỗi sản phẩm: chọn ngẫu nhiên per_product_cap bản ghi mỗi sản phẩm/lớp"""
+        if not self.per_product_cap:
+            yield from records
+            return
+
+        # RNG riêng theo seed nên lần duyệt nào cũng chọn cùng các bản ghi
+        rng = random.Random(f"{self.seed}:per_product")
+        seen = defaultdict(int)
+        kept = defaultdict(int)
+        for record in records:
+            key = (record.get('product_id'), record.get(self.label))
+            remaining = group_counts[key] - seen[key]
+            seen[key] += 1
+            needed = self.per_product_cap - kept[key]
+            if needed > 0 and rng.random() * remaining < needed:
+                kept[key] += 1
+                yield record
+
+    def count(self, records):
+        """Lượt 1: đếm số bản ghi hợp lệ mỗi lớp"""
+        return self._class_counts(self._group_counts(records))
+
+    def _class_counts(self, group_counts):
+        counts = Counter()
+        for (_, cls), n in group_counts.items():
+            counts[cls] += min(n, self.per_product_cap) if self.per_product_cap else n
+        return counts
+
+    def sample(self, make_records):
+        """Sinh các cặp (split, record) đã cân bằng
+
+        make_records: hàm không tham số trả về iterator bản ghi (được gọi 2 lần).
+        """
+        group_counts = self._group_counts(make_records())
+        counts = self._class_counts(group_counts)
+        counts.pop(None, None)
+        targets = compute_targets(dict(counts), self.ratios)
+
+        rng = random.Random(self.seed)
+        seen = Counter()
+        selected = Counter()
+        split_left = {cls: _split_sizes(n, self.splits) for cls, n in targets.items()}
+
+        for record in self._eligible(make_records(), group_counts):
+            cls = record.get(self.label)
+            if cls not in targets:
+                continue
+            remaining = counts[cls] - seen[cls]
+            seen[cls] += 1
+            needed = targets[cls] - selected[cls]
+            if needed <= 0 or rng.random() * remaining >= needed:
+                continue
+            selected[cls] += 1
+
+            # Chọn split với xác suất tỉ lệ số chỗ còn trống
+            left = split_left[cls]
+            pick = rng.random() * sum(left.values())
+            for split, size in left.items():
+                if pick < size:
+                    break
+                pick -= size
+            left[split] -= 1
+            yield split, record
+
+    def write_shards(self, make_records, output_dir, prefix='tiki_reviews_balanced', shard_size=50000):
+        """Ghi kết quả ra shard JSONL riêng cho mỗi split, trả về {split: [shard]}"""
+        writers = {
+            split: ShardWriter(output_dir, prefix=f"{prefix}_{split}", shard_size=shard_size)
+            for split in self.splits
+        }
+        for split, record in self.sample(make_records):
+            writers[split].write(record)
+        return {split: writer.close() for split, writer in writers.items()}
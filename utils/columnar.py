@@ -0,0 +1,140 @@
+import glob
+import os
+import re
+import time
+import pandas as pd
+
+SENTIMENT_CATEGORIES = ['negative', 'neutral', 'positive']
+
+# Giá trị phân vùng cho sản phẩm chưa có category_name
+UNKNOWN_CATEGORY = 'unknown'
+
+REVIEW_DTYPES = {
+    'review_id': 'int64',
+    'rating': 'int8',
+    'product_id': 'int64',
+    'is_verified': 'bool',
+    'number_of_likes': 'int32',
+    'number_of_replies': 'int32',
+}
+
+PRODUCT_DTYPES = {
+    'product_id': 'int64',
+    'price': 'int64',
+    'original_price': 'int64',
+    'discount_rate': 'int16',
+    'rating_average': 'float32',
+    'review_count': 'int32',
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Cần cài pyarrow để dùng định dạng Parquet: pip install pyarrow") from e
+
+
+# Cột khóa: dòng thiếu khóa bị bỏ (không điền 0, tránh trùng ID 0 khi gộp / phân vùng)
+REVIEW_KEYS = ('review_id', 'product_id')
+PRODUCT_KEYS = ('product_id',)
+
+
+def _cast(df, dtypes, keys=()):
+    keys = [c for c in keys if c in df.columns]
+    if keys:
+        numeric = {c: pd.to_numeric(df[c], errors='coerce') for c in keys}
+        missing = pd.concat(numeric.values(), axis=1).isna().any(axis=1)
+        if missing.any():
+            print(f"Bỏ {int(missing.sum())} dòng thiếu {'/'.join(keys)}")
+            df = df[~missing].copy()
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        if dtype == 'bool':
+            if df[column].dtype != bool:
+                df[column] = df[column].astype(str).str.lower().isin(['true', '1'])
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(dtype)
+    return df
+
+
+def apply_review_dtypes(df):
+    """Ép kiểu các cột đánh giá: rating int8, sentiment categorical, created_at timestamp...
+
+    Dòng thiếu review_id / product_id bị bỏ.
+    """
+    df = _cast(df.copy(), REVIEW_DTYPES, REVIEW_KEYS)
+    if 'sentiment' in df.columns:
+        df['sentiment'] = pd.Categorical(df['sentiment'], categories=SENTIMENT_CATEGORIES)
+    if 'created_at' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['created_at']):
+        created_at = pd.to_numeric(df['created_at'], errors='coerce')
+        df['created_at'] = pd.to_datetime(created_at, unit='s')
+    return df
+
+
+def apply_product_dtypes(df):
+    """Ép kiểu các cột số của sản phẩm (dòng thiếu product_id bị bỏ)"""
+    return _cast(df.copy(), PRODUCT_DTYPES, PRODUCT_KEYS)
+
+
+def save_parquet(reviews_df, products_df, output_dir='.', snapshot=None, compression='zstd'):
+    """Lưu bộ dữ liệu dạng Parquet, phân vùng theo snapshot và category_name
+
+    Đánh giá được gắn category_name từ bảng sản phẩm để cùng phân vùng.
+    """
+    _require_pyarrow()
+    snapshot = snapshot or time.strftime("%Y-%m-%d")
+
+    products = apply_product_dtypes(products_df)
+    products['snapshot'] = snapshot
+
+    reviews = apply_review_dtypes(reviews_df)
+    reviews['snapshot'] = snapshot
+    if 'category_name' not in reviews.columns and 'category_name' in products.columns and len(reviews):
+        categories = products.drop_duplicates('product_id').set_index('product_id')['category_name']
+        reviews['category_name'] = reviews['product_id'].map(categories)
+
+    for df in (reviews, products):
+        if 'category_name' in df.columns:
+            df['category_name'] = df['category_name'].replace('', None).fillna(UNKNOWN_CATEGORY)
+
+    paths = {}
+    for name, df in (('reviews', reviews), ('products', products)):
+        if df.empty:
+            continue
+        path = os.path.join(output_dir, f"tiki_{name}.parquet")
+        partition_cols = [c for c in ('snapshot', 'category_name') if c in df.columns]
+        df.to_parquet(path, engine='pyarrow', compression=compression,
+                      partition_cols=partition_cols, index=False)
+        paths[f"{name}_parquet"] = path
+    return paths
+
+
+def read_parquet(path, columns=None, filters=None):
+    """Đọc dữ liệu Parquet, chỉ lấy các cột cần (columns) và phân vùng cần (filters)
+
+    Ví dụ: read_parquet('data/tiki_reviews.parquet', columns=['content', 'sentiment'],
+                        filters=[('category_name', '=', 'Tai nghe có dây')])
+    """
+    _require_pyarrow()
+    return pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters)
+
+
+def convert_snapshots(folder_path='data', output_dir=None, compression='zstd'):
+    """Chuyển các snapshot tiki_reviews_/tiki_products_<timestamp>.csv sang Parquet"""
+    output_dir = output_dir or folder_path
+    converted = []
+    for products_file in sorted(glob.glob(os.path.join(folder_path, 'tiki_products_*.csv'))):
+        match = re.search(r'tiki_products_(\d{8})_(\d{6})\.csv$', products_file)
+        if not match:
+            continue
+        stamp = match.group(1)
+        snapshot = f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:]}"
+        reviews_file = products_file.replace('tiki_products_', 'tiki_reviews_')
+        reviews_df = pd.read_csv(reviews_file) if os.path.exists(reviews_file) else pd.DataFrame()
+        products_df = pd.read_csv(products_file)
+        save_parquet(reviews_df, products_df, output_dir, snapshot=snapshot, compression=compression)
+        converted.append(products_file)
+    return converted
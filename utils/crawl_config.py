@@ -0,0 +1,30 @@
+import json
+
+# File cấu hình mặc định (từ khóa, danh mục, giới hạn crawl)
+DEFAULT_CONFIG_PATH = 'crawl_config.json'
+
+DEFAULTS = {
+    'keywords': [],
+    'categories': [],
+    'product_ids': [],
+    'limit_per_keyword': 1000,
+    'limit_per_category': 1000,
+    'reviews_per_product': 5000,
+    # Số đánh giá cần cho mỗi lớp, vd. {"negative": 2000, ...}; rỗng = không dùng YieldScheduler
+    'class_quotas': {},
+}
+
+
+def flatten_keywords(keywords):
+    """Từ khóa có thể để dạng list hoặc dict {tên nhóm: [từ khóa]}, trả về list phẳng"""
+    if isinstance(keywords, dict):
+        return [keyword for group in keywords.values() for keyword in group]
+    return list(keywords)
+
+
+def load_config(path=DEFAULT_CONFIG_PATH):
+    """Đọc cấu hình crawl (JSON), các khóa thiếu lấy giá trị trong DEFAULTS"""
+    with open(path, encoding='utf-8') as f:
+        config = dict(DEFAULTS, **json.load(f))
+    config['keywords'] = flatten_keywords(config['keywords'])
+    return config
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class CrawlJournal:
+    """Nhật ký crawl (SQLite) để chạy tiếp sau khi bị dừng giữa chừng
+
+    Ghi lại frontier (từ khóa/danh mục đã duyệt và ID tìm được), các sản phẩm
+    đã xong và từng trang đánh giá đã tải. Mỗi lần ghi được commit ngay nên
+    khi chạy lại chỉ phải làm phần việc còn thiếu.
+    """
+
+    def __init__(self, path='data/crawl_journal.sqlite'):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                kind TEXT,
+                key TEXT,
+                product_ids TEXT,
+                done_at REAL,
+                PRIMARY KEY (kind, key)
+            );
+            CREATE TABLE IF NOT EXISTS products (
+                product_id TEXT PRIMARY KEY,
+                info TEXT,
+                done INTEGER DEFAULT 0,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS review_pages (
+                product_id TEXT,
+                page INTEGER,
+                last_page INTEGER,
+                reviews TEXT,
+                PRIMARY KEY (product_id, page)
+            );
+        """)
+        self.conn.commit()
+
+    def _execute(self, sql, args=()):
+        with self.lock:
+            self.conn.execute(sql, args)
+            self.conn.commit()
+
+    def _fetchone(self, sql, args=()):
+        with self.lock:
+            return self.conn.execute(sql, args).fetchone()
+
+    # --- Frontier: từ khóa tìm kiếm / danh mục ---
+
+    def get_frontier(self, kind, key):
+        """Trả về các sản phẩm (summary hoặc ID) đã tìm được cho từ khóa/danh mục, None nếu chưa duyệt"""
+        row = self._fetchone('SELECT product_ids FROM frontier WHERE kind = ? AND key = ?', (kind, key))
+        return json.loads(row[0]) if row else None
+
+    def mark_frontier_done(self, kind, key, products):
+        """Lưu các sản phẩm tìm được; summary (dict) được giữ nguyên để chạy lại vẫn có rating_average, review_count"""
+        products = [p if isinstance(p, dict) else str(p) for p in products]
+        self._execute(
+            'INSERT OR REPLACE INTO frontier VALUES (?, ?, ?, ?)',
+            (kind, key, json.dumps(products, ensure_ascii=False), time.time())
+        )
+
+    # --- Sản phẩm ---
+
+    def get_product(self, product_id):
+        """Trả về (info, done) của sản phẩm, (None, False) nếu chưa có trong nhật ký"""
+        row = self._fetchone('SELECT info, done FROM products WHERE product_id = ?', (str(product_id),))
+        if row is None:
+            return None, False
+        return json.loads(row[0]), bool(row[1])
+
+    def save_product_info(self, product_id, info):
+        self._execute(
+            'INSERT OR REPLACE INTO products VALUES (?, ?, 0, ?)',
+            (str(product_id), json.dumps(info, ensure_ascii=False), time.time())
+        )
+
+    def mark_product_done(self, product_id):
+        self._execute(
+            'UPDATE products SET done = 1, updated_at = ? WHERE product_id = ?',
+            (time.time(), str(product_id))
+        )
+
+    # --- Trang đánh giá ---
+
+    def get_review_page(self, product_id, page):
+        """Trả về (reviews, last_page) của trang đã tải, None nếu chưa có"""
+        row = self._fetchone(
+            'SELECT reviews, last_page FROM review_pages WHERE product_id = ? AND page = ?',
+            (str(product_id), page)
+        )
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def save_review_page(self, product_id, page, reviews, last_page):
+        self._execute(
+            'INSERT OR REPLACE INTO review_pages VALUES (?, ?, ?, ?)',
+            (str(product_id), page, last_page, json.dumps(reviews, ensure_ascii=False))
+        )
+
+    def review_pages_complete(self, product_id, max_pages):
+        """Đã tải đủ các trang cần thiết (tối đa max_pages) của sản phẩm chưa"""
+        row = self._fetchone(
+            'SELECT last_page FROM review_pages WHERE product_id = ? AND page = 1',
+            (str(product_id),)
+        )
+        if row is None:
+            return False
+        needed = max(1, min(row[0] or 1, max_pages))
+        count = self._fetchone(
+            'SELECT COUNT(*) FROM review_pages WHERE product_id = ? AND page <= ?',
+            (str(product_id), needed)
+        )[0]
+        return count >= needed
+
+    def load_reviews(self, product_id):
+        """Ghép các trang đánh giá đã tải của sản phẩm theo thứ tự trang"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT reviews FROM review_pages WHERE product_id = ? ORDER BY page',
+                (str(product_id),)
+            ).fetchall()
+        reviews = []
+        for (page_reviews,) in rows:
+            reviews.extend(json.loads(page_reviews))
+        return reviews
+
+    def reset(self):
+        """Xóa toàn bộ nhật ký (gọi sau khi đã lưu xong bộ dữ liệu)"""
+        with self.lock:
+            self.conn.executescript('DELETE FROM frontier; DELETE FROM products; DELETE FROM review_pages;')
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
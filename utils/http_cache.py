@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+import requests
+
+# TTL mặc định (giây) cho từng nhóm endpoint, 0 = không cache.
+# products ngắn vì crawl lấy giá / rating / review_count từ đây
+DEFAULT_TTLS = {
+    'products': 3600,
+    'search': 24 * 3600,
+    'category': 24 * 3600,
+    'reviews': 0,
+    'default': 0,
+}
+
+# Bổ sung dữ liệu (update_data.py) chỉ cần ảnh + danh mục, ít thay đổi nên đọc cache lâu hơn
+ENRICH_TTLS = {'products': 7 * 24 * 3600}
+
+
+class OfflineCacheMiss(requests.exceptions.RequestException):
+    """Chế độ offline nhưng response chưa có trong cache"""
+
+
+class ResponseCache:
+    """Cache response HTTP trên đĩa (SQLite), khóa theo URL + params
+
+    Mỗi endpoint có TTL riêng, tổng dung lượng bị giới hạn bởi max_bytes
+    (xóa bớt các mục lâu không dùng nhất). Ở chế độ offline, cache được
+    dùng bất kể TTL và không gửi request ra mạng. record=True ghi cả các
+    endpoint TTL 0 (trang đánh giá) để phát lại offline; khi online chúng
+    vẫn luôn được tải mới.
+    """
+
+    def __init__(self, path='.cache/tiki_http.sqlite', ttls=None, max_bytes=1024 ** 3, offline=False, record=False):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.record = record
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                url TEXT,
+                body BLOB,
+                size INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)')
+        self.conn.commit()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def make_key(url, params=None):
+        if params:
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.ttls['default'])
+
+    def get(self, url, params=None, endpoint='default'):
+        """Trả về body đã cache (bytes) hoặc None nếu chưa có / đã hết hạn"""
+        if not self.offline and self.ttl(endpoint) <= 0:
+            return None
+
+        key = self.make_key(url, params)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute('SELECT body, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            body, created_at = row
+            if not self.offline and now - created_at > self.ttl(endpoint):
+                return None
+            self.conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+            self.conn.commit()
+        return body
+
+    def set(self, url, params, endpoint, body):
+        if self.ttl(endpoint) <= 0 and not self.record:
+            return
+
+        key = self.make_key(url, params)
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, endpoint, url, body, len(body), now, now)
+            )
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Xóa các mục lâu không dùng nhất cho tới khi còn 90% max_bytes"""
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute('SELECT key, size FROM responses ORDER BY accessed_at')
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,287 @@
+import cProfile
+import functools
+import inspect
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Mốc (giây) của histogram độ trễ
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+# Các hàm tốn thời gian của TikiSentimentScraper, được đo khi gọi instrument()
+HOT_METHODS = (
+    'get_product_info', '_fetch_reviews_page', 'get_reviews', 'process_reviews_columnar',
+    '_crawl_product', '_iter_search_pages', '_iter_category_listing_pages', '_iter_category_html_pages',
+)
+
+
+class Histogram:
+    """Histogram tích lũy kiểu Prometheus (đếm theo mốc, tổng, số lần)"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Ước lượng phân vị từ các mốc (cận trên của mốc chứa phân vị)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+
+def _label_value(value):
+    """Thoát \\, " và xuống dòng trong giá trị nhãn theo định dạng text của Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_label_value(value)}"' for key, value in labels) + '}'
+
+
+class CrawlMetrics:
+    """Số liệu của một lần crawl: bộ đếm, histogram độ trễ, thông lượng
+
+    Dùng chung giữa các luồng. Ghi định kỳ ra file JSON hoặc Prometheus text
+    (start_export), và có thể đo thời gian các hàm nóng của scraper (instrument).
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+        self.hooks = []
+        self.lock = threading.Lock()
+        self._exporter = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name, **labels):
+        with self.lock:
+            return self.counters.get(self._key(name, labels), 0)
+
+    def total(self, name):
+        """Tổng một bộ đếm qua mọi nhãn"""
+        with self.lock:
+            return sum(value for (n, _), value in self.counters.items() if n == name)
+
+    def rates(self):
+        """Thông lượng trung bình (mỗi giây) từ lúc bắt đầu"""
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {
+            'tiki_reviews_per_second': self.total('tiki_reviews_total') / elapsed,
+            'tiki_requests_per_second': self.total('tiki_requests_total') / elapsed,
+            'tiki_bytes_per_second': self.total('tiki_bytes_total') / elapsed,
+        }
+
+    def snapshot(self):
+        """Toàn bộ số liệu dạng dict (để ghi JSON)"""
+        with self.lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {
+                    'name': name, 'labels': dict(labels), 'count': h.count, 'sum': round(h.sum, 6),
+                    'p50': h.quantile(0.5), 'p99': h.quantile(0.99),
+                    'buckets': {str(bound): count for bound, count in zip(h.buckets, h.counts)},
+                }
+                for (name, labels), h in sorted(self.histograms.items())
+            ]
+        return {
+            'timestamp': time.time(),
+            'uptime_seconds': time.time() - self.started,
+            'rates': self.rates(),
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def to_prometheus(self):
+        """Số liệu theo định dạng text của Prometheus (dùng với node_exporter textfile collector)"""
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{_label_text(labels)} {value}')
+
+        for (name, labels), h in histograms:
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(f'{name}_bucket{_label_text(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_label_text(labels)} {h.sum}')
+            lines.append(f'{name}_count{_label_text(labels)} {h.count}')
+
+        for name, value in self.rates().items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Ghi số liệu ra file (.prom -> Prometheus text, còn lại JSON), ghi đè nguyên tử"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def start_export(self, path, interval=10.0):
+        """Ghi số liệu ra path mỗi interval giây trên một luồng nền"""
+        def loop():
+            while not self._stop.wait(interval):
+                self.write(path)
+
+        self._stop.clear()
+        self._exporter = (threading.Thread(target=loop, daemon=True), path)
+        self._exporter[0].start()
+        return self
+
+    def stop_export(self):
+        """Dừng luồng ghi định kỳ và ghi lần cuối"""
+        if self._exporter is None:
+            return
+        thread, path = self._exporter
+        self._stop.set()
+        thread.join()
+        self.write(path)
+        self._exporter = None
+
+    def add_hook(self, hook):
+        """hook(method_name, seconds) được gọi sau mỗi lần chạy một hàm đã instrument"""
+        self.hooks.append(hook)
+
+    def instrument(self, obj, methods=HOT_METHODS):
+        """Bọc các hàm nóng của obj để đo thời gian (tiki_method_seconds{method=...})
+
+        Hàm sinh (generator) được đo trên toàn bộ thời gian duyệt.
+        """
+        for name in methods:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self._wrap(name, method))
+        return obj
+
+    def _wrap(self, name, method):
+        def record(start):
+            elapsed = time.perf_counter() - start
+            self.observe('tiki_method_seconds', elapsed, method=name)
+            for hook in self.hooks:
+                hook(name, elapsed)
+
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    yield from method(*args, **kwargs)
+                finally:
+                    record(start)
+        else:
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    record(start)
+        return wrapper
+
+
+@contextmanager
+def profiling(path):
+    """Chạy cProfile cho luồng hiện tại và các luồng tạo trong khối (vd. worker của
+    ThreadPoolExecutor), gộp kết quả ra path (xem bằng snakeviz / pstats)
+
+    Mỗi luồng mới có profiler riêng, bật ở lời gọi đầu tiên của luồng. Từ Python
+    3.12 cProfile đã đo mọi luồng nên chỉ dùng một profiler.
+    """
+    profilers = [cProfile.Profile()]
+    lock = threading.Lock()
+
+    def start_thread(frame, event, arg):
+        profiler = cProfile.Profile()
+        try:
+            # enable() thay hook này bằng hook của cProfile trên luồng hiện tại
+            profiler.enable()
+        except ValueError:
+            sys.setprofile(None)
+            return
+        with lock:
+            profilers.append(profiler)
+
+    profilers[0].enable()
+    threading.setprofile(start_thread)
+    try:
+        yield profilers
+    finally:
+        threading.setprofile(None)
+        profilers[0].disable()
+        with lock:
+            stats = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+        stats.dump_stats(path)
@@ -0,0 +1,231 @@
+import hashlib
+import re
+from collections import deque
+import numpy as np
+from multiprocessing import Pool
+
+# Số nguyên tố Mersenne 2^31 - 1: a * x < 2^62 nên nhân trong uint64 không tràn
+_PRIME = (1 << 31) - 1
+_BASE = 1000003
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Chữ thường, gộp khoảng trắng"""
+    if not isinstance(text, str):
+        return ''
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+
+def review_text(record, fields=('title', 'content')):
+    """Ghép các trường văn bản của đánh giá, bỏ phần lặp lại (vd. title trùng content)"""
+    parts = []
+    for field in fields:
+        text = normalize_text(record.get(field))
+        if text and not any(text in part for part in parts):
+            parts.append(text)
+    return ' '.join(parts)
+
+
+def shingles(text, size=5):
+    """Mảng hash (không trùng) các k-gram ký tự của văn bản, văn bản ngắn hơn k thì dùng cả chuỗi
+
+    Hash cuốn (rolling) tính trên mảng mã ký tự bằng numpy, không tạo chuỗi con.
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if not len(codes):
+        return codes
+    size = min(size, len(codes))
+    count = len(codes) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashes = (hashes * _BASE + codes[offset:offset + count]) % _PRIME
+    return np.unique(hashes)
+
+
+def exact_key(text):
+    """Khóa của văn bản nguyên văn (digest 16 byte, không va chạm như crc32)"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def make_permutations(num_perm=128, seed=1):
+    """Tham số (a, b) của num_perm hàm băm h(x) = (a*x + b) mod p"""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+    return a, b
+
+
+def minhash(hashes, permutations):
+    """Chữ ký MinHash (uint32[num_perm]) của một tập shingle"""
+    a, b = permutations
+    if not len(hashes):
+        return np.full(len(a), _PRIME, dtype=np.uint32)
+    values = (np.outer(hashes, a) + b) % _PRIME
+    return values.min(axis=0).astype(np.uint32)
+
+
+def _signatures(args):
+    """Tính chữ ký cho một lô văn bản (chạy trong process con)"""
+    texts, shingle_size, num_perm, seed = args
+    permutations = make_permutations(num_perm, seed)
+    return [minhash(shingles(text, shingle_size), permutations) for text in texts]
+
+
+class NearDuplicateDetector:
+    """Phát hiện đánh giá gần trùng (spam, đánh giá theo mẫu) bằng MinHash + LSH
+
+    Mỗi văn bản được băm thành chữ ký MinHash, chia thành bands dải; hai văn bản
+    có chung một dải là ứng viên và được coi là gần trùng khi tỉ lệ khớp chữ ký
+    (ước lượng Jaccard) >= threshold. Chỉ duyệt một lượt: văn bản đầu tiên của
+    mỗi cụm làm đại diện, các văn bản sau khớp với nó nhận cùng cluster_id.
+    Bộ nhớ tăng theo số cụm và số văn bản khác nhau (không lưu văn bản), không
+    theo số cặp. max_clusters giới hạn số cụm được giữ (kèm tối đa 4 * max_clusters
+    khóa văn bản nguyên văn): cụm cũ nhất bị loại trước, nên bản trùng của một
+    cụm đã bị loại sẽ mở cụm mới. None: không giới hạn.
+    """
+
+    def __init__(self, num_perm=128, bands=32, shingle_size=5, threshold=0.7, seed=1, max_clusters=None):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.seed = seed
+        self.permutations = make_permutations(num_perm, seed)
+        self.max_clusters = max_clusters
+        self.buckets = [{} for _ in range(bands)]
+        # dict giữ thứ tự chèn: phần tử đầu là cụm / khóa cũ nhất
+        self.exact = {}
+        self.leaders = {}
+        self.next_cluster = 0
+
+    def signature(self, text):
+        return minhash(shingles(text, self.shingle_size), self.permutations)
+
+    def _band_keys(self, signature):
+        return [row.tobytes() for row in signature.reshape(self.bands, self.rows)]
+
+    def assign(self, text, signature=None):
+        """Gán cluster_id cho một văn bản, trả về (cluster_id, is_duplicate)
+
+        Văn bản rỗng nhận cluster_id -1.
+        """
+        if not text:
+            return -1, False
+        # Văn bản giống hệt nhau (đánh giá mẫu) không cần so chữ ký
+        key = exact_key(text)
+        cluster_id = self.exact.get(key)
+        if cluster_id is not None:
+            return cluster_id, True
+
+        if signature is None:
+            signature = self.signature(text)
+        keys = self._band_keys(signature)
+
+        checked = set()
+        min_matches = self.threshold * self.num_perm
+        for band, key in zip(self.buckets, keys):
+            candidate = band.get(key)
+            if candidate is None or candidate in checked:
+                continue
+            checked.add(candidate)
+            if np.count_nonzero(self.leaders[candidate] == signature) >= min_matches:
+                self._remember(key, candidate)
+                return candidate, True
+
+        cluster_id = self.next_cluster
+        self.next_cluster += 1
+        self.leaders[cluster_id] = signature
+        self._remember(key, cluster_id)
+        for band, band_key in zip(self.buckets, keys):
+            band.setdefault(band_key, cluster_id)
+        if self.max_clusters is not None and len(self.leaders) > self.max_clusters:
+            self._evict(next(iter(self.leaders)))
+        return cluster_id, False
+
+    def _remember(self, key, cluster_id):
+        self.exact[key] = cluster_id
+        if self.max_clusters is not None and len(self.exact) > 4 * self.max_clusters:
+            del self.exact[next(iter(self.exact))]
+
+    def _evict(self, cluster_id):
+        """Bỏ cụm khỏi bảng đại diện và các dải LSH (khóa nguyên văn hết hạn theo thứ tự riêng)"""
+        signature = self.leaders.pop(cluster_id)
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            if band.get(band_key) == cluster_id:
+                del band[band_key]
+
+    def iter_clusters(self, records, fields=('title', 'content'), batch_size=2000, processes=None):
+        """Sinh (record, cluster_id, is_duplicate) theo thứ tự records, một lượt duy nhất
+
+        processes > 1: chữ ký MinHash được tính song song trên nhiều process,
+        việc gán cụm (rẻ) vẫn làm tuần tự để kết quả ổn định.
+        """
+        def batches():
+            batch = []
+            for record in records:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        def with_texts():
+            for batch in batches():
+                texts = [review_text(record, fields) for record in batch]
+                # Bỏ qua văn bản đã gặp nguyên văn, không cần tính chữ ký
+                todo = [t for t in dict.fromkeys(texts) if t and exact_key(t) not in self.exact]
+                yield batch, texts, todo
+
+        if not processes or processes <= 1:
+            for batch, texts, todo in with_texts():
+                signatures = _signatures((todo, self.shingle_size, self.num_perm, self.seed))
+                yield from self._assign_batch(batch, texts, dict(zip(todo, signatures)))
+            return
+
+        # Giữ tối đa 2 * processes lô đang tính để bộ nhớ không tăng theo kích thước dữ liệu
+        pool = Pool(processes)
+        pending = deque()
+        try:
+            for batch, texts, todo in with_texts():
+                job = pool.apply_async(_signatures, ((todo, self.shingle_size, self.num_perm, self.seed),))
+                pending.append((batch, texts, todo, job))
+                if len(pending) >= 2 * processes:
+                    batch, texts, todo, job = pending.popleft()
+                    yield from self._assign_batch(batch, texts, dict(zip(todo, job.get())))
+            while pending:
+                batch, texts, todo, job = pending.popleft()
+                yield from self._assign_batch(batch, texts, dict(zip(todo, job.get())))
+        finally:
+            pool.terminate()
+
+    def _assign_batch(self, batch, texts, signatures):
+        for record, text in zip(batch, texts):
+            cluster_id, duplicate = self.assign(text, signatures.get(text))
+            yield record, cluster_id, duplicate
+
+
+def annotate_dataframe(df, fields=('title', 'content'), processes=None, **kwargs):
+    """Thêm cột dup_cluster, is_near_duplicate và dup_weight (1 / kích thước cụm) vào DataFrame
+
+    Ví dụ bỏ trùng: df[~df['is_near_duplicate']]; giảm trọng số spam: dùng dup_weight.
+    """
+    detector = NearDuplicateDetector(**kwargs)
+    columns = [c for c in fields if c in df.columns]
+    records = df[columns].to_dict('records')
+    clusters = np.empty(len(df), dtype=np.int64)
+    duplicates = np.empty(len(df), dtype=bool)
+    for i, (_, cluster_id, duplicate) in enumerate(detector.iter_clusters(records, columns, processes=processes)):
+        clusters[i] = cluster_id
+        duplicates[i] = duplicate
+
+    df = df.copy()
+    df['dup_cluster'] = clusters
+    df['is_near_duplicate'] = duplicates
+    sizes = df.groupby('dup_cluster')['dup_cluster'].transform('size')
+    df['dup_weight'] = np.where(clusters >= 0, 1.0 / sizes, 1.0)
+    return df
@@ -0,0 +1,241 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+# Trường số theo thời gian -> hệ số nhân để lưu dạng số nguyên (rating_average giữ 2 chữ số thập phân)
+SERIES_FIELDS = {'price': 1, 'original_price': 1, 'discount_rate': 1, 'rating_average': 100, 'review_count': 1}
+
+# Trường tĩnh, chỉ giữ giá trị mới nhất của mỗi sản phẩm
+STATIC_FIELDS = ('name', 'short_description', 'category_name', 'brand_name', 'url', 'image_url')
+
+# Giá trị thiếu trong chuỗi số (đọc ra thành NaN)
+MISSING = -1
+
+TIME_FORMATS = ('%Y%m%d_%H%M%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+
+def to_timestamp(value):
+    """Thời điểm (epoch giây, datetime hoặc chuỗi '2025-04-02', '20250402_122639'...) -> epoch giây"""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    if hasattr(value, 'timestamp'):
+        return int(value.timestamp())
+    for fmt in TIME_FORMATS:
+        try:
+            return int(time.mktime(time.strptime(value, fmt)))
+        except ValueError:
+            continue
+    raise ValueError(f"Không đọc được thời điểm: {value!r}")
+
+
+def _scaled(value, scale):
+    try:
+        if value is None or value != value or value == '':
+            return MISSING
+        return int(round(float(value) * scale))
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def _delta_encode(values, starts):
+    """Giá trị đầu mỗi sản phẩm giữ nguyên, các giá trị sau lưu chênh lệch; ép về kiểu nguyên nhỏ nhất đủ chứa"""
+    deltas = np.diff(values, prepend=0)
+    firsts = starts[:-1][np.diff(starts) > 0]
+    deltas[firsts] = values[firsts]
+    if not len(deltas):
+        return deltas.astype('int8')
+    low, high = int(deltas.min()), int(deltas.max())
+    if low >= 0:
+        return deltas.astype(np.min_scalar_type(high))
+    # Có số âm: kiểu có dấu nhỏ nhất chứa được cả hai đầu (result_type(int8, uint32) sẽ thành int64)
+    for dtype in ('int8', 'int16', 'int32'):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return deltas.astype(dtype)
+    return deltas.astype('int64')
+
+
+def _delta_decode(deltas, starts):
+    deltas = deltas.astype('int64')
+    cumulative = np.cumsum(deltas)
+    counts = np.diff(starts)
+    firsts = starts[:-1][counts > 0]
+    # Trừ tổng tích lũy trước điểm đầu của mỗi sản phẩm
+    return cumulative - np.repeat(cumulative[firsts] - deltas[firsts], counts[counts > 0])
+
+
+class PriceHistory:
+    """Chuỗi thời gian giá / đánh giá của sản phẩm, dựng từ các snapshot tiki_products_*
+
+    Mỗi sản phẩm lưu các trường tĩnh (tên, mô tả...) một lần; các trường số
+    (SERIES_FIELDS) được lưu theo cột, gom theo sản phẩm (product_ids + starts)
+    và mã hóa chênh lệch trong file npz nén. update() chỉ đọc các snapshot mới
+    (manifest giống SnapshotMerger). history() trả về lịch sử một sản phẩm,
+    as_of() trả lời "giá tại thời điểm T" cho nhiều sản phẩm cùng lúc.
+    """
+
+    def __init__(self, path='data/price_history'):
+        self.path = path
+        self.manifest = {}
+        self.static = {}
+        self.product_ids = np.zeros(0, dtype='int64')
+        self.starts = np.zeros(1, dtype='int64')
+        self.times = np.zeros(0, dtype='int64')
+        self.values = {field: np.zeros(0, dtype='int64') for field in SERIES_FIELDS}
+        self._pending = []
+        self._keys = None
+        if os.path.exists(os.path.join(path, 'series.npz')):
+            self._load()
+
+    @classmethod
+    def from_snapshots(cls, folder_path='data', path='data/price_history'):
+        history = cls(path)
+        history.update(folder_path)
+        history.save()
+        return history
+
+    def _load(self):
+        with np.load(os.path.join(self.path, 'series.npz')) as data:
+            self.product_ids = data['product_ids']
+            self.starts = data['starts']
+            self.times = _delta_decode(data['time'], self.starts)
+            self.values = {field: _delta_decode(data[field], self.starts) for field in SERIES_FIELDS}
+        with open(os.path.join(self.path, 'static.json'), encoding='utf-8') as f:
+            self.static = {int(k): v for k, v in json.load(f).items()}
+        with open(os.path.join(self.path, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+    def add_snapshot(self, records, timestamp):
+        """Thêm một snapshot (list dict sản phẩm) tại thời điểm timestamp"""
+        timestamp = to_timestamp(timestamp)
+        rows = []
+        for record in records:
+            try:
+                product_id = int(record['product_id'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            rows.append([product_id, timestamp] + [_scaled(record.get(f), s) for f, s in SERIES_FIELDS.items()])
+            static = {f: record[f] for f in STATIC_FIELDS if isinstance(record.get(f), str) and record[f]}
+            current = self.static.setdefault(product_id, {'_time': timestamp})
+            if timestamp >= current['_time']:
+                current.update(static, _time=timestamp)
+        if rows:
+            self._pending.append(np.asarray(rows, dtype='int64'))
+
+    def update(self, folder_path='data'):
+        """Đọc các snapshot tiki_products_* mới hoặc đã thay đổi trong folder_path, trả về số file đã đọc"""
+        from utils.snapshot_merge import iter_snapshot_chunks, snapshot_of
+
+        files = []
+        for pattern in ('tiki_products_*.csv', 'tiki_products_*.jsonl', 'tiki_products_*.jsonl.gz'):
+            files.extend(glob.glob(os.path.join(folder_path, pattern)))
+
+        count = 0
+        for path in sorted(files, key=lambda f: (snapshot_of(f), f)):
+            stat = os.stat(path)
+            name = os.path.basename(path)
+            if self.manifest.get(name) == [stat.st_size, stat.st_mtime] or not snapshot_of(path):
+                continue
+            for records in iter_snapshot_chunks(path):
+                self.add_snapshot(records, snapshot_of(path))
+            self.manifest[name] = [stat.st_size, stat.st_mtime]
+            count += 1
+        return count
+
+    def _consolidate(self):
+        """Gộp các snapshot mới vào mảng chính, sắp theo (product_id, thời điểm)"""
+        if not self._pending:
+            return
+        counts = np.diff(self.starts)
+        current = np.column_stack(
+            [np.repeat(self.product_ids, counts), self.times] + [self.values[f] for f in SERIES_FIELDS]
+        ) if len(self.times) else np.zeros((0, 2 + len(SERIES_FIELDS)), dtype='int64')
+        rows = np.concatenate([current] + self._pending)
+        self._pending = []
+
+        # Sắp theo (product_id, time); trùng (product_id, time) thì giữ dòng thêm sau
+        order = np.lexsort((np.arange(len(rows)), rows[:, 1], rows[:, 0]))
+        rows = rows[order]
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = (rows[1:, 0] != rows[:-1, 0]) | (rows[1:, 1] != rows[:-1, 1])
+        rows = rows[last]
+
+        self.product_ids, first = np.unique(rows[:, 0], return_index=True)
+        self.starts = np.append(first, len(rows)).astype('int64')
+        self.times = rows[:, 1].copy()
+        self.values = {field: rows[:, 2 + i].copy() for i, field in enumerate(SERIES_FIELDS)}
+        self._keys = None
+
+    def save(self):
+        """Ghi npz (mã hóa chênh lệch, nén) + trường tĩnh + manifest, mỗi file được ghi đè nguyên tử"""
+        self._consolidate()
+        os.makedirs(self.path, exist_ok=True)
+        arrays = {'product_ids': self.product_ids, 'starts': self.starts, 'time': _delta_encode(self.times, self.starts)}
+        arrays.update({field: _delta_encode(self.values[field], self.starts) for field in SERIES_FIELDS})
+        files = {
+            'series.npz': lambda f: np.savez_compressed(f, **arrays),
+            'static.json': lambda f: f.write(json.dumps(
+                {str(k): v for k, v in self.static.items()}, ensure_ascii=False).encode('utf-8')),
+            'manifest.json': lambda f: f.write(json.dumps(self.manifest).encode('utf-8')),
+        }
+        for name, write in files.items():
+            tmp_path = os.path.join(self.path, f"{name}.tmp")
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(self.path, name))
+
+    def __len__(self):
+        self._consolidate()
+        return len(self.product_ids)
+
+    def _column(self, field, rows):
+        values = self.values[field][rows].astype('float64')
+        values[self.values[field][rows] == MISSING] = np.nan
+        return values / SERIES_FIELDS[field]
+
+    def info(self, product_id):
+        """Các trường tĩnh mới nhất của sản phẩm (tên, mô tả...) hoặc None"""
+        entry = self.static.get(int(product_id))
+        return None if entry is None else {k: v for k, v in entry.items() if k != '_time'}
+
+    def history(self, product_id):
+        """Lịch sử của một sản phẩm: {'time': epoch giây, field: mảng giá trị (NaN nếu thiếu)}"""
+        self._consolidate()
+        i = np.searchsorted(self.product_ids, int(product_id))
+        if i == len(self.product_ids) or self.product_ids[i] != int(product_id):
+            return None
+        rows = np.arange(self.starts[i], self.starts[i + 1])
+        result = {'time': self.times[rows]}
+        result.update({field: self._column(field, rows) for field in SERIES_FIELDS})
+        return result
+
+    def as_of(self, when, product_ids=None, fields=None):
+        """Giá trị mới nhất tại thời điểm when (một giá trị hoặc mảng cùng độ dài product_ids)
+
+        product_ids=None: mọi sản phẩm. Trả về {'product_id', 'time' (thời điểm
+        snapshot dùng, -1 nếu chưa có), field: giá trị (NaN nếu chưa có)}.
+        """
+        self._consolidate()
+        if self._keys is None:
+            # Khóa (thứ hạng sản phẩm << 32 | thời điểm) tăng dần -> tìm được bằng một lần searchsorted
+            ranks = np.repeat(np.arange(len(self.product_ids), dtype='int64'), np.diff(self.starts))
+            self._keys = (ranks << 32) | self.times
+        product_ids = self.product_ids if product_ids is None else np.asarray(product_ids, dtype='int64').ravel()
+        when = np.asarray([to_timestamp(w) for w in np.atleast_1d(when)], dtype='int64')
+        when = np.broadcast_to(when, product_ids.shape)
+
+        ranks = np.searchsorted(self.product_ids, product_ids)
+        known = ranks < len(self.product_ids)
+        known[known] = self.product_ids[ranks[known]] == product_ids[known]
+        ranks = np.where(known, ranks, 0)
+        rows = np.searchsorted(self._keys, (ranks << 32) | when, side='right') - 1
+        found = known & (rows >= self.starts[ranks])
+        rows = np.where(found, rows, 0)
+
+        result = {'product_id': product_ids, 'time': np.where(found, self.times[rows] if len(self.times) else -1, -1)}
+        for field in fields or SERIES_FIELDS:
+            values = self._column(field, rows) if len(self.times) else np.full(len(rows), np.nan)
+            result[field] = np.where(found, values, np.nan)
+        return result
@@ -0,0 +1,104 @@
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+class ProductIndex:
+    """Chỉ mục sản phẩm đã crawl giữa các lần chạy (SQLite, khóa product_id)
+
+    Lưu review_count, rating_average, price và thời điểm crawl gần nhất của mỗi
+    sản phẩm. Khi tìm kiếm / duyệt danh mục, sản phẩm có review_count không đổi
+    được bỏ qua trước khi đưa vào hàng đợi (không lấy lại thông tin lẫn đánh giá).
+    Giống ReviewWatermarks, thay đổi chỉ nằm trong bộ nhớ cho tới khi gọi save(),
+    nên hãy gọi save() sau khi bộ dữ liệu đã được lưu.
+    """
+
+    def __init__(self, path='data/product_index.sqlite'):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                product_id INTEGER PRIMARY KEY,
+                review_count INTEGER,
+                rating_average REAL,
+                price INTEGER,
+                crawled_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    @classmethod
+    def from_snapshots(cls, folder_path='data', path='data/product_index.sqlite'):
+        """Khởi tạo chỉ mục từ các file tiki_products_*.csv đã có (snapshot mới hơn ghi đè)"""
+        import pandas as pd
+
+        index = cls(path)
+        for file in sorted(glob.glob(os.path.join(folder_path, 'tiki_products_*.csv'))):
+            match = re.search(r'(\d{8}_\d{6})', os.path.basename(file))
+            crawled_at = time.mktime(time.strptime(match.group(1), '%Y%m%d_%H%M%S')) if match else None
+            df = pd.read_csv(file, usecols=['product_id', 'review_count', 'rating_average', 'price'])
+            for record in df.to_dict('records'):
+                index.update(record, crawled_at)
+        index.save()
+        return index
+
+    def get(self, product_id):
+        """{'review_count', 'rating_average', 'price', 'crawled_at'} hoặc None nếu chưa crawl"""
+        key = int(product_id)
+        with self.lock:
+            if key in self.pending:
+                return dict(self.pending[key])
+            row = self.conn.execute(
+                'SELECT review_count, rating_average, price, crawled_at FROM products WHERE product_id = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('review_count', 'rating_average', 'price', 'crawled_at'), row))
+
+    def is_unchanged(self, product):
+        """Sản phẩm (dict có product_id, review_count) đã crawl và chưa có đánh giá mới"""
+        review_count = product.get('review_count')
+        if review_count is None or not str(product.get('product_id', '')).isdigit():
+            return False
+        entry = self.get(product['product_id'])
+        return entry is not None and entry['review_count'] == int(review_count)
+
+    def update(self, product_info, crawled_at=None):
+        """Ghi nhận sản phẩm vừa crawl (trong bộ nhớ, ghi xuống đĩa khi save())"""
+        def number(key, cast):
+            value = product_info.get(key)
+            try:
+                return cast(value) if value is not None and value == value else None
+            except (TypeError, ValueError):
+                return None
+
+        entry = {
+            'review_count': number('review_count', int),
+            'rating_average': number('rating_average', float),
+            'price': number('price', int),
+            'crawled_at': crawled_at or time.time(),
+        }
+        with self.lock:
+            self.pending[int(product_info['product_id'])] = entry
+
+    def save(self):
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?)',
+                [(key, e['review_count'], e['rating_average'], e['price'], e['crawled_at'])
+                 for key, e in self.pending.items()]
+            )
+            self.conn.commit()
+            self.pending.clear()
+
+    def close(self):
+        self.conn.close()
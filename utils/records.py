@@ -0,0 +1,119 @@
+REVIEW_FIELDS = (
+    'review_id', 'title', 'content', 'rating', 'created_at', 'customer_name',
+    'product_id', 'is_verified', 'number_of_likes', 'number_of_replies',
+)
+
+# Các cột số được giữ dưới dạng mảng numpy khi chuyển sang DataFrame
+REVIEW_INT_FIELDS = ('rating', 'number_of_likes', 'number_of_replies')
+
+
+def sentiment_from_rating(ratings):
+    """Gán nhãn sentiment cho cả mảng rating cùng lúc (>= 4 positive, <= 2 negative)"""
+    import numpy as np
+    ratings = np.asarray(ratings)
+    return np.where(ratings >= 4, 'positive', np.where(ratings <= 2, 'negative', 'neutral')).astype(object)
+
+
+class ReviewRecord:
+    """Một đánh giá đã xử lý, dùng __slots__ để khỏi tốn dict cho mỗi bản ghi"""
+    __slots__ = REVIEW_FIELDS + ('sentiment',)
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ReviewColumns:
+    """Gom đánh giá theo cột (mỗi trường một list) thay vì mỗi đánh giá một dict
+
+    Sentiment được tính một lần cho cả cột rating. Duyệt qua đối tượng sẽ
+    cho ra các dict như process_reviews trước đây, nên dùng thay list được.
+    """
+    __slots__ = ('columns',)
+
+    def __init__(self, reviews=None):
+        self.columns = {field: [] for field in REVIEW_FIELDS}
+        if reviews:
+            self.extend_raw(reviews)
+
+    def extend_raw(self, reviews):
+        """Thêm các đánh giá thô từ API (bỏ đánh giá không có rating, như process_reviews trước đây)"""
+        c = self.columns
+        review_id, title, content = c['review_id'].append, c['title'].append, c['content'].append
+        rating, created_at, customer = c['rating'].append, c['created_at'].append, c['customer_name'].append
+        product_id, verified = c['product_id'].append, c['is_verified'].append
+        likes, replies = c['number_of_likes'].append, c['number_of_replies'].append
+
+        for review in reviews:
+            stars = review.get('rating')
+            if not isinstance(stars, (int, float)) or stars != stars:
+                continue
+            review_id(review.get('id', ''))
+            title(review.get('title', ''))
+            content(review.get('content', ''))
+            rating(stars)
+            created_at(review.get('created_at', ''))
+            customer((review.get('created_by') or {}).get('name', ''))
+            product_id(review.get('product_id', ''))
+            verified(review.get('is_verified', False))
+            likes(review.get('number_of_likes') or 0)
+            replies(review.get('number_of_replies') or 0)
+        return self
+
+    def extend(self, other):
+        """Nối thêm một ReviewColumns khác"""
+        for field in REVIEW_FIELDS:
+            self.columns[field].extend(other.columns[field])
+        return self
+
+    def __len__(self):
+        return len(self.columns['review_id'])
+
+    def normalize(self, normalizer, fields=('title', 'content')):
+        """Chuẩn hóa các cột văn bản tại chỗ (utils.text_normalize.TextNormalizer)"""
+        for field in fields:
+            self.columns[field] = normalizer.normalize_many(self.columns[field])
+        return self
+
+    def sentiment(self):
+        import numpy as np
+        return sentiment_from_rating(np.asarray(self.columns['rating'], dtype=np.int64))
+
+    def arrays(self):
+        """Các cột dạng mảng (cột số là numpy) kèm cột sentiment"""
+        import numpy as np
+        arrays = {}
+        for field in REVIEW_FIELDS:
+            if field in REVIEW_INT_FIELDS:
+                arrays[field] = np.asarray(self.columns[field], dtype=np.int64)
+            else:
+                arrays[field] = self.columns[field]
+        arrays['sentiment'] = sentiment_from_rating(arrays['rating'])
+        return arrays
+
+    def rows(self):
+        """Duyệt từng đánh giá dưới dạng ReviewRecord"""
+        columns = [self.columns[field] for field in REVIEW_FIELDS]
+        return (ReviewRecord(*values) for values in zip(*columns, self.sentiment()))
+
+    def __iter__(self):
+        keys = REVIEW_FIELDS + ('sentiment',)
+        columns = [self.columns[field] for field in REVIEW_FIELDS]
+        for values in zip(*columns, self.sentiment()):
+            yield dict(zip(keys, values))
+
+    def to_dicts(self):
+        return list(self)
+
+    def to_frame(self):
+        """Chuyển sang DataFrame, các mảng numpy được dùng trực tiếp không sao chép"""
+        import pandas as pd
+        return pd.DataFrame(self.arrays(), columns=list(REVIEW_FIELDS) + ['sentiment'], copy=False)
+
+    def to_arrow(self):
+        """Chuyển sang pyarrow.Table (cần pyarrow)"""
+        import pyarrow as pa
+        return pa.table(self.arrays())
@@ -0,0 +1,392 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+from collections import defaultdict
+
+import numpy as np
+
+from utils.text_normalize import tokenize
+from utils.training_export import LABEL_IDS, sentiment_label
+
+# Các cột của mỗi đánh giá trong chỉ mục (dùng để lọc / nối với dữ liệu gốc)
+DOC_COLUMNS = {'review_id': 'int64', 'product_id': 'int64', 'rating': 'int8', 'sentiment': 'int8'}
+
+
+def varint_sizes(values):
+    """Số byte varint của từng giá trị"""
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+    return nbytes
+
+
+def encode_varints(values):
+    """Mã hóa mảng số nguyên không âm thành varint (LEB128): 7 bit mỗi byte, bit cao = còn byte sau"""
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = varint_sizes(values)
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    starts = np.cumsum(nbytes) - nbytes
+    values = values.copy()
+    for k in range(int(nbytes.max()) if len(values) else 0):
+        active = nbytes > k
+        more = (nbytes[active] > k + 1).astype(np.uint8) << 7
+        out[starts[active] + k] = (values[active] & np.uint64(0x7F)).astype(np.uint8) | more
+        values[active] >>= np.uint64(7)
+    return out
+
+
+def decode_varints(data):
+    """Giải mã chuỗi byte varint (mảng uint8) thành mảng uint64"""
+    data = np.asarray(data, dtype=np.uint8)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1)).astype(np.int64)
+    lengths = ends - starts + 1
+    values = np.zeros(len(ends), dtype=np.uint64)
+    for k in range(int(lengths.max()) if len(ends) else 0):
+        active = lengths > k
+        values[active] |= (data[starts[active] + k] & 0x7F).astype(np.uint64) << np.uint64(7 * k)
+    return values
+
+
+def terms_of(text):
+    """Các term của một văn bản: âm tiết (unigram) và cặp âm tiết liền nhau (bigram, 'giao hàng')"""
+    tokens = tokenize(text)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def query_terms(phrase):
+    """Term cần có để khớp một cụm: 1 âm tiết -> unigram, nhiều âm tiết -> các bigram liên tiếp"""
+    tokens = tokenize(phrase)
+    if len(tokens) <= 1:
+        return tokens
+    return [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _fingerprint(*values):
+    """Dấu vân tay 64 bit của nội dung được đánh chỉ mục (để nhận ra đánh giá đã sửa)"""
+    digest = hashlib.blake2b('\x1f'.join(map(str, values)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _int(value, default=-1):
+    try:
+        return int(value) if value is not None and value == value else default
+    except (TypeError, ValueError):
+        return default
+
+
+class _Segment:
+    """Một segment chỉ đọc: từ điển term, postings varint-delta, các cột tài liệu"""
+
+    def __init__(self, path, base):
+        self.path = path
+        self.base = base
+        with open(os.path.join(path, 'terms.txt'), encoding='utf-8') as f:
+            self.terms = {term: i for i, term in enumerate(f.read().split('\n')) if term}
+        with np.load(os.path.join(path, 'terms.npz')) as data:
+            self.offsets = data['offsets']
+            self.doc_freq = data['doc_freq']
+        with np.load(os.path.join(path, 'docs.npz')) as data:
+            self.docs = {name: data[name] for name in DOC_COLUMNS}
+            # Segment cũ chưa có dấu vân tay: 0 = không rõ, bản ghi tới sau sẽ thay thế
+            self.fingerprints = data['fingerprint'] if 'fingerprint' in data.files \
+                else np.zeros(len(self.docs['review_id']), dtype=np.uint64)
+        size = os.path.getsize(os.path.join(path, 'postings.bin'))
+        self.postings = np.memmap(os.path.join(path, 'postings.bin'), dtype=np.uint8, mode='r') if size \
+            else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.docs['review_id'])
+
+    def get(self, term):
+        """ID tài liệu (toàn cục, tăng dần) chứa term"""
+        i = self.terms.get(term)
+        if i is None:
+            return np.zeros(0, dtype=np.int64)
+        deltas = decode_varints(self.postings[self.offsets[i]:self.offsets[i + 1]])
+        return np.cumsum(deltas.astype(np.int64)) + self.base
+
+    def all_postings(self):
+        """(term theo thứ tự, số tài liệu mỗi term, ID toàn cục nối liền) của cả segment"""
+        terms = sorted(self.terms, key=self.terms.get)
+        return terms, self.doc_freq.astype(np.int64), _undelta(decode_varints(self.postings), self.doc_freq) + self.base
+
+    @staticmethod
+    def write(path, terms, lengths, ids, docs, fingerprints):
+        """Ghi segment mới: terms đã sắp xếp, lengths[i] = số tài liệu của terms[i],
+        ids = ID tài liệu cục bộ (tăng dần trong mỗi term) nối liền, docs {cột: mảng},
+        fingerprints = dấu vân tay nội dung của từng tài liệu"""
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        # Mã hóa mọi postings một lần: chênh lệch ID trong từng term, ID đầu giữ nguyên
+        ids = np.asarray(ids, dtype=np.int64)
+        firsts = np.cumsum(lengths) - lengths
+        deltas = np.diff(ids, prepend=0)
+        deltas[firsts] = ids[firsts]
+        encode_varints(deltas).tofile(os.path.join(tmp_path, 'postings.bin'))
+        byte_ends = np.cumsum(varint_sizes(deltas))
+        offsets = np.concatenate(([0], byte_ends[firsts + lengths - 1])).astype(np.int64)
+        with open(os.path.join(tmp_path, 'terms.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(terms))
+        np.savez(os.path.join(tmp_path, 'terms.npz'), offsets=offsets, doc_freq=np.asarray(lengths, dtype=np.int32))
+        np.savez(os.path.join(tmp_path, 'docs.npz'), fingerprint=np.asarray(fingerprints, dtype=np.uint64),
+                 **{name: np.asarray(docs[name], dtype=dtype) for name, dtype in DOC_COLUMNS.items()})
+        os.replace(tmp_path, path)
+
+
+def _undelta(deltas, lengths):
+    """Cộng dồn chênh lệch trong từng đoạn độ dài lengths (mỗi đoạn bắt đầu lại từ 0)"""
+    cumulative = np.cumsum(deltas.astype(np.int64))
+    lengths = np.asarray(lengths, dtype=np.int64)
+    firsts = (np.cumsum(lengths) - lengths)[lengths > 0]
+    return cumulative - np.repeat(cumulative[firsts] - deltas[firsts].astype(np.int64), lengths[lengths > 0])
+
+
+class ReviewIndex:
+    """Chỉ mục ngược trên title/content của đánh giá, lưu trên đĩa theo segment
+
+    Term là âm tiết và cặp âm tiết liền nhau (utils.text_normalize.tokenize), nên
+    tìm được cả cụm hai âm tiết như "giao hàng"; cụm dài hơn được khớp bằng giao
+    các cặp liên tiếp (gần đúng, không lưu vị trí). Mỗi lần update() thêm một
+    segment mới chỉ chứa các đánh giá chưa có hoặc đã sửa (theo review_id và dấu
+    vân tay nội dung), postings mã hóa varint trên chênh lệch ID. Bản cũ của
+    đánh giá đã sửa được đánh dấu xóa (manifest 'deleted'), bỏ khỏi kết quả tìm
+    kiếm và bị loại hẳn khi compact(). Kết quả lọc được theo rating, sentiment và
+    product_id mà không cần đọc lại CSV; extract() lấy bản ghi đầy đủ từ kho đã gộp.
+    """
+
+    def __init__(self, path='data/review_index', fields=('title', 'content'), segment_size=200000):
+        self.path = path
+        self.fields = fields
+        self.segment_size = segment_size
+        self.manifest = {'segments': [], 'files': {}, 'next_segment': 0, 'deleted': []}
+        manifest_path = os.path.join(path, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            self.manifest.setdefault('deleted', [])
+        self._open_segments()
+
+    def _open_segments(self):
+        self.segments = []
+        base = 0
+        for name in self.manifest['segments']:
+            segment = _Segment(os.path.join(self.path, name), base)
+            self.segments.append(segment)
+            base += len(segment)
+        self.docs = {
+            name: np.concatenate([s.docs[name] for s in self.segments]) if self.segments
+            else np.zeros(0, dtype=dtype)
+            for name, dtype in DOC_COLUMNS.items()
+        }
+        self.fingerprints = np.concatenate([s.fingerprints for s in self.segments]) if self.segments \
+            else np.zeros(0, dtype=np.uint64)
+        # live[i]: tài liệu i chưa bị thay bằng bản mới hơn
+        self.live = np.ones(len(self.fingerprints), dtype=bool)
+        self.live[np.asarray(self.manifest['deleted'], dtype=np.int64)] = False
+
+    def __len__(self):
+        """Số đánh giá đang có trong chỉ mục (không tính bản cũ đã bị thay)"""
+        return int(self.live.sum())
+
+    def _save_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, 'manifest.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, os.path.join(self.path, 'manifest.json'))
+
+    def _write_segment(self, terms, lengths, ids, docs, fingerprints):
+        name = f"seg_{self.manifest['next_segment']:05d}"
+        self.manifest['next_segment'] += 1
+        os.makedirs(self.path, exist_ok=True)
+        _Segment.write(os.path.join(self.path, name), terms, lengths, ids, docs, fingerprints)
+        self.manifest['segments'].append(name)
+
+    def add(self, records):
+        """Đánh chỉ mục các đánh giá chưa có hoặc đã sửa (theo review_id), trả về số đánh giá đã ghi
+
+        Đánh giá đã có với nội dung / rating khác được ghi lại, bản cũ bị đánh dấu
+        xóa (bản tới sau thắng, như khi gộp snapshot). Ghi segment mới (mỗi
+        segment tối đa segment_size đánh giá) và manifest.
+        """
+        # review_id -> (ID tài liệu toàn cục, dấu vân tay) của bản đang dùng
+        live_ids = np.flatnonzero(self.live)
+        known = dict(zip(self.docs['review_id'][live_ids].tolist(),
+                         zip(live_ids.tolist(), self.fingerprints[live_ids].tolist())))
+        next_id = len(self.fingerprints)
+        postings = defaultdict(list)
+        docs = {name: [] for name in DOC_COLUMNS}
+        fingerprints = []
+        deleted = []
+        added = 0
+
+        def flush():
+            if docs['review_id']:
+                terms = sorted(postings)
+                lengths = np.fromiter((len(postings[t]) for t in terms), dtype=np.int64, count=len(terms))
+                ids = np.fromiter((i for t in terms for i in postings[t]), dtype=np.int64, count=int(lengths.sum()))
+                self._write_segment(terms, lengths, ids, docs, fingerprints)
+                postings.clear()
+                for values in docs.values():
+                    values.clear()
+                fingerprints.clear()
+
+        for record in records:
+            review_id = _int(record.get('review_id'))
+            if review_id < 0:
+                continue
+            text = ' '.join(str(record[f]) for f in self.fields if isinstance(record.get(f), str))
+            rating = _int(record.get('rating'), 0)
+            product_id = _int(record.get('product_id'))
+            sentiment = sentiment_label(record, rating) if rating else -1
+            fingerprint = _fingerprint(text, rating, product_id, sentiment)
+            previous = known.get(review_id)
+            if previous is not None:
+                if previous[1] == fingerprint:
+                    continue
+                deleted.append(previous[0])
+            known[review_id] = next_id, fingerprint
+            next_id += 1
+
+            local = len(docs['review_id'])
+            for term in terms_of(text):
+                postings[term].append(local)
+            docs['review_id'].append(review_id)
+            docs['product_id'].append(product_id)
+            docs['rating'].append(rating)
+            docs['sentiment'].append(sentiment)
+            fingerprints.append(fingerprint)
+            added += 1
+            if len(docs['review_id']) >= self.segment_size:
+                flush()
+        flush()
+
+        if added:
+            self.manifest['deleted'].extend(deleted)
+            self._save_manifest()
+            self._open_segments()
+        return added
+
+    def update(self, folder_path='data'):
+        """Đánh chỉ mục các snapshot tiki_reviews_* mới hoặc đã thay đổi trong folder_path"""
+        from utils.snapshot_merge import iter_snapshot_chunks, snapshot_of
+
+        files = []
+        for pattern in ('tiki_reviews_*.csv', 'tiki_reviews_*.jsonl', 'tiki_reviews_*.jsonl.gz'):
+            files.extend(glob.glob(os.path.join(folder_path, pattern)))
+
+        added = 0
+        for path in sorted(files, key=lambda f: (snapshot_of(f), f)):
+            stat = os.stat(path)
+            name = os.path.basename(path)
+            if self.manifest['files'].get(name) == [stat.st_size, stat.st_mtime]:
+                continue
+            added += self.add(record for chunk in iter_snapshot_chunks(path) for record in chunk)
+            self.manifest['files'][name] = [stat.st_size, stat.st_mtime]
+            self._save_manifest()
+        return added
+
+    def compact(self):
+        """Gộp tất cả segment thành một (ít segment -> truy vấn nhanh hơn), bỏ hẳn các bản đã bị thay"""
+        if len(self.segments) <= 1 and self.live.all():
+            return
+        parts = [segment.all_postings() for segment in self.segments]
+        terms = sorted(set().union(*(segment.terms for segment in self.segments)))
+        rank = {term: i for i, term in enumerate(terms)}
+        term_ids = np.concatenate([
+            np.repeat(np.asarray([rank[t] for t in seg_terms], dtype=np.int64), lengths)
+            for seg_terms, lengths, _ in parts
+        ])
+        ids = np.concatenate([ids for _, _, ids in parts])
+        # Đánh số lại tài liệu còn dùng, bỏ postings của bản cũ và term không còn tài liệu nào
+        keep = self.live[ids]
+        term_ids, ids = term_ids[keep], (np.cumsum(self.live) - 1)[ids[keep]]
+        used = np.bincount(term_ids, minlength=len(terms)) > 0
+        terms = [term for term, is_used in zip(terms, used) if is_used]
+        term_ids = (np.cumsum(used) - 1)[term_ids]
+        # Sắp ổn định theo term: ID trong mỗi term vẫn tăng dần vì segment nối theo thứ tự
+        order = np.argsort(term_ids, kind='stable')
+        lengths = np.bincount(term_ids, minlength=len(terms))
+
+        old = self.manifest['segments']
+        self.manifest['segments'] = []
+        self.manifest['deleted'] = []
+        self._write_segment(terms, lengths, ids[order],
+                            {name: values[self.live] for name, values in self.docs.items()}, self.fingerprints[self.live])
+        self._save_manifest()
+        self._open_segments()
+        for name in old:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def term_docs(self, term):
+        """ID tài liệu chứa term, qua mọi segment"""
+        parts = [segment.get(term) for segment in self.segments]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def doc_freq(self, term):
+        return sum(int(s.doc_freq[s.terms[term]]) for s in self.segments if term in s.terms)
+
+    def search(self, *phrases, mode='and', rating=None, sentiment=None, product_ids=None):
+        """ID tài liệu (tăng dần) chứa các cụm phrases (mode='and': tất cả, 'or': ít nhất một)
+
+        rating: một số hoặc danh sách số sao; sentiment: 'positive' / 'neutral' /
+        'negative' hoặc danh sách; product_ids: chỉ giữ đánh giá của các sản phẩm này.
+        """
+        matches = []
+        for phrase in phrases:
+            terms = query_terms(phrase)
+            if not terms:
+                continue
+            # Giao từ term hiếm nhất để mảng trung gian nhỏ nhất
+            terms.sort(key=self.doc_freq)
+            docs = self.term_docs(terms[0])
+            for term in terms[1:]:
+                if not len(docs):
+                    break
+                docs = np.intersect1d(docs, self.term_docs(term), assume_unique=True)
+            matches.append(docs)
+
+        if not matches:
+            result = np.arange(len(self.live), dtype=np.int64)
+        elif mode == 'or':
+            result = np.unique(np.concatenate(matches))
+        else:
+            result = matches[0]
+            for docs in matches[1:]:
+                result = np.intersect1d(result, docs, assume_unique=True)
+
+        if not self.live.all():
+            result = result[self.live[result]]
+        if rating is not None:
+            result = result[np.isin(self.docs['rating'][result], np.atleast_1d(rating))]
+        if sentiment is not None:
+            labels = [LABEL_IDS[s] for s in np.atleast_1d(sentiment)]
+            result = result[np.isin(self.docs['sentiment'][result], labels)]
+        if product_ids is not None:
+            result = result[np.isin(self.docs['product_id'][result], np.asarray(product_ids, dtype=np.int64))]
+        return result
+
+    def count(self, *phrases, **filters):
+        return len(self.search(*phrases, **filters))
+
+    def columns(self, doc_ids):
+        """Các cột review_id / product_id / rating / sentiment của các tài liệu"""
+        return {name: values[doc_ids] for name, values in self.docs.items()}
+
+    def extract(self, *phrases, data_dir='data', limit=None, **filters):
+        """Bản ghi đánh giá đầy đủ (từ kho merged_tiki_reviews.sqlite) khớp truy vấn"""
+        from utils.snapshot_merge import SnapshotMerger
+
+        review_ids = self.docs['review_id'][self.search(*phrases, **filters)][:limit]
+        merger = SnapshotMerger('reviews', data_dir)
+        try:
+            return merger.get_many(review_ids.tolist())
+        finally:
+            merger.close()
@@ -0,0 +1,76 @@
+import glob
+import json
+import os
+import threading
+
+
+class ReviewWatermarks:
+    """Lưu đánh giá mới nhất (review_id, created_at) đã thấy cho mỗi sản phẩm
+
+    Dùng cho chế độ crawl tăng dần: chỉ lấy các đánh giá mới hơn mốc này.
+    Các thay đổi chỉ nằm trong bộ nhớ cho tới khi gọi save(), nên hãy gọi
+    save() sau khi bộ dữ liệu đã được lưu để không mất đánh giá khi bị lỗi.
+    """
+
+    def __init__(self, path='data/review_watermarks.json'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.marks = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.marks = json.load(f)
+
+    @classmethod
+    def from_snapshots(cls, folder_path='data', path='data/review_watermarks.json'):
+        """Khởi tạo mốc từ các file tiki_reviews_*.csv đã có"""
+        import pandas as pd
+
+        watermarks = cls(path)
+        for file in sorted(glob.glob(os.path.join(folder_path, 'tiki_reviews_*.csv'))):
+            df = pd.read_csv(file, usecols=['review_id', 'product_id', 'created_at'])
+            latest = df.groupby('product_id').agg({'review_id': 'max', 'created_at': 'max'})
+            for product_id, row in latest.iterrows():
+                watermarks._advance(product_id, int(row['review_id']), int(row['created_at']))
+        return watermarks
+
+    def get(self, product_id):
+        """Trả về dict {'review_id', 'created_at'} hoặc None nếu chưa crawl sản phẩm này"""
+        return self.marks.get(str(product_id))
+
+    def is_known(self, product_id, review):
+        """Đánh giá (dữ liệu thô từ API) đã có trong các lần crawl trước chưa"""
+        mark = self.get(product_id)
+        if mark is None:
+            return False
+        review_id = review.get('id')
+        if review_id:
+            return int(review_id) <= mark['review_id']
+        return int(review.get('created_at') or 0) <= mark['created_at']
+
+    def _advance(self, product_id, review_id, created_at):
+        key = str(product_id)
+        mark = self.marks.get(key)
+        if mark is None:
+            self.marks[key] = {'review_id': review_id, 'created_at': created_at}
+        else:
+            mark['review_id'] = max(mark['review_id'], review_id)
+            mark['created_at'] = max(mark['created_at'], created_at)
+
+    def update(self, product_id, reviews):
+        """Đẩy mốc lên theo các đánh giá thô vừa lấy được"""
+        if not reviews:
+            return
+        review_id = max(int(r.get('id') or 0) for r in reviews)
+        created_at = max(int(r.get('created_at') or 0) for r in reviews)
+        with self.lock:
+            self._advance(product_id, review_id, created_at)
+
+    def save(self):
+        """Ghi ra file (ghi file tạm rồi đổi tên để không hỏng file cũ)"""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.marks, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,164 @@
+import heapq
+import itertools
+import math
+import threading
+from collections import Counter, defaultdict
+
+SENTIMENTS = ('negative', 'neutral', 'positive')
+
+
+def prior_distribution(rating_average):
+    """Ước lượng ban đầu tỉ lệ negative/neutral/positive từ điểm trung bình của sản phẩm"""
+    if not rating_average:
+        rating_average = 4.0
+    positive = min(0.95, max(0.05, (rating_average - 1) / 4))
+    rest = 1 - positive
+    return {'negative': rest * 0.6, 'neutral': rest * 0.4, 'positive': positive}
+
+
+def rating_bucket(rating_average):
+    """Nhóm điểm trung bình theo bước 0.5, None nếu sản phẩm chưa có đánh giá"""
+    if not rating_average:
+        return None
+    return round(float(rating_average) * 2) / 2
+
+
+class YieldScheduler:
+    """Xếp thứ tự crawl theo số đánh giá thuộc lớp còn thiếu mà mỗi sản phẩm có thể mang lại
+
+    Mỗi nhóm rating_average có một ước lượng tỉ lệ lớp (prior + số đếm thực tế,
+    cập nhật sau mỗi sản phẩm). Sản phẩm được ưu tiên theo số đánh giá hữu ích
+    kỳ vọng trên mỗi request (lớp hiếm được tính nặng hơn), ngân sách trang mỗi
+    sản phẩm vừa đủ cho lớp còn thiếu, và dừng khi mọi quota đã đủ. Số đánh giá
+    kỳ vọng của các task đang chạy (đã next() nhưng chưa observe()) được trừ
+    khỏi quota còn thiếu, nên không phát thêm task khi phần đang chạy đã đủ.
+    """
+
+    def __init__(self, quotas, page_size=20, max_reviews_per_product=5000, prior_strength=50):
+        self.quotas = dict(quotas)
+        self.page_size = page_size
+        self.max_reviews_per_product = max_reviews_per_product
+        self.prior_strength = prior_strength
+        self.collected = Counter()
+        self.observed = defaultdict(Counter)
+        # Đánh giá kỳ vọng theo lớp của từng task đang chạy (theo product_id) và tổng của chúng
+        self.in_flight = {}
+        self.expected = Counter()
+        self.heap = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def add(self, products, default_review_count=None):
+        """Thêm sản phẩm cần crawl: ID hoặc dict có product_id, rating_average, review_count"""
+        default_review_count = default_review_count or self.max_reviews_per_product
+        with self.lock:
+            for product in products:
+                if not isinstance(product, dict):
+                    product = {'product_id': product}
+                product = dict(product)
+                product.setdefault('review_count', default_review_count)
+                if product['review_count'] is None:
+                    product['review_count'] = default_review_count
+                heapq.heappush(self.heap, (-self._score(product), next(self.counter), product))
+
+    def _distribution(self, rating_average, counts=None):
+        prior = prior_distribution(rating_average)
+        counts = self.observed[rating_bucket(rating_average)] if counts is None else counts
+        total = sum(counts.values())
+        return {
+            label: (self.prior_strength * prior[label] + counts[label]) / (self.prior_strength + total)
+            for label in SENTIMENTS
+        }
+
+    def _remaining(self, include_in_flight=True):
+        """Số đánh giá còn thiếu mỗi lớp (mặc định trừ cả phần kỳ vọng của các task đang chạy)"""
+        expected = self.expected if include_in_flight else Counter()
+        return {
+            label: max(0, quota - self.collected[label] - expected[label])
+            for label, quota in self.quotas.items()
+        }
+
+    def _budget(self, product):
+        """Số đánh giá nên lấy từ sản phẩm: đủ để lấp lớp còn thiếu nhiều nhất"""
+        distribution = self._distribution(product.get('rating_average'))
+        available = min(int(product['review_count'] or 0), self.max_reviews_per_product)
+        needed = 0
+        for label, remaining in self._remaining().items():
+            if remaining:
+                needed = max(needed, remaining / max(distribution.get(label, 0), 1e-3))
+        return min(available, int(math.ceil(needed)))
+
+    def _weights(self):
+        """Giá trị một đánh giá mỗi lớp: lớp càng hiếm (trên toàn bộ dữ liệu) và càng thiếu quota càng quý"""
+        overall = Counter()
+        for counts in self.observed.values():
+            overall.update(counts)
+        distribution = self._distribution(None, overall)
+        weights = {}
+        for label, remaining in self._remaining().items():
+            # Quota 0 nghĩa là không cần lớp này
+            share = remaining / self.quotas[label] if self.quotas[label] else 0.0
+            weights[label] = share / max(distribution.get(label, 0), 1e-3)
+        return weights
+
+    def _score(self, product):
+        """Giá trị kỳ vọng (đánh giá hữu ích, có trọng số theo độ hiếm) trên mỗi request"""
+        budget = self._budget(product)
+        if budget <= 0:
+            return 0.0
+        distribution = self._distribution(product.get('rating_average'))
+        weights = self._weights()
+        useful = sum(
+            weights[label] * min(remaining, budget * distribution.get(label, 0))
+            for label, remaining in self._remaining().items()
+        )
+        requests = 1 + math.ceil(budget / self.page_size)
+        return useful / requests
+
+    def done(self):
+        """Đã thu đủ mọi quota (chỉ tính đánh giá đã nhận)"""
+        with self.lock:
+            return not any(self._remaining(include_in_flight=False).values())
+
+    def next(self):
+        """Lấy (product, số đánh giá cần lấy) tiếp theo
+
+        None nếu hết sản phẩm, đã đủ quota, hoặc các task đang chạy được kỳ vọng
+        là đủ (gọi lại sau khi observe()).
+        """
+        with self.lock:
+            while self.heap and any(self._remaining().values()):
+                _, _, product = heapq.heappop(self.heap)
+                # Ước lượng thay đổi theo thời gian: tính lại điểm, nếu tụt xuống thì đưa lại vào heap
+                score = self._score(product)
+                if score <= 0:
+                    continue
+                if self.heap and score < -self.heap[0][0]:
+                    heapq.heappush(self.heap, (-score, next(self.counter), product))
+                    continue
+                budget = self._budget(product)
+                distribution = self._distribution(product.get('rating_average'))
+                expected = Counter({label: budget * distribution[label] for label in SENTIMENTS})
+                self.in_flight[str(product['product_id'])] = expected
+                self.expected.update(expected)
+                return product, budget
+            return None
+
+    def observe(self, product, product_info, reviews):
+        """Cập nhật quota và ước lượng tỉ lệ lớp sau khi crawl xong một sản phẩm
+
+        reviews: ReviewColumns, list dict đánh giá hoặc Counter số đánh giá theo lớp.
+        """
+        rating_average = (product_info or {}).get('rating_average') or product.get('rating_average')
+        if isinstance(reviews, Counter):
+            counts = reviews
+        elif hasattr(reviews, 'sentiment'):
+            counts = Counter(reviews.sentiment())
+        else:
+            counts = Counter(r['sentiment'] for r in reviews)
+        with self.lock:
+            expected = self.in_flight.pop(str(product['product_id']), None)
+            if expected is not None:
+                self.expected.subtract(expected)
+            self.collected.update(counts)
+            self.observed[rating_bucket(rating_average)].update(counts)
@@ -0,0 +1,94 @@
+import glob
+import gzip
+import json
+import os
+import time
+
+
+class ShardWriter:
+    """Ghi bản ghi ra nhiều file shard JSONL, mỗi shard tối đa shard_size bản ghi
+
+    Bản ghi được ghi thẳng xuống file khi tới nên bộ nhớ không tăng theo
+    kích thước crawl. Shard đang ghi có đuôi .tmp và chỉ được đổi tên khi đã
+    đóng, nên người đọc không bao giờ thấy shard dở dang. shard_size=None:
+    không tự chuyển shard, người gọi tự flush() (xem pending).
+    """
+
+    def __init__(self, output_dir, prefix='tiki_reviews', shard_size=50000, compress=True):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.compress = compress
+        self.timestamp = time.strftime("%Y%m%d_%H%M%S")
+        self.shards = []
+        self.total = 0
+        self._file = None
+        self._path = None
+        self._count = 0
+
+    def _open(self):
+        ext = '.jsonl.gz' if self.compress else '.jsonl'
+        self._path = os.path.join(
+            self.output_dir, f"{self.prefix}_{self.timestamp}_{len(self.shards):05d}{ext}"
+        )
+        opener = gzip.open if self.compress else open
+        self._file = opener(f"{self._path}.tmp", 'wt', encoding='utf-8')
+        self._count = 0
+
+    def write(self, record):
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str))
+        self._file.write('\n')
+        self._count += 1
+        self.total += 1
+        if self.shard_size and self._count >= self.shard_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    @property
+    def pending(self):
+        """Số bản ghi trong shard đang mở (chưa đóng)"""
+        return self._count if self._file is not None else 0
+
+    def flush(self):
+        """Đóng shard hiện tại (nếu có) và đưa nó vào danh sách shard hoàn chỉnh"""
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(f"{self._path}.tmp", self._path)
+        self.shards.append(self._path)
+        self._file = None
+
+    def close(self):
+        self.flush()
+        return self.shards
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def list_shards(pattern):
+    """Danh sách shard theo glob pattern hoặc thư mục, sắp xếp theo tên"""
+    if isinstance(pattern, (list, tuple)):
+        return list(pattern)
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.jsonl*')
+    return sorted(p for p in glob.glob(pattern) if not p.endswith('.tmp'))
+
+
+def iter_shard_records(pattern):
+    """Đọc lần lượt từng bản ghi từ các shard JSONL (có hoặc không nén gzip)"""
+    for path in list_shards(pattern):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,174 @@
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+import pandas as pd
+
+# Khóa chống trùng và các cột bắt buộc cho từng loại dữ liệu
+MERGE_KEYS = {'reviews': 'review_id', 'products': 'product_id'}
+DEFAULT_DROPNA = {'reviews': ['content'], 'products': []}
+# Thư mục con (trong folder_path) chứa các file CSV đã gộp
+MERGED_DIR = 'merged'
+
+
+def snapshot_of(path):
+    """Lấy timestamp snapshot (YYYYmmdd_HHMMSS) từ tên file"""
+    match = re.search(r'(\d{8}_\d{6})', os.path.basename(path))
+    return match.group(1) if match else ''
+
+
+def iter_snapshot_chunks(path, chunksize=20000):
+    """Đọc từng khối bản ghi (list dict) từ file snapshot CSV hoặc shard JSONL"""
+    if path.endswith('.csv'):
+        reader = pd.read_csv(path, chunksize=chunksize, encoding='utf-8-sig')
+    else:
+        reader = pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+    for chunk in reader:
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield chunk.to_dict('records')
+
+
+class SnapshotMerger:
+    """Gộp tăng dần các snapshot tiki_reviews_* / tiki_products_* vào một kho SQLite
+
+    Mỗi bản ghi được lưu một lần theo khóa (review_id / product_id); nếu trùng
+    thì giữ bản ghi của snapshot mới hơn. Bảng manifest ghi lại các file đã gộp
+    nên lần chạy sau chỉ xử lý các snapshot mới hoặc đã thay đổi.
+    """
+
+    def __init__(self, kind='reviews', folder_path='data', store_path=None):
+        if kind not in MERGE_KEYS:
+            raise ValueError(f"kind phải là một trong {list(MERGE_KEYS)}")
+
+        self.kind = kind
+        self.key = MERGE_KEYS[kind]
+        self.folder_path = folder_path
+        self.store_path = store_path or os.path.join(folder_path, f"merged_tiki_{kind}.sqlite")
+        self.conn = sqlite3.connect(self.store_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                key INTEGER PRIMARY KEY,
+                snapshot TEXT,
+                record TEXT
+            );
+            CREATE TABLE IF NOT EXISTS manifest (
+                file TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                rows INTEGER,
+                merged_at REAL
+            );
+        """)
+        self.conn.commit()
+
+    def snapshot_files(self):
+        """Các file snapshot CSV và shard JSONL trong thư mục, theo thứ tự thời gian"""
+        patterns = [f"tiki_{self.kind}_*.csv", f"tiki_{self.kind}_*.jsonl", f"tiki_{self.kind}_*.jsonl.gz"]
+        files = []
+        for pattern in patterns:
+            files.extend(glob.glob(os.path.join(self.folder_path, pattern)))
+        return sorted(files, key=lambda f: (snapshot_of(f), f))
+
+    def pending_files(self):
+        """Các file chưa gộp hoặc đã thay đổi kể từ lần gộp trước"""
+        merged = {
+            file: (size, mtime)
+            for file, size, mtime in self.conn.execute('SELECT file, size, mtime FROM manifest')
+        }
+        pending = []
+        for path in self.snapshot_files():
+            stat = os.stat(path)
+            if merged.get(os.path.basename(path)) != (stat.st_size, stat.st_mtime):
+                pending.append(path)
+        return pending
+
+    def merge_file(self, path, chunksize=20000):
+        """Gộp một file snapshot, trả về số bản ghi đã đọc"""
+        snapshot = snapshot_of(path)
+        rows = 0
+        for records in iter_snapshot_chunks(path, chunksize):
+            values = [
+                (int(r[self.key]), snapshot, json.dumps(r, ensure_ascii=False, default=str))
+                for r in records if r.get(self.key) is not None
+            ]
+            # Last-write-wins: chỉ ghi đè khi snapshot mới hơn hoặc bằng
+            self.conn.executemany("""
+                INSERT INTO records (key, snapshot, record) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET snapshot = excluded.snapshot, record = excluded.record
+                WHERE excluded.snapshot >= records.snapshot
+            """, values)
+            rows += len(records)
+
+        stat = os.stat(path)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)',
+            (os.path.basename(path), stat.st_size, stat.st_mtime, rows, time.time())
+        )
+        self.conn.commit()
+        return rows
+
+    def merge(self, chunksize=20000):
+        """Gộp tất cả snapshot mới, trả về {tên file: số bản ghi}"""
+        stats = {}
+        for path in self.pending_files():
+            stats[os.path.basename(path)] = self.merge_file(path, chunksize)
+            print(f"Đã gộp {path}: {stats[os.path.basename(path)]} bản ghi")
+        return stats
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def iter_records(self, batch_size=20000):
+        """Sinh lần lượt từng khối bản ghi đã gộp (list dict), theo thứ tự khóa"""
+        cursor = self.conn.execute('SELECT record FROM records ORDER BY key')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [json.loads(record) for (record,) in rows]
+
+    def get_many(self, keys, batch_size=500):
+        """Các bản ghi đã gộp theo khóa (review_id / product_id), giữ thứ tự keys, bỏ khóa không có"""
+        keys = [int(key) for key in keys]
+        found = {}
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
+            rows = self.conn.execute(
+                f"SELECT key, record FROM records WHERE key IN ({','.join('?' * len(batch))})", batch
+            )
+            found.update((key, json.loads(record)) for key, record in rows)
+        return [found[key] for key in keys if key in found]
+
+    def export_csv(self, output_path=None, dropna=None, batch_size=20000):
+        """Ghi dữ liệu đã gộp ra CSV (thay cho bước concat + drop_duplicates trong notebook)
+
+        Mặc định ghi vào <folder_path>/merged/, không đè merged_tiki_products.csv đã enrich trong folder_path.
+        """
+        output_path = output_path or os.path.join(self.folder_path, MERGED_DIR, f"merged_tiki_{self.kind}.csv")
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        dropna = DEFAULT_DROPNA[self.kind] if dropna is None else dropna
+        tmp_path = f"{output_path}.tmp"
+        columns = None
+        total = 0
+
+        for records in self.iter_records(batch_size):
+            df = pd.DataFrame(records, columns=columns)
+            if columns is None:
+                columns = list(df.columns)
+            if dropna:
+                df = df.dropna(subset=[c for c in dropna if c in df.columns])
+            df.to_csv(tmp_path, mode='a' if total else 'w', header=not total, index=False)
+            total += len(df)
+
+        if columns is None:
+            return None
+        os.replace(tmp_path, output_path)
+        print(f"Đã xuất {total} bản ghi ra {output_path}")
+        return output_path
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,179 @@
+import html
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from multiprocessing import Pool
+
+# Teencode / viết tắt thường gặp trong đánh giá (so khớp theo từ, không phân biệt hoa thường).
+# Mặc định chỉ gồm các mục nhiều chữ cái, không trùng với từ/đơn vị hợp lệ
+DEFAULT_TEENCODE = {
+    'ko': 'không', 'kh': 'không', 'hok': 'không', 'khong': 'không',
+    'dc': 'được', 'đc': 'được', 'duoc': 'được',
+    'sp': 'sản phẩm', 'sản phấm': 'sản phẩm',
+    'mn': 'mọi người', 'mng': 'mọi người', 'nv': 'nhân viên',
+    'bt': 'bình thường', 'bth': 'bình thường',
+    'qá': 'quá', 'wá': 'quá', 'thik': 'thích', 'thich': 'thích',
+    'tks': 'cảm ơn', 'cám ơn': 'cảm ơn',
+    'shiper': 'shipper', 'okie': 'ok', 'oke': 'ok', 'okela': 'ok',
+    'trc': 'trước', 'ntn': 'như thế nào', 'nhìu': 'nhiều', 'mik': 'mình',
+}
+
+# Các mục dễ nhầm (một chữ cái, đơn vị "kg", "vs", tiếng Anh...): chỉ dùng khi truyền vào rõ ràng,
+# ví dụ TextNormalizer(teencode={**DEFAULT_TEENCODE, **AMBIGUOUS_TEENCODE})
+AMBIGUOUS_TEENCODE = {
+    'k': 'không', 'kg': 'không', 'j': 'gì', 'r': 'rồi', 'ng': 'người', 'vs': 'với',
+    'dk': 'được', 'đk': 'được', 'sf': 'sản phẩm', 'mk': 'mình', 'thanks': 'cảm ơn', 'thank': 'cảm ơn',
+}
+
+_TAG = re.compile(r'<[^>]+>')
+_WHITESPACE = re.compile(r'\s+')
+# Chữ cái hoặc !/? lặp từ 3 lần trở lên ("quáaaaa", "!!!!!") -> giữ 1 ký tự (không đụng tới số, "...").
+# Nhóm keep giữ nguyên URL/email, cỡ áo (XXL, 3XL) và số La Mã (III)
+_CHAR_RUN = re.compile(
+    r'(?P<keep>\b(?:https?://|www\b)\S*|[\w.+-]+@[\w-]+\.[\w.]+|\b\d*[Xx]{2,}[SsLl]\b|\b[IVX]{2,}\b)'
+    r'|(?P<char>[^\W\d_]|[!?])(?P=char){2,}'
+)
+# Token = một âm tiết / cụm chữ-số (tiếng Việt viết rời từng âm tiết), bỏ dấu câu
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+def strip_html(text):
+    """Bỏ thẻ HTML và giải mã thực thể (&amp;, &nbsp;...)"""
+    return html.unescape(_TAG.sub(' ', text))
+
+
+def tokenize(text):
+    """Tách văn bản thành token chữ thường (NFC, giữ dấu tiếng Việt), dùng chung cho xuất dữ liệu huấn luyện và chỉ mục"""
+    if not isinstance(text, str):
+        return []
+    return _TOKEN.findall(unicodedata.normalize('NFC', text).lower())
+
+
+def _collapse_run(match):
+    return match.group('keep') or match.group('char')
+
+
+def _teencode_pattern(teencode):
+    if not teencode:
+        return None
+    words = sorted(teencode, key=len, reverse=True)
+    return re.compile(r'(?<!\w)(' + '|'.join(re.escape(w) for w in words) + r')(?!\w)', re.IGNORECASE)
+
+
+class TextNormalizer:
+    """Chuẩn hóa văn bản tiếng Việt: NFC, bỏ HTML, gộp khoảng trắng/ký tự lặp, thay teencode
+
+    Kết quả được nhớ trong LRU cache theo văn bản gốc (đánh giá trùng nhau rất
+    nhiều), dùng chung được giữa các luồng. normalize_many xử lý cả lô, có thể
+    chia cho nhiều process.
+    """
+
+    def __init__(self, teencode=None, lowercase=False, strip_tags=True, collapse_runs=True, cache_size=200000):
+        self.teencode = {k.lower(): v for k, v in (DEFAULT_TEENCODE if teencode is None else teencode).items()}
+        self.lowercase = lowercase
+        self.strip_tags = strip_tags
+        self.collapse_runs = collapse_runs
+        self.cache_size = cache_size
+        self._pattern = _teencode_pattern(self.teencode)
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def config(self):
+        """Tham số khởi tạo (để dựng lại bộ chuẩn hóa giống hệt trong process con)"""
+        return {
+            'teencode': self.teencode, 'lowercase': self.lowercase, 'strip_tags': self.strip_tags,
+            'collapse_runs': self.collapse_runs, 'cache_size': self.cache_size,
+        }
+
+    def _normalize(self, text):
+        if not isinstance(text, str):
+            return text
+        text = unicodedata.normalize('NFC', text)
+        if self.strip_tags and ('<' in text or '&' in text):
+            text = strip_html(text)
+            text = unicodedata.normalize('NFC', text)
+        if self.collapse_runs:
+            text = _CHAR_RUN.sub(_collapse_run, text)
+        if self._pattern is not None:
+            text = self._pattern.sub(lambda m: self.teencode[m.group(0).lower()], text)
+        if self.lowercase:
+            text = text.lower()
+        return _WHITESPACE.sub(' ', text).strip()
+
+    def pool(self, processes):
+        """Process pool có sẵn bộ chuẩn hóa cùng cấu hình trong mỗi process con"""
+        return Pool(processes, initializer=_init_worker, initargs=(self.config(),))
+
+    def normalize_many(self, texts, processes=None, chunk_size=5000, pool=None):
+        """Chuẩn hóa một danh sách văn bản, giữ thứ tự
+
+        Mỗi văn bản khác nhau chỉ xử lý một lần; với pool (hoặc processes > 1)
+        các văn bản khác nhau được chia thành lô chunk_size cho nhiều process.
+        """
+        texts = list(texts)
+        unique = list(dict.fromkeys(t for t in texts if isinstance(t, str)))
+        if (pool is not None or (processes and processes > 1)) and len(unique) > chunk_size:
+            chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+            own_pool = pool is None
+            pool = pool or self.pool(processes)
+            try:
+                results = {}
+                for chunk, cleaned in zip(chunks, pool.imap(_normalize_chunk, chunks)):
+                    results.update(zip(chunk, cleaned))
+            finally:
+                if own_pool:
+                    pool.terminate()
+        else:
+            results = {t: self.normalize(t) for t in unique}
+        return [results.get(t, t) if isinstance(t, str) else t for t in texts]
+
+    def normalize_frame(self, df, columns=('title', 'content'), processes=None, pool=None):
+        """Chuẩn hóa các cột văn bản của DataFrame (trả về bản sao)"""
+        df = df.copy()
+        for column in columns:
+            if column in df.columns:
+                df[column] = self.normalize_many(df[column].tolist(), processes, pool=pool)
+        return df
+
+
+_worker = None
+
+
+def _init_worker(config):
+    global _worker
+    _worker = TextNormalizer(**config)
+
+
+def _normalize_chunk(texts):
+    return [_worker.normalize(t) for t in texts]
+
+
+def normalize_csv(input_path, output_path=None, columns=('title', 'content'), normalizer=None,
+                  processes=None, chunksize=50000):
+    """Chuẩn hóa các cột văn bản của một file CSV lớn theo từng khối, ghi ra file mới
+
+    Mặc định ghi ra <tên file>_clean.csv; ghi vào file .tmp rồi đổi tên khi xong.
+    """
+    import pandas as pd
+
+    normalizer = normalizer or TextNormalizer()
+    processes = os.cpu_count() if processes is None else processes
+    output_path = output_path or f"{os.path.splitext(input_path)[0]}_clean.csv"
+    tmp_path = f"{output_path}.tmp"
+    total = 0
+
+    pool = normalizer.pool(processes) if processes and processes > 1 else None
+    try:
+        for chunk in pd.read_csv(input_path, chunksize=chunksize, encoding='utf-8-sig'):
+            chunk = normalizer.normalize_frame(chunk, columns, pool=pool)
+            chunk.to_csv(tmp_path, mode='a' if total else 'w', header=not total, index=False)
+            total += len(chunk)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    if not total:
+        return None
+    os.replace(tmp_path, output_path)
+    print(f"Đã chuẩn hóa {total} bản ghi: {output_path}")
+    return output_path
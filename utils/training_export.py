@@ -0,0 +1,269 @@
+import json
+import os
+import shutil
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from utils.balance import DEFAULT_SPLITS
+from utils.text_normalize import tokenize
+
+# Nhãn sentiment -> số (cột label)
+SENTIMENT_LABELS = ('negative', 'neutral', 'positive')
+LABEL_IDS = {label: i for i, label in enumerate(SENTIMENT_LABELS)}
+
+# Token đặc biệt: 0 = đệm, 1 = token ngoài từ điển
+PAD_ID, UNK_ID = 0, 1
+SPECIAL_TOKENS = ('<pad>', '<unk>')
+
+# Kiểu dữ liệu cố định của từng cột (tokens đổi sang uint32 nếu từ điển lớn hơn 65535)
+COLUMN_DTYPES = {'offsets': 'int64', 'rating': 'int8', 'label': 'int8', 'product': 'int32', 'review_id': 'int64'}
+
+
+def split_of(product_id, splits=None, seed=0):
+    """Split của một sản phẩm, cố định theo crc32(seed:product_id)
+
+    Mọi đánh giá của cùng sản phẩm nằm chung một split, và thêm dữ liệu mới
+    không làm sản phẩm cũ đổi split.
+    """
+    splits = splits or DEFAULT_SPLITS
+    position = zlib.crc32(f"{seed}:{product_id}".encode()) / 2 ** 32
+    total = sum(splits.values())
+    cumulative = 0.0
+    for name, ratio in splits.items():
+        cumulative += ratio / total
+        if position < cumulative:
+            return name
+    return name
+
+
+def _int(value):
+    try:
+        return int(value) if value is not None and value == value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def sentiment_label(record, rating):
+    """Nhãn số của bản ghi: theo cột sentiment nếu có, không thì suy ra từ rating"""
+    sentiment = record.get('sentiment')
+    if sentiment in LABEL_IDS:
+        return LABEL_IDS[sentiment]
+    return LABEL_IDS['positive'] if rating >= 4 else LABEL_IDS['negative'] if rating <= 2 else LABEL_IDS['neutral']
+
+
+class Vocabulary:
+    """Từ điển token <-> ID, token 0/1 là <pad>/<unk>"""
+
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.ids = {token: i for i, token in enumerate(self.tokens)}
+
+    @classmethod
+    def build(cls, counts, min_count=2, max_size=50000):
+        """Lấy các token xuất hiện >= min_count lần, nhiều nhất trước (cùng số lần thì theo thứ tự chữ)"""
+        frequent = sorted((t for t, c in counts.items() if c >= min_count), key=lambda t: (-counts[t], t))
+        return cls(SPECIAL_TOKENS + tuple(frequent[:max_size - len(SPECIAL_TOKENS)]))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.tokens, f, ensure_ascii=False)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def encode(self, text_or_tokens):
+        tokens = tokenize(text_or_tokens) if isinstance(text_or_tokens, str) else text_or_tokens
+        return [self.ids.get(token, UNK_ID) for token in tokens]
+
+    def decode(self, ids):
+        return [self.tokens[i] for i in ids]
+
+
+class _SplitWriter:
+    """Ghi nối tiếp các cột của một split ra file nhị phân, đệm theo lô"""
+
+    def __init__(self, directory, token_dtype, buffer_rows=20000):
+        os.makedirs(directory, exist_ok=True)
+        self.dtypes = dict(COLUMN_DTYPES, tokens=token_dtype)
+        self.files = {name: open(os.path.join(directory, f"{name}.bin"), 'wb') for name in self.dtypes}
+        self.buffer_rows = buffer_rows
+        self.buffers = {name: [] for name in self.dtypes}
+        self.rows = 0
+        self.num_tokens = 0
+        self.files['offsets'].write(np.zeros(1, dtype='int64').tobytes())
+
+    def add(self, token_ids, rating, label, product, review_id):
+        self.num_tokens += len(token_ids)
+        self.buffers['tokens'].extend(token_ids)
+        self.buffers['offsets'].append(self.num_tokens)
+        self.buffers['rating'].append(rating)
+        self.buffers['label'].append(label)
+        self.buffers['product'].append(product)
+        self.buffers['review_id'].append(review_id)
+        self.rows += 1
+        if len(self.buffers['label']) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        for name, values in self.buffers.items():
+            if values:
+                self.files[name].write(np.asarray(values, dtype=self.dtypes[name]).tobytes())
+                values.clear()
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        return {'rows': self.rows, 'tokens': self.num_tokens}
+
+
+def export_training(make_records, output_dir='data/training', fields=('title', 'content'), splits=None, seed=0,
+                    min_count=2, max_vocab=50000, max_tokens=None, vocab=None):
+    """Xuất đánh giá thành các mảng nhị phân kiểu cố định, đọc lại bằng memmap (TrainingDataset)
+
+    make_records: hàm không tham số trả về iterator bản ghi (dict có title/content,
+    rating, product_id, review_id, sentiment), được gọi 2 lần nếu phải dựng từ điển.
+    Từ điển chỉ dựng từ split train (vocab: dùng lại từ điển có sẵn). Mỗi split
+    gồm tokens (ID token nối liền) + offsets (n+1 vị trí), rating, label, product
+    (chỉ số trong products.bin) và review_id. Thư mục cũ được thay nguyên vẹn khi xong.
+    """
+    splits = splits or DEFAULT_SPLITS
+
+    def rows():
+        for record in make_records():
+            rating, product_id = _int(record.get('rating')), _int(record.get('product_id'))
+            if rating is None or product_id is None:
+                continue
+            text = ' '.join(str(record[f]) for f in fields if isinstance(record.get(f), str))
+            tokens = tokenize(text)
+            if tokens:
+                yield record, rating, product_id, tokens
+
+    if vocab is None:
+        # Lượt 1: đếm token của split train
+        counts = Counter()
+        for _, _, product_id, tokens in rows():
+            if split_of(product_id, splits, seed) == 'train':
+                counts.update(tokens)
+        vocab = Vocabulary.build(counts, min_count, max_vocab)
+
+    token_dtype = 'uint16' if len(vocab) <= 65535 else 'uint32'
+    tmp_dir = f"{output_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    writers = {name: _SplitWriter(os.path.join(tmp_dir, name), token_dtype) for name in splits}
+    products = {}
+    unknown = 0
+
+    # Lượt 2: mã hóa và ghi
+    for record, rating, product_id, tokens in rows():
+        token_ids = vocab.encode(tokens[:max_tokens] if max_tokens else tokens)
+        unknown += token_ids.count(UNK_ID)
+        product = products.setdefault(product_id, len(products))
+        writers[split_of(product_id, splits, seed)].add(
+            token_ids, rating, sentiment_label(record, rating), product, _int(record.get('review_id')) or -1
+        )
+
+    np.asarray(list(products), dtype='int64').tofile(os.path.join(tmp_dir, 'products.bin'))
+    vocab.save(os.path.join(tmp_dir, 'vocab.json'))
+    split_info = {name: writer.close() for name, writer in writers.items()}
+    meta = {
+        'version': 1,
+        'fields': list(fields),
+        'seed': seed,
+        'ratios': splits,
+        'labels': list(SENTIMENT_LABELS),
+        'dtypes': dict(COLUMN_DTYPES, tokens=token_dtype, products='int64'),
+        'vocab_size': len(vocab),
+        'num_products': len(products),
+        'unknown_tokens': unknown,
+        'max_tokens': max_tokens,
+        'splits': split_info,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    print(f"Đã xuất {sum(s['rows'] for s in split_info.values())} đánh giá ra {output_dir} "
+          + ', '.join(f"{name}={info['rows']}" for name, info in split_info.items()))
+    return meta
+
+
+def _memmap(path, dtype):
+    """np.memmap chỉ đọc (file rỗng -> mảng rỗng, memmap không mở được file 0 byte)"""
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+class TrainingDataset:
+    """Đọc một split đã xuất bằng export_training, truy cập ngẫu nhiên qua memmap (không cần pandas)
+
+    dataset[i] trả về token của đánh giá i dưới dạng view trên file (không sao
+    chép); batches() sinh các lô đã đệm về cùng độ dài để đưa vào mô hình.
+    """
+
+    def __init__(self, path='data/training', split='train'):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if split not in self.meta['splits']:
+            raise ValueError(f"Không có split '{split}' trong {path}")
+        self.path = path
+        self.split = split
+        dtypes = self.meta['dtypes']
+        directory = os.path.join(path, split)
+        self.tokens = _memmap(os.path.join(directory, 'tokens.bin'), dtypes['tokens'])
+        self.offsets = _memmap(os.path.join(directory, 'offsets.bin'), dtypes['offsets'])
+        self.rating = _memmap(os.path.join(directory, 'rating.bin'), dtypes['rating'])
+        self.label = _memmap(os.path.join(directory, 'label.bin'), dtypes['label'])
+        self.product = _memmap(os.path.join(directory, 'product.bin'), dtypes['product'])
+        self.review_id = _memmap(os.path.join(directory, 'review_id.bin'), dtypes['review_id'])
+        self.product_ids = _memmap(os.path.join(path, 'products.bin'), dtypes['products'])
+        self._vocab = None
+
+    @property
+    def vocab(self):
+        if self._vocab is None:
+            self._vocab = Vocabulary.load(os.path.join(self.path, 'vocab.json'))
+        return self._vocab
+
+    def __len__(self):
+        return len(self.label)
+
+    def __getitem__(self, i):
+        return {
+            'tokens': self.tokens[self.offsets[i]:self.offsets[i + 1]],
+            'rating': int(self.rating[i]),
+            'label': int(self.label[i]),
+            'product_id': int(self.product_ids[self.product[i]]),
+            'review_id': int(self.review_id[i]),
+        }
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def batch(self, indices, max_len=None):
+        """(tokens [B, L] đệm PAD_ID, độ dài, label) cho các chỉ số indices"""
+        indices = np.asarray(indices)
+        starts, ends = self.offsets[indices], self.offsets[indices + 1]
+        lengths = ends - starts
+        if max_len:
+            lengths = np.minimum(lengths, max_len)
+        tokens = np.full((len(indices), int(lengths.max()) if len(indices) else 0), PAD_ID, dtype=self.tokens.dtype)
+        for row, (start, length) in enumerate(zip(starts, lengths)):
+            tokens[row, :length] = self.tokens[start:start + length]
+        return tokens, lengths, np.asarray(self.label[indices])
+
+    def batches(self, batch_size=32, shuffle=True, seed=0, max_len=None, drop_last=False):
+        """Sinh lần lượt các lô (tokens, lengths, labels); shuffle với seed cố định cho mỗi epoch"""
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        stop = len(order) - len(order) % batch_size if drop_last else len(order)
+        for start in range(0, stop, batch_size):
+            yield self.batch(order[start:start + batch_size], max_len)
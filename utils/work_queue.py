@@ -0,0 +1,209 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import zlib
+
+# Số nhóm băm của task, dùng để chia việc giữa nhiều máy (shard = crc32(key) % NUM_BUCKETS)
+NUM_BUCKETS = 1024
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _shard_filter(shard, shards):
+    """Điều kiện SQL (và tham số) chỉ giữ task có bucket % shards == shard"""
+    if shard is None or shards <= 1:
+        return '', []
+    return ' AND bucket % ? = ?', [shards, shard]
+
+
+class WorkQueue:
+    """Hàng đợi task bền vững trên SQLite (WAL), dùng chung giữa nhiều process
+
+    Mỗi task (kind, key) chỉ được thêm một lần. Worker lease một lô task; task
+    được ack khi xong, nack khi lỗi (đưa lại hàng đợi, quá max_attempts thì
+    failed). Lease hết hạn sau visibility_timeout giây mà chưa ack (worker chết)
+    thì task tự động được worker khác lấy lại. Mỗi process mở WorkQueue riêng.
+    """
+
+    def __init__(self, path='data/work_queue.sqlite', visibility_timeout=600, max_attempts=5):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        # isolation_level=None: tự quản lý transaction (BEGIN IMMEDIATE khi lease)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT,
+                bucket INTEGER,
+                state TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                lease_until REAL DEFAULT 0,
+                worker TEXT,
+                error TEXT,
+                updated_at REAL,
+                UNIQUE (kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, lease_until);
+        """)
+
+    def put(self, kind, key, payload=None):
+        self.put_many(kind, [(key, payload)])
+
+    def put_many(self, kind, items):
+        """Thêm nhiều task [(key, payload)], task đã có (cùng kind, key) được bỏ qua; trả về số task mới"""
+        now = time.time()
+        rows = [
+            (kind, str(key), json.dumps(payload, ensure_ascii=False) if payload is not None else None,
+             zlib.crc32(str(key).split(':')[0].encode()) % NUM_BUCKETS, now)
+            for key, payload in items
+        ]
+        before = self.conn.total_changes
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO tasks (kind, key, payload, bucket, updated_at) VALUES (?, ?, ?, ?, ?)', rows
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return self.conn.total_changes - before
+
+    def lease(self, worker=None, limit=10, kinds=None, shard=None, shards=1):
+        """Lấy tối đa limit task sẵn sàng (chưa lease hoặc lease đã hết hạn)
+
+        shard/shards: chỉ lấy task có bucket % shards == shard (chia việc giữa các máy).
+        Trả về list dict {'id', 'kind', 'key', 'payload', 'attempts'}.
+        """
+        worker = worker or default_worker_id()
+        now = time.time()
+        where = "(state = 'pending' OR (state = 'leased' AND lease_until < ?))"
+        args = [now]
+        if kinds:
+            where += f" AND kind IN ({','.join('?' * len(kinds))})"
+            args.extend(kinds)
+        shard_where, shard_args = _shard_filter(shard, shards)
+        where += shard_where
+        args.extend(shard_args)
+
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.conn.execute(
+                f'SELECT id, kind, key, payload, attempts FROM tasks WHERE {where} ORDER BY id LIMIT ?',
+                args + [limit]
+            ).fetchall()
+            tasks = []
+            for task_id, kind, key, payload, attempts in rows:
+                if attempts >= self.max_attempts:
+                    # Lease hết hạn quá nhiều lần (worker chết liên tục trên task này)
+                    self.conn.execute(
+                        "UPDATE tasks SET state = 'failed', error = 'lease expired', updated_at = ? WHERE id = ?",
+                        (now, task_id)
+                    )
+                    continue
+                self.conn.execute(
+                    "UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_until = ?, worker = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (now + self.visibility_timeout, worker, now, task_id)
+                )
+                tasks.append({'id': task_id, 'kind': kind, 'key': key,
+                              'payload': json.loads(payload) if payload else None, 'attempts': attempts + 1})
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return tasks
+
+    def extend(self, task_ids, worker=None):
+        """Gia hạn lease cho các task đang xử lý lâu"""
+        worker = worker or default_worker_id()
+        until = time.time() + self.visibility_timeout
+        self.conn.executemany(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND state = 'leased' AND worker = ?",
+            [(until, task_id, worker) for task_id in task_ids]
+        )
+
+    def ack(self, task_ids, worker=None):
+        """Đánh dấu xong; chỉ task còn đang được worker này giữ mới được ack"""
+        worker = worker or default_worker_id()
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany(
+                "UPDATE tasks SET state = 'done', updated_at = ? WHERE id = ? AND state = 'leased' AND worker = ?",
+                [(now, task_id, worker) for task_id in task_ids]
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def nack(self, task_id, error='', worker=None):
+        """Trả task về hàng đợi sau lỗi, hoặc failed nếu đã thử quá max_attempts lần"""
+        worker = worker or default_worker_id()
+        self.conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_until = 0, error = ?, updated_at = ? WHERE id = ? AND state = 'leased' AND worker = ?",
+            (self.max_attempts, str(error)[:500], time.time(), task_id, worker)
+        )
+
+    def retry_failed(self, kind=None):
+        """Đưa các task failed về pending (đặt lại số lần thử)"""
+        sql = "UPDATE tasks SET state = 'pending', attempts = 0, error = NULL WHERE state = 'failed'"
+        args = ()
+        if kind:
+            sql += ' AND kind = ?'
+            args = (kind,)
+        return self.conn.execute(sql, args).rowcount
+
+    def stats(self, shard=None, shards=1):
+        """{kind: {state: số task}}, task lease đã hết hạn được tính là 'expired'; shard/shards như lease()"""
+        shard_where, shard_args = _shard_filter(shard, shards)
+        result = {}
+        rows = self.conn.execute(f"""
+            SELECT kind, CASE WHEN state = 'leased' AND lease_until < ? THEN 'expired' ELSE state END, COUNT(*)
+            FROM tasks WHERE 1 {shard_where} GROUP BY 1, 2
+        """, [time.time(), *shard_args])
+        for kind, state, count in rows:
+            result.setdefault(kind, {})[state] = count
+        return result
+
+    def unfinished(self, kind, prefix):
+        """Số task kind có key bắt đầu bằng prefix chưa done (vd. các trang 'review_page' của một sản phẩm)"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE kind = ? AND key GLOB ? AND state != 'done'", (kind, f'{prefix}*')
+        ).fetchone()[0]
+
+    def pending_count(self, shard=None, shards=1):
+        shard_where, shard_args = _shard_filter(shard, shards)
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE (state = 'pending' OR (state = 'leased' AND lease_until < ?))"
+            + shard_where, [time.time(), *shard_args]
+        ).fetchone()[0]
+
+    def export_shard(self, path, shard, shards):
+        """Chép các task chưa xong thuộc shard sang một file hàng đợi mới (để chạy trên máy khác)"""
+        target = WorkQueue(path, self.visibility_timeout, self.max_attempts)
+        rows = self.conn.execute(
+            "SELECT kind, key, payload FROM tasks WHERE state != 'done' AND bucket % ? = ?", (shards, shard)
+        ).fetchall()
+        by_kind = {}
+        for kind, key, payload in rows:
+            by_kind.setdefault(kind, []).append((key, json.loads(payload) if payload else None))
+        added = sum(target.put_many(kind, items) for kind, items in by_kind.items())
+        target.close()
+        return added
+
+    def close(self):
+        self.conn.close()